@@ -1,663 +1,66 @@
 from google.adk.agents import Agent
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools import FunctionTool
 
+from .prompt_segments import STATIC_CONTEXT
+from .widgets import widget_tool_response
+from .model_router import create_model_client
 
-def single_choice_selection__tool():
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Performance Data Assessment</title>
-        <style>
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                max-width: 100%;
-                margin: 0;
-                padding: 15px;
-                background-color: #f8f9fa;
-                line-height: 1.5;
-            }
-            .consultation-container {
-                background: white;
-                padding: 25px;
-                border-radius: 8px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-                margin-bottom: 20px;
-            }
-            .intro-text {
-                color: #495057;
-                margin-bottom: 25px;
-                font-size: 16px;
-            }
-            .question-section {
-                margin-bottom: 25px;
-                padding: 20px;
-                border-left: 4px solid #007bff;
-                background-color: #f8f9fa;
-                border-radius: 0 6px 6px 0;
-            }
-            .question-title {
-                margin: 0 0 20px 0;
-                color: #212529;
-                font-size: 18px;
-                font-weight: 600;
-            }
-            .options-container {
-                margin-top: 15px;
-            }
-            .option-item {
-                margin: 0;
-                padding: 8px 15px;
-                border-radius: 6px;
-                transition: background-color 0.2s ease;
-                cursor: pointer;
-            }
-            .option-item:hover {
-                background-color: #e3f2fd;
-            }
-            .option-item input[type="radio"] {
-                margin-right: 12px;
-                accent-color: #007bff;
-            }
-            .option-item label {
-                cursor: pointer;
-                color: #495057;
-                font-weight: 500;
-                font-size: 15px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="consultation-container">
-            <div class="question-section">
-                <h3 class="question-title">How familiar are you with the performance metrics for your area?</h3>
-                <div class="options-container">
-                    <div class="option-item">
-                        <input type="radio" id="very_familiar" name="performance_familiarity" value="Very familiar">
-                        <label for="very_familiar">Very familiar</label>
-                    </div>
-                    <div class="option-item">
-                        <input type="radio" id="somewhat_familiar" name="performance_familiarity" value="Somewhat familiar">
-                        <label for="somewhat_familiar">Somewhat familiar</label>
-                    </div>
-                    <div class="option-item">
-                        <input type="radio" id="limited_familiarity" name="performance_familiarity" value="Limited familiarity">
-                        <label for="limited_familiarity">Limited familiarity</label>
-                    </div>
-                    <div class="option-item">
-                        <input type="radio" id="not_familiar" name="performance_familiarity" value="Not familiar">
-                        <label for="not_familiar">Not familiar</label>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
+# LiteLLM model id; CONSULTANT_MODEL_API_BASE points it at any compatible endpoint (e.g. a local stand-in).
+# Fallback backends and request hedging are configured in model_router.
+CONSULTANT_MODEL = os.getenv("CONSULTANT_MODEL", "gemini/gemini-2.5-flash")
+CONSULTANT_MODEL_API_BASE = os.getenv("CONSULTANT_MODEL_API_BASE")
+
+
+def single_choice_selection__tool(question: Optional[str] = None, options: Optional[List[str]] = None):
+    """Show a single-choice question. Omit the arguments for the standard performance data familiarity question.
+
+    Args:
+        question: The question to ask
+        options: The answer options
     """
-    return {
-        "message": html,
-        "type": "html"
-    }
-
-def rating_scale_tool():
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Rating Scale Assessment Tool</title>
-        <style>
-            * { box-sizing: border-box; }
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                margin: 0;
-                padding: 15px;
-                background: #f8f9fa;
-                line-height: 1.5;
-            }
-            .container {
-                max-width: 800px;
-                margin: 0 auto;
-                background: white;
-                padding: 25px;
-                border-radius: 8px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-            }
-            .question-section {
-                padding: 20px;
-                border-left: 4px solid #007bff;
-                background: #f8f9fa;
-                border-radius: 0 6px 6px 0;
-            }
-            .question-title {
-                margin: 0 0 20px 0;
-                color: #212529;
-                font-size: 18px;
-                font-weight: 600;
-            }
-            .challenge-item {
-                margin-bottom: 20px;
-                padding: 15px;
-                background: white;
-                border-radius: 6px;
-                border: 1px solid #e9ecef;
-            }
-            .challenge-label {
-                font-weight: 600;
-                color: #495057;
-                margin-bottom: 10px;
-            }
-            .rating-container {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                gap: 5px;
-            }
-            .rating-option {
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                flex: 1;
-            }
-            .rating-option input {
-                margin-bottom: 5px;
-                accent-color: #007bff;
-                transform: scale(1.2);
-            }
-            .rating-label {
-                font-size: 12px;
-                color: #6c757d;
-                font-weight: 500;
-            }
-            .scale-labels {
-                display: flex;
-                justify-content: space-between;
-                margin-top: 5px;
-                font-size: 11px;
-                color: #868e96;
-            }
-            .submit-container {
-                margin-top: 30px;
-                text-align: center;
-            }
-            .submit-btn {
-                background: #007bff;
-                color: white;
-                border: none;
-                padding: 12px 30px;
-                border-radius: 6px;
-                font-size: 16px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: background-color 0.2s;
-            }
-            .submit-btn:hover { background: #0056b3; }
-            .submit-btn:disabled {
-                background: #6c757d;
-                cursor: not-allowed;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="question-section">
-                <h3 class="question-title" id="question-title">Rate the following challenges in your area (1 = Not a problem, 5 = Major problem):</h3>
-                <div id="challenges-container"></div>
-                <div class="submit-container">
-                    <button type="button" class="submit-btn" id="submit-ratings" disabled>Submit Ratings</button>
-                </div>
-            </div>
-        </div>
-
-        <script>
-            // Configuration object - easily customizable
-            const config = {
-                title: "Rate the following challenges in your area (1 = Not a problem, 5 = Major problem):",
-                scaleLabels: ["Not a problem", "Major problem"],
-                scaleSize: 5,
-                challenges: [
-                    { id: 'staff_recruitment', label: 'Staff recruitment/retention' },
-                    { id: 'student_recruitment', label: 'Student recruitment/retention' },
-                    { id: 'industry_placement', label: 'Industry placement capacity' },
-                    { id: 'equipment_technology', label: 'Equipment/technology adequacy' },
-                    { id: 'facility_capacity', label: 'Facility capacity/condition' },
-                    { id: 'curriculum_relevance', label: 'Curriculum relevance' },
-                    { id: 'regulatory_compliance', label: 'Regulatory compliance' },
-                    { id: 'funding_budget', label: 'Funding/budget constraints' },
-                    { id: 'industry_partnerships', label: 'Industry partnerships' },
-                    { id: 'student_support', label: 'Student support services' }
-                ]
-            };
-
-            class RatingScaleTool {
-                constructor(config) {
-                    this.config = config;
-                    this.ratings = {};
-                    this.init();
-                }
-
-                init() {
-                    this.renderTitle();
-                    this.renderChallenges();
-                    this.attachEventListeners();
-                }
-
-                renderTitle() {
-                    document.getElementById('question-title').textContent = this.config.title;
-                }
-
-                renderChallenges() {
-                    const container = document.getElementById('challenges-container');
-                    container.innerHTML = this.config.challenges.map(challenge => 
-                        this.createChallengeHTML(challenge)
-                    ).join('');
-                }
-
-                createChallengeHTML(challenge) {
-                    const ratingOptions = Array.from({length: this.config.scaleSize}, (_, i) => {
-                        const value = i + 1;
-                        return `
-                            <div class="rating-option">
-                                <input type="radio" id="${challenge.id}_${value}" name="${challenge.id}" value="${value}">
-                                <label for="${challenge.id}_${value}" class="rating-label">${value}</label>
-                            </div>
-                        `;
-                    }).join('');
-
-                    return `
-                        <div class="challenge-item">
-                            <div class="challenge-label">${challenge.label}</div>
-                            <div class="rating-container">${ratingOptions}</div>
-                            <div class="scale-labels">
-                                <span>${this.config.scaleLabels[0]}</span>
-                                <span>${this.config.scaleLabels[1]}</span>
-                            </div>
-                        </div>
-                    `;
-                }
-
-                attachEventListeners() {
-                    const submitBtn = document.getElementById('submit-ratings');
-                    
-                    // Add change listeners to all radio buttons
-                    this.config.challenges.forEach(challenge => {
-                        const radios = document.querySelectorAll(`input[name="${challenge.id}"]`);
-                        radios.forEach(radio => {
-                            radio.addEventListener('change', () => this.handleRatingChange());
-                        });
-                    });
-
-                    submitBtn.addEventListener('click', () => this.handleSubmit());
-                    this.checkAllSelected(); // Initial check
-                }
-
-                handleRatingChange() {
-                    this.checkAllSelected();
-                }
-
-                checkAllSelected() {
-                    const allSelected = this.config.challenges.every(challenge => 
-                        document.querySelector(`input[name="${challenge.id}"]:checked`)
-                    );
-                    document.getElementById('submit-ratings').disabled = !allSelected;
-                }
-
-                handleSubmit() {
-                    const ratings = {};
-                    const challengeMap = {};
-                    
-                    this.config.challenges.forEach(challenge => {
-                        challengeMap[challenge.id] = challenge.label;
-                        const selected = document.querySelector(`input[name="${challenge.id}"]:checked`);
-                        if (selected) {
-                            ratings[challenge.id] = selected.value;
-                        }
-                    });
-
-                    let responseMessage = "Here are my ratings for the operational challenges:\n\n";
-                    Object.entries(ratings).forEach(([key, value]) => {
-                        responseMessage += `${challengeMap[key]}: ${value}/${this.config.scaleSize}\n`;
-                    });
-
-                    // Handle response
-                    if (window.parent && window.parent.handleRatingSubmission) {
-                        window.parent.handleRatingSubmission(responseMessage);
-                        // Prevent double submission
-                        document.getElementById('submit-ratings').disabled = true;
-                    } else {
-                        alert('Ratings submitted:\\n' + responseMessage);
-                        console.log('Ratings:', ratings);
-                    }
-                }
-            }
-
-            // Initialize the tool when DOM is ready
-            document.addEventListener('DOMContentLoaded', () => {
-                new RatingScaleTool(config);
-            });
-
-            // Export for reuse
-            if (typeof module !== 'undefined' && module.exports) {
-                module.exports = { RatingScaleTool, config };
-            }
-        </script>
-    </body>
-    </html>
+    return widget_tool_response("single_choice", question=question, options=options)
+
+def rating_scale_tool(question: Optional[str] = None, items: Optional[List[str]] = None, scale_size: Optional[int] = None,
+                      low_label: Optional[str] = None, high_label: Optional[str] = None):
+    """Show a rating scale for several items. Omit the arguments for the standard operational challenges rating.
+
+    Args:
+        question: The instruction shown above the items
+        items: The items to rate
+        scale_size: Number of points on the scale (2-10)
+        low_label: Label for the lowest rating
+        high_label: Label for the highest rating
     """
-    return {
-        "message": html,
-        "type": "html"
-    }
-
-def rating_scale_v2_tool():
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Priority Areas for Investment</title>
-    <style>
-        body {
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        width: 90%;
-        margin: 0;
-        padding: 15px;
-        background-color: #f8f9fa;
-        line-height: 1.5;
-        }
-        .consultation-container {
-        background: white;
-        padding: 25px;
-        border-radius: 8px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-        margin-bottom: 20px;
-        }
-        .question-section {
-        margin-bottom: 25px;
-        padding: 20px;
-        border-left: 4px solid #007bff;
-        background-color: #f8f9fa;
-        border-radius: 0 6px 6px 0;
-        }
-        .question-title {
-        margin: 0 0 20px 0;
-        color: #212529;
-        font-size: 18px;
-        font-weight: 600;
-        }
-        .challenge-item {
-        margin-bottom: 20px;
-        padding: 15px;
-        background-color: white;
-        border-radius: 6px;
-        border: 1px solid #e9ecef;
-        }
-        .challenge-label {
-        font-weight: 600;
-        color: #495057;
-        margin-bottom: 10px;
-        font-size: 15px;
-        }
-        .rating-container {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-top: 8px;
-        }
-        .rating-option {
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        margin: 0 5px;
-        }
-        .rating-option input[type="radio"] {
-        margin-bottom: 5px;
-        accent-color: #007bff;
-        transform: scale(1.2);
-        }
-        .rating-label {
-        font-size: 12px;
-        color: #6c757d;
-        text-align: center;
-        font-weight: 500;
-        }
-        .scale-labels {
-        display: flex;
-        justify-content: space-between;
-        margin-top: 5px;
-        font-size: 11px;
-        color: #868e96;
-        }
-        .submit-container {
-        margin-top: 30px;
-        text-align: center;
-        }
-        .submit-btn {
-        background-color: #007bff;
-        color: white;
-        border: none;
-        padding: 12px 30px;
-        border-radius: 6px;
-        font-size: 16px;
-        font-weight: 600;
-        cursor: pointer;
-        transition: background-color 0.2s ease;
-        }
-        .submit-btn:hover {
-        background-color: #0056b3;
-        }
-        .submit-btn:disabled {
-        background-color: #6c757d;
-        cursor: not-allowed;
-        }
-    </style>
-    </head>
-    <body>
-    <div class="consultation-container">
-        <div class="question-section">
-        <h3 class="question-title">If you had additional resources, rank your top 5 investment priorities (1 = highest priority):</h3>
-        <div id="challenge-list"></div>
-
-        <div class="submit-container">
-            <button type="button" class="submit-btn" id="submit-ratings">Submit Ratings</button>
-        </div>
-        </div>
-    </div>
-
-    <script>
-        const challenges = [
-        { key: "additional_staff", label: "Additional teaching staff" },
-        { key: "professional_development", label: "Professional development for existing staff" },
-        { key: "new_equipment", label: "New/upgraded equipment" },
-        { key: "facility_improvements", label: "Facility improvements/expansion" },
-        { key: "technology_infrastructure", label: "Technology infrastructure" },
-        { key: "industry_partnership_development", label: "Industry partnership development" },
-        { key: "marketing", label: "Marketing/student recruitment" },
-        { key: "curriculum_development", label: "Curriculum development/refresh" },
-        { key: "assessment_development", label: "Assessment development/refresh" },
-        { key: "quality_assurance", label: "Quality assurance/compliance systems" },
-        { key: "research_innovation", label: "Research and innovation capabilities" }
-        ];
-
-        const container = document.getElementById("challenge-list");
-
-        // Generate challenge items dynamically
-        challenges.forEach(challenge => {
-        const item = document.createElement("div");
-        item.className = "challenge-item";
-
-        item.innerHTML = `
-            <div class="challenge-label">${challenge.label}</div>
-            <div class="rating-container">
-            ${[1,2,3,4,5].map(num => `
-                <div class="rating-option">
-                <input type="radio" id="${challenge.key}_${num}" name="${challenge.key}" value="${num}">
-                <label for="${challenge.key}_${num}" class="rating-label">${num}</label>
-                </div>
-            `).join("")}
-            </div>
-            <div class="scale-labels"><span>Highest Priority</span><span>Lowest Priority</span></div>
-        `;
-
-        container.appendChild(item);
-        });
-
-        // Submission handling
-        const submitBtn = document.getElementById('submit-ratings');
-        function checkAllSelected() {
-        const allSelected = challenges.every(c => document.querySelector(`input[name="${c.key}"]:checked`));
-        submitBtn.disabled = !allSelected;
-        }
-
-        document.addEventListener("change", checkAllSelected);
-
-        submitBtn.addEventListener("click", () => {
-            const ratings = {};
-            challenges.forEach(c => {
-                const selected = document.querySelector(`input[name="${c.key}"]:checked`);
-                ratings[c.label] = selected ? selected.value : "Not selected";
-            });
-
-            let responseMessage = "Here are my ratings:\\n\\n";
-            Object.entries(ratings).forEach(([label, value]) => {
-                responseMessage += `${label}: ${value}/5\\n`;
-            });
-
-            // Trigger the response mechanism (same as original)
-            if (window.parent && window.parent.handleRatingSubmission) {
-                window.parent.handleRatingSubmission(responseMessage);
-            } else {
-                // Fallback for direct integration
-                        alert('Ratings submitted: ' + responseMessage);
-            }
-        });
-
-        // Initial state
-        checkAllSelected();
-    </script>
-    </body>
-    </html>
-
+    return widget_tool_response("rating_scale", question=question, items=items, scale_size=scale_size,
+                                low_label=low_label, high_label=high_label)
+
+def rating_scale_v2_tool(question: Optional[str] = None, items: Optional[List[str]] = None, scale_size: Optional[int] = None,
+                         low_label: Optional[str] = None, high_label: Optional[str] = None):
+    """Show a priority ranking scale. Omit the arguments for the standard investment priorities ranking.
+
+    Args:
+        question: The instruction shown above the items
+        items: The items to rank
+        scale_size: Number of points on the scale (2-10)
+        low_label: Label for rank 1
+        high_label: Label for the last rank
     """
-    return {
-        "message": html,
-        "type": "html"
-    }
-
-def checklist__tool():
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Opportunities for Growth</title>
-    <style>
-        body {
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        background: #f8f9fa;
-        padding: 20px;
-        }
-        .checklist-container {
-        background: white;
-        padding: 20px;
-        border-radius: 8px;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.08);
-        max-width: 600px;
-        }
-        .checklist-title {
-        font-size: 18px;
-        font-weight: 600;
-        margin-bottom: 15px;
-        color: #212529;
-        }
-        .checklist-item {
-        margin-bottom: 10px;
-        display: flex;
-        align-items: center;
-        }
-        .checklist-item input[type="checkbox"] {
-        margin-right: 10px;
-        transform: scale(1.2);
-        accent-color: #007bff;
-        }
-        .checklist-item label {
-        font-size: 15px;
-        color: #495057;
-        cursor: pointer;
-        }
-        .other-input {
-        margin-left: 25px;
-        padding: 6px 10px;
-        border: 1px solid #ced4da;
-        border-radius: 6px;
-        font-size: 14px;
-        flex: 1;
-        }
-    </style>
-    </head>
-    <body>
-    <div class="checklist-container">
-        <div class="checklist-title">Where do you see the biggest opportunities for growth in your area?</div>
-        
-        <div class="checklist-item">
-        <input type="checkbox" id="student_numbers">
-        <label for="student_numbers">Increasing student numbers in existing programs</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="new_programs">
-        <label for="new_programs">Developing new programs/qualifications</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="online_delivery">
-        <label for="online_delivery">Expanding online/flexible delivery</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="industry_partnerships">
-        <label for="industry_partnerships">Strengthening industry partnerships</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="student_outcomes">
-        <label for="student_outcomes">Improving student outcomes/completion rates</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="employment_rates">
-        <label for="employment_rates">Enhancing graduate employment rates</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="revenue_streams">
-        <label for="revenue_streams">Developing new revenue streams</label>
-        </div>
-        <div class="checklist-item">
-        <input type="checkbox" id="other_option">
-        <label for="other_option">Other:</label>
-        <input type="text" class="other-input" id="other_text" placeholder="Please specify" disabled>
-        </div>
-    </div>
-
-    <script>
-        const otherCheckbox = document.getElementById('other_option');
-        const otherText = document.getElementById('other_text');
-
-        otherCheckbox.addEventListener('change', () => {
-        otherText.disabled = !otherCheckbox.checked;
-        if (!otherCheckbox.checked) otherText.value = "";
-        });
-    </script>
-    </body>
-    </html>
+    return widget_tool_response("rating_scale_v2", question=question, items=items, scale_size=scale_size,
+                                low_label=low_label, high_label=high_label)
+
+def checklist__tool(question: Optional[str] = None, options: Optional[List[str]] = None, allow_other: Optional[bool] = None):
+    """Show a multi-select checklist. Omit the arguments for the standard growth opportunities checklist.
+
+    Args:
+        question: The question to ask
+        options: The options to tick
+        allow_other: Whether to add a free-text "Other" option
     """
-    return {
-        "message": html,
-        "type": "html"
-    }
+    return widget_tool_response("checklist", question=question, options=options, allow_other=allow_other)
 
 root_agent = Agent(
     name="riley_strategic_consultant",
@@ -700,10 +103,10 @@ root_agent = Agent(
 
     SECTION 2: CURRENT STATE ASSESSMENT
     2.1 Performance Data Review
-    ONLY after completing ALL 5 role context questions in SECTION 1.2, call the single_choice_selection__tool. The *ONLY* thing you should return is the *EXACT* HTML in "message" from tool response, without any curly braces, provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the HTML. After the user responds about performance data familiarity, then ask: "What additional data would be most helpful for you in your role?"
+    ONLY after completing ALL 5 role context questions in SECTION 1.2, call the single_choice_selection__tool. The *ONLY* thing you should return is the *EXACT* widget marker in "message" from tool response (for example [[widget:some_id]]), provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the marker. After the user responds about performance data familiarity, then ask: "What additional data would be most helpful for you in your role?"
 
     2.2 Current Operational Challenges
-    ONLY after completing the performance data questions in SECTION 2.1, call the rating_scale_tool. The *ONLY* thing you should return is the *EXACT* HTML in "message" from tool response, without any curly braces, provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the HTML.
+    ONLY after completing the performance data questions in SECTION 2.1, call the rating_scale_tool. The *ONLY* thing you should return is the *EXACT* widget marker in "message" from tool response (for example [[widget:some_id]]), provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the marker.
 
     2.3 Biggest Operational Pain Points
     What are the top 3 operational challenges keeping you awake at night?
@@ -713,10 +116,10 @@ root_agent = Agent(
     In your ideal world, what would your discipline/teaching area/programs look like in 3-5 years?
 
     3.2 Priority Areas for Investment
-    ONLY after completing the SECTION 3.1, call the rating_scale_v2_tool. The *ONLY* thing you should return is the *EXACT* HTML in "message" from tool response, without any curly braces, provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the HTML.
+    ONLY after completing the SECTION 3.1, call the rating_scale_v2_tool. The *ONLY* thing you should return is the *EXACT* widget marker in "message" from tool response (for example [[widget:some_id]]), provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the marker.
 
     3.3 Growth Opportunities
-    ONLY after completing the SECTION 3.2, call the checklist__tool. The *ONLY* thing you should return is the *EXACT* HTML in "message" from tool response, without any curly braces, provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the HTML.
+    ONLY after completing the SECTION 3.2, call the checklist__tool. The *ONLY* thing you should return is the *EXACT* widget marker in "message" from tool response (for example [[widget:some_id]]), provided by the tool, *without any surrounding text or tags*. Do *NOT* include any introductory phrases or explanations. Just the marker.
     After that ask that: Please elaborate on your top growth opportunity.
 
     Section 4: Capacity and Constraints
@@ -729,7 +132,7 @@ root_agent = Agent(
     CONVERSATION FLOW:
     1. Start with personalized greeting using their actual name
     2. Ask ONE role context question per response (5 questions total)
-    3. Ask about performance data familiarity using the HTML format above
+    3. Ask about performance data familiarity using the widget marker above
     4. Ask about additional data needs
     5. Once all context is gathered, proceed to strategic consultation
 
@@ -740,7 +143,7 @@ root_agent = Agent(
     - Don't proceed to strategic consultation until all context is gathered
     - Use Australian spelling and terminology
     - For regular conversation: Use paragraphs with proper spacing
-    - For interactive questions: Use the exact HTML format provided above
+    - For interactive questions: Use the exact widget marker provided by the tool
 
     PROGRESSION RULES:
     - Do NOT ask about strategic challenges until ALL stakeholder context is complete
@@ -749,13 +152,14 @@ root_agent = Agent(
 
     CRITICAL SEQUENCE CONTROL:
     - After internal stakeholders question, ALWAYS ask about external stakeholders next
-    - After external stakeholders question, ALWAYS ask about performance data familiarity using HTML format
+    - After external stakeholders question, ALWAYS ask about performance data familiarity using the widget
     - Do NOT provide strategic analysis until ALL context questions are answered
 
     IMPORTANT: Follow the structured sequence exactly. Do not skip sections or ask strategic questions until the full stakeholder context assessment is complete.
 
     Your goal is to systematically gather stakeholder context before proceeding to strategic consultation and priority discovery.
-    """,
-    model=LiteLlm("gemini/gemini-2.5-flash"),
+    """ + STATIC_CONTEXT,
+    model=LiteLlm(CONSULTANT_MODEL, llm_client=create_model_client(CONSULTANT_MODEL, CONSULTANT_MODEL_API_BASE),
+                  **({"api_base": CONSULTANT_MODEL_API_BASE} if CONSULTANT_MODEL_API_BASE else {})),
     tools=[FunctionTool(single_choice_selection__tool), FunctionTool(rating_scale_tool), FunctionTool(rating_scale_v2_tool), FunctionTool(checklist__tool)]
 )
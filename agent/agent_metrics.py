@@ -0,0 +1,94 @@
+"""
+Consultation metrics for the Strategic Consultant Agent.
+Registered on the server's metrics registry (see common/metrics.py) through
+TaskManager.register_metrics, and exported from /metrics.
+"""
+
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class AgentMetrics:
+    """Turn, tool, model-usage and session-store metrics, labelled by conversation stage where useful."""
+
+    def __init__(self, registry: Any, session_service: Any = None, response_cache: Any = None):
+        """
+        Args:
+            registry: Metrics registry providing counter/gauge/histogram/add_callback
+            session_service: Session backend; its stats() (if any) feeds the session-store gauges
+            response_cache: Response cache whose size feeds the cache gauge
+        """
+        self.turns = registry.counter(
+            "consultant_turns_total", "Consultation turns processed", ["stage", "status", "scripted"])
+        self.turn_duration = registry.histogram(
+            "consultant_turn_duration_seconds", "End-to-end turn latency", ["stage", "scripted"])
+        self.turns_in_flight = registry.gauge(
+            "consultant_turns_in_flight", "Consultation turns being processed")
+        self.tool_calls = registry.counter(
+            "consultant_tool_calls_total", "Tool calls made by the model", ["tool", "status"])
+        self.tool_duration = registry.histogram(
+            "consultant_tool_duration_seconds", "Time from tool call to tool response", ["tool"])
+        self.tier_turns = registry.counter(
+            "consultant_model_tier_turns_total", "Model turns by the tier that served them", ["stage", "tier"])
+        self.llm_responses = registry.counter(
+            "consultant_llm_responses_total", "Model responses carrying usage data", ["stage"])
+        self.llm_tokens = registry.counter(
+            "consultant_llm_tokens_total", "Model tokens by direction (input, cached_input, output)", ["stage", "direction"])
+
+        self.cache_lookups = registry.counter(
+            "consultant_response_cache_lookups_total",
+            "Response cache lookups by result (exact, similar, miss, uncacheable)", ["stage", "result"])
+
+        self.response_cache = response_cache
+        if response_cache is not None:
+            self.cache_entries = registry.gauge(
+                "consultant_response_cache_entries", "Replies held by the response cache")
+            registry.add_callback(lambda: self.cache_entries.set(response_cache.stats()["entries"]))
+
+        self.session_service = session_service
+        if session_service is not None and hasattr(session_service, "stats"):
+            self.store_sessions = registry.gauge(
+                "consultant_session_store_sessions", "Sessions held by the session store", ["tier"])
+            self.store_events = registry.gauge(
+                "consultant_session_store_events", "Events persisted by the session store")
+            self.store_hot_bytes = registry.gauge(
+                "consultant_session_store_hot_bytes", "Approximate bytes held in the in-memory session tier")
+            registry.add_callback(self._refresh_session_store)
+
+    def turn_started(self) -> None:
+        self.turns_in_flight.inc()
+
+    def turn_finished(self, stage: str, status: str, scripted: bool, seconds: float) -> None:
+        self.turns_in_flight.dec()
+        scripted_label = "true" if scripted else "false"
+        self.turns.inc(stage=stage, status=status, scripted=scripted_label)
+        self.turn_duration.observe(seconds, stage=stage, scripted=scripted_label)
+
+    def tool_finished(self, tool: str, status: str, seconds: float) -> None:
+        self.tool_calls.inc(tool=tool, status=status)
+        self.tool_duration.observe(seconds, tool=tool)
+
+    def tier_selected(self, stage: str, tier: str) -> None:
+        self.tier_turns.inc(stage=stage, tier=tier)
+
+    def cache_lookup(self, stage: str, result: str) -> None:
+        self.cache_lookups.inc(stage=stage, result=result)
+
+    def llm_usage(self, stage: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> None:
+        self.llm_responses.inc(stage=stage)
+        self.llm_tokens.inc(input_tokens, stage=stage, direction="input")
+        self.llm_tokens.inc(cached_tokens, stage=stage, direction="cached_input")
+        self.llm_tokens.inc(output_tokens, stage=stage, direction="output")
+
+    def _refresh_session_store(self) -> None:
+        try:
+            stats = self.session_service.stats()
+        except Exception as e:
+            logger.warning(f"Session store stats unavailable: {e}")
+            return
+        self.store_sessions.set(stats.get("hot_sessions", 0), tier="hot")
+        self.store_sessions.set(stats.get("stored_sessions", 0), tier="stored")
+        self.store_events.set(stats.get("stored_events", 0))
+        self.store_hot_bytes.set(stats.get("hot_bytes", 0))
@@ -0,0 +1,185 @@
+"""
+Incremental conversation-stage tracking for the Strategic Consultant Agent.
+Keeps the counters behind the stage/focus heuristics so each turn only reads new messages.
+"""
+
+from typing import Dict, Any, List, FrozenSet, Tuple
+
+from .keyword_matcher import KeywordMatcher
+from .transcript_store import message_fingerprint
+
+# Key under which the tracker is persisted in the ADK session state
+STATE_KEY = "conversation_state"
+# Bump when the persisted layout changes; older states are rebuilt from the transcript
+STATE_VERSION = 3
+
+CONTEXT_QUESTIONS = [
+    "years have you been in your current position",
+    "years with tafe nsw",
+    "been with tafe nsw",
+    "direct reports",
+    "internal stakeholders",
+    "external stakeholders"
+]
+
+PERFORMANCE_QUESTIONS = [
+    "familiar are you with the performance metrics",
+    "performance metrics for your area",
+    "additional data would be helpful"
+]
+
+CLOSING_PHRASES = ["action plan", "strategic analysis", "recommendations for next steps", "pleasure helping"]
+FAREWELL_PHRASES = ["thanks", "thank you", "bye", "goodbye", "see you", "great", "perfect", "excellent"]
+GREETING_KEYWORDS = ["hello", "hi", "start", "begin"]
+
+FOCUS_KEYWORDS = [
+    ("student_outcomes", ["student", "learner", "enrollment", "completion"]),
+    ("industry_engagement", ["industry", "employer", "partnership", "workplace"]),
+    ("digital_transformation", ["digital", "technology", "online", "system"]),
+    ("workforce_development", ["staff", "teacher", "faculty", "workforce"]),
+    ("quality_assurance", ["quality", "compliance", "asqa", "standard"]),
+    ("resource_management", ["budget", "resource", "funding", "cost"])
+]
+
+# Number of trailing history messages considered when identifying strategic focus
+FOCUS_WINDOW = 3
+
+# Single matcher for every heuristic above, built once at import
+MATCHER = KeywordMatcher({
+    "context_question": CONTEXT_QUESTIONS,
+    "performance_question": PERFORMANCE_QUESTIONS,
+    "closing": CLOSING_PHRASES,
+    "farewell": FAREWELL_PHRASES,
+    "greeting": GREETING_KEYWORDS,
+    **dict(FOCUS_KEYWORDS)
+})
+
+
+class ConversationState:
+    """
+    Running summary of a consultation transcript.
+
+    `advance` consumes only the messages appended since the last call; if the transcript
+    no longer extends what was seen (the client reset or edited it), the state is rebuilt.
+    `advance_from` does the same from a window of the transcript, for callers that read
+    the transcript from storage rather than holding all of it.
+    """
+
+    def __init__(self):
+        self.cursor = 0
+        self.last_fingerprint = ""
+        self.context_questions_asked = 0
+        self.performance_questions_asked = 0
+        self.last_ai_closing = False
+        self.last_ai_context_question = False
+        # Matcher categories found in each of the last FOCUS_WINDOW messages
+        self.recent_hits: List[List[str]] = []
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationState":
+        state = cls()
+        if data and data.get("version") == STATE_VERSION:
+            state.cursor = data.get("cursor", 0)
+            state.last_fingerprint = data.get("last_fingerprint", "")
+            state.context_questions_asked = data.get("context_questions_asked", 0)
+            state.performance_questions_asked = data.get("performance_questions_asked", 0)
+            state.last_ai_closing = data.get("last_ai_closing", False)
+            state.last_ai_context_question = data.get("last_ai_context_question", False)
+            state.recent_hits = [list(hits) for hits in data.get("recent_hits", [])]
+        return state
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "cursor": self.cursor,
+            "last_fingerprint": self.last_fingerprint,
+            "context_questions_asked": self.context_questions_asked,
+            "performance_questions_asked": self.performance_questions_asked,
+            "last_ai_closing": self.last_ai_closing,
+            "last_ai_context_question": self.last_ai_context_question,
+            "recent_hits": [list(hits) for hits in self.recent_hits]
+        }
+
+    @property
+    def resume_from(self) -> int:
+        """Transcript position a window passed to `advance_from` should start at."""
+        return max(self.cursor - 1, 0)
+
+    def advance(self, history: List[Dict]) -> "ConversationState":
+        """Fold the messages of `history` not yet seen into the running counters."""
+        start = self.resume_from
+        if not self.advance_from(start, history[start:]):
+            self.__init__()
+            self.advance_from(0, history)
+        return self
+
+    def advance_from(self, start: int, window: List[Dict]) -> bool:
+        """
+        Fold in transcript messages `window`, which begins at position `start`.
+
+        `start` must be `resume_from`, so the window overlaps the last message already
+        seen. Returns False (leaving the state untouched) if the overlap doesn't match,
+        meaning the transcript was rewritten and the caller must rebuild from position 0.
+        """
+        if self.cursor:
+            if start != self.resume_from or not window or message_fingerprint(window[0]) != self.last_fingerprint:
+                return False
+            new_messages = window[1:]
+        else:
+            new_messages = window
+
+        for msg in new_messages:
+            self._consume(msg)
+
+        self.cursor = start + len(window)
+        if window:
+            self.last_fingerprint = message_fingerprint(window[-1])
+        return True
+
+    def _consume(self, msg: Dict) -> None:
+        hits = MATCHER.scan(msg.get('message', ''))
+        self.recent_hits = (self.recent_hits + [sorted(hits)])[-FOCUS_WINDOW:]
+
+        if msg.get('sender') != 'ai':
+            return
+        self.last_ai_closing = "closing" in hits
+        self.last_ai_context_question = "context_question" in hits
+        if "context_question" in hits:
+            self.context_questions_asked += 1
+        if "performance_question" in hits:
+            self.performance_questions_asked += 1
+
+    def classify(self, current_message: str) -> Tuple[str, str]:
+        """Return (stage, strategic focus) for the incoming message with a single scan of it."""
+        hits = MATCHER.scan(current_message)
+        return self._stage(hits), self._focus(hits)
+
+    def stage(self, current_message: str) -> str:
+        """Determine the conversation stage for the incoming message."""
+        return self._stage(MATCHER.scan(current_message))
+
+    def focus(self, current_message: str) -> str:
+        """Identify the strategic focus area from the incoming message and recent history."""
+        return self._focus(MATCHER.scan(current_message))
+
+    def _stage(self, hits: FrozenSet[str]) -> str:
+        # If the last AI message contained analysis/action plan and user is saying thanks/goodbye
+        if self.cursor > 0 and self.last_ai_closing and "farewell" in hits:
+            return "consultation_complete"
+
+        # Determine stage based on questions asked
+        if self.cursor == 0 or "greeting" in hits:
+            return "initial_engagement"
+        elif self.context_questions_asked < 5:  # Need all 5 role context questions first
+            return "role_context_gathering"
+        elif self.performance_questions_asked < 2:  # Then performance data questions
+            return "performance_data_gathering"
+        else:  # Only after all context questions
+            return "analysis_phase"
+
+    def _focus(self, hits: FrozenSet[str]) -> str:
+        hits = set(hits).union(*self.recent_hits)
+        for focus, _ in FOCUS_KEYWORDS:
+            if focus in hits:
+                return focus
+        return "strategic_planning"
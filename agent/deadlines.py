@@ -0,0 +1,83 @@
+"""
+Per-turn deadlines for the Strategic Consultant Agent.
+Each conversation stage gets a time budget for its turn; a request may override it
+(e.g. to match the frontend's own timeout) up to a server-side cap. When the budget
+runs out the model run is aborted (see TaskManager.stream_task).
+"""
+
+import os
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds per conversation stage; scripted stages rarely reach the model, analysis runs the tools
+STAGE_DEADLINES = {
+    "initial_engagement": 30.0,
+    "role_context_gathering": 30.0,
+    "performance_data_gathering": 45.0,
+    "analysis_phase": 120.0,
+    "consultation_complete": 30.0
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a turn's model run is aborted because its deadline passed."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"Turn exceeded its {seconds:g}s deadline")
+        self.seconds = seconds
+
+
+class DeadlinePolicy:
+    """Resolves the time budget for a turn from its stage and an optional per-request override."""
+
+    def __init__(self, stage_seconds: Optional[Dict[str, float]] = None, default_seconds: float = 60.0,
+                 max_seconds: float = 300.0):
+        """
+        Args:
+            stage_seconds: Budget per conversation stage (stages not listed use default_seconds)
+            default_seconds: Budget for other stages; 0 disables deadlines for them
+            max_seconds: Cap on any budget, including per-request overrides
+        """
+        self.stage_seconds = dict(STAGE_DEADLINES if stage_seconds is None else stage_seconds)
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+
+    def seconds_for(self, stage: str, override_ms: Optional[float] = None) -> Optional[float]:
+        """Budget in seconds for a turn in `stage`, or None when it has no deadline."""
+        if override_ms is not None and override_ms > 0:
+            seconds = override_ms / 1000
+        else:
+            seconds = self.stage_seconds.get(stage, self.default_seconds)
+        if not seconds or seconds <= 0:
+            return None
+        return min(seconds, self.max_seconds) if self.max_seconds > 0 else seconds
+
+
+def _parse_stage_deadlines(spec: str) -> Dict[str, float]:
+    """Parse "stage=seconds,stage=seconds" into overrides for STAGE_DEADLINES."""
+    deadlines = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        stage, _, seconds = item.partition("=")
+        try:
+            deadlines[stage.strip()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring malformed stage deadline {item!r}")
+    return deadlines
+
+
+def create_deadline_policy() -> DeadlinePolicy:
+    """
+    Build the deadline policy configured by environment variables:
+    CONSULTANT_STAGE_DEADLINES ("analysis_phase=90,initial_engagement=15") adjusts stage budgets,
+    CONSULTANT_DEADLINE_SECONDS sets the budget for unlisted stages (0 disables) and
+    CONSULTANT_MAX_DEADLINE_SECONDS caps every budget, including request overrides.
+    """
+    stage_seconds = dict(STAGE_DEADLINES)
+    stage_seconds.update(_parse_stage_deadlines(os.getenv("CONSULTANT_STAGE_DEADLINES", "")))
+    return DeadlinePolicy(
+        stage_seconds=stage_seconds,
+        default_seconds=float(os.getenv("CONSULTANT_DEADLINE_SECONDS", "60")),
+        max_seconds=float(os.getenv("CONSULTANT_MAX_DEADLINE_SECONDS", "300"))
+    )
@@ -0,0 +1,44 @@
+"""
+Shared keyword matching for the Strategic Consultant Agent's heuristics.
+A text is lower-cased once and every category's phrases are checked against it.
+"""
+
+from typing import Dict, Iterable, FrozenSet, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive substring matcher over a fixed set of categorised phrases.
+
+    The phrase table is built once: phrases are lower-cased, and a phrase is dropped when a
+    shorter phrase of the same category is a substring of it (it can never add a hit). A
+    scan lower-cases the text once and runs CPython's native substring search per phrase,
+    stopping at the first hit for each category. In CPython this beats a single compiled
+    regex alternation several times over (see benchmarks/bench_keyword_matcher.py).
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        """
+        Args:
+            categories: Mapping of category name to the phrases that signal it
+        """
+        self._table: List[Tuple[str, Tuple[str, ...]]] = []
+        for category, phrases in categories.items():
+            lowered = sorted({phrase.lower() for phrase in phrases}, key=len)
+            kept: List[str] = []
+            for phrase in lowered:
+                if not any(shorter in phrase for shorter in kept):
+                    kept.append(phrase)
+            self._table.append((category, tuple(kept)))
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Return every category with at least one phrase occurring in `text`."""
+        lowered = text.lower()
+        # Plain loops: on short messages, generator and any() overhead outweighs the searches
+        hits = []
+        for category, phrases in self._table:
+            for phrase in phrases:
+                if phrase in lowered:
+                    hits.append(category)
+                    break
+        return frozenset(hits)
@@ -0,0 +1,249 @@
+"""
+Record/replay transport for the agent's LiteLLM model calls.
+
+In record mode every completion (streamed or not) goes to the real provider and is also
+appended to a JSONL cassette with its request, the provider's response chunks and their
+timings. In replay mode completions are served from the cassette with no network access,
+at the recorded pace scaled by `time_scale`.
+
+Requests are matched by a hash of the prompt (messages + tools; the model id is ignored so
+a cassette can be replayed under another model name). When a prompt no longer matches
+anything recorded, the miss is logged and reported with the first diverging message, and
+the next recorded exchange is served in its place (or CassetteMissError is raised in
+strict mode).
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from google.adk.models.lite_llm import LiteLLMClient
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMissError(Exception):
+    """Raised in strict replay when a request matches no recorded exchange."""
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return str(value)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=_jsonable, separators=(",", ":"))
+
+
+def prompt_hash(messages: Any, tools: Any) -> str:
+    """Digest identifying a prompt: the chat messages and tool declarations sent to the model."""
+    return hashlib.sha256(_canonical({"messages": messages, "tools": tools}).encode("utf-8")).hexdigest()[:24]
+
+
+def _excerpt(message: Any, limit: int = 200) -> str:
+    text = _canonical(message)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class CassetteLiteLLMClient(LiteLLMClient):
+    """LiteLLM client that records completions to, or replays them from, a cassette file."""
+
+    def __init__(self, path: str, mode: str = "replay", time_scale: float = 1.0, strict: bool = False):
+        """
+        Args:
+            path: JSONL cassette file
+            mode: "record" (call the provider and append to the cassette) or "replay"
+            time_scale: Multiplier on recorded timings during replay (0 = as fast as possible)
+            strict: Raise CassetteMissError on an unmatched request instead of serving the next exchange
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.strict = strict
+        self.calls = 0
+        self.hits = 0
+        self.misalignments: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._interactions: List[Dict[str, Any]] = []
+        self._by_hash: Dict[str, deque] = {}
+        self._last_by_hash: Dict[str, int] = {}
+        self._consumed: set = set()
+        self._position = 0
+
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        self.calls += 1
+        if self.mode == "record":
+            return await self._record(model, messages, tools, **kwargs)
+        return await self._replay(messages, tools, bool(kwargs.get("stream")))
+
+    def report(self) -> Dict[str, Any]:
+        """Counts of served and unmatched requests, with details of each misalignment."""
+        return {
+            "path": self.path,
+            "mode": self.mode,
+            "recorded_interactions": len(self._interactions),
+            "calls": self.calls,
+            "hits": self.hits,
+            "misses": len(self.misalignments),
+            "misalignments": self.misalignments
+        }
+
+    # Recording
+
+    async def _record(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        start = time.perf_counter()
+        response = await super().acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        entry = {
+            "version": CASSETTE_VERSION,
+            "prompt_hash": prompt_hash(messages, tools),
+            "model": str(model),
+            "stream": bool(kwargs.get("stream")),
+            "request": json.loads(_canonical({"messages": messages, "tools": tools}))
+        }
+
+        if not entry["stream"]:
+            entry["latency_ms"] = (time.perf_counter() - start) * 1000
+            entry["response"] = response.model_dump_json()
+            self._append(entry)
+            return response
+
+        async def tee() -> AsyncIterator[Any]:
+            chunks = []
+            last = start
+            async for chunk in response:
+                now = time.perf_counter()
+                chunks.append({"delay_ms": (now - last) * 1000, "data": chunk.model_dump_json()})
+                last = now
+                yield chunk
+            entry["chunks"] = chunks
+            self._append(entry)
+
+        return tee()
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            entry["index"] = len(self._interactions)
+            self._interactions.append(entry)
+            with open(self.path, "a", encoding="utf-8") as cassette:
+                cassette.write(json.dumps(entry) + "\n")
+
+    # Replay
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get("version") != CASSETTE_VERSION:
+                        raise ValueError(f"Unsupported cassette version in {self.path}: {entry.get('version')}")
+                    self._interactions.append(entry)
+        for index, entry in enumerate(self._interactions):
+            self._by_hash.setdefault(entry["prompt_hash"], deque()).append(index)
+        logger.info(f"Loaded {len(self._interactions)} recorded model exchanges from {self.path}")
+
+    async def _replay(self, messages: Any, tools: Any, stream: bool):
+        digest = prompt_hash(messages, tools)
+        with self._lock:
+            index = self._match(digest, messages)
+            self._consumed.add(index)
+            self._position = max(self._position, index + 1)
+        entry = self._interactions[index]
+
+        if not stream:
+            return await self._replay_response(entry)
+        return self._replay_stream(entry)
+
+    def _match(self, digest: str, messages: Any) -> int:
+        pending = self._by_hash.get(digest)
+        if pending:
+            self.hits += 1
+            self._last_by_hash[digest] = pending.popleft()
+            return self._last_by_hash[digest]
+        if digest in self._last_by_hash:
+            # Same prompt asked more often than it was recorded; serve its last answer again
+            self.hits += 1
+            return self._last_by_hash[digest]
+
+        expected = next((i for i in range(self._position, len(self._interactions)) if i not in self._consumed), None)
+        self.misalignments.append(self._describe_miss(digest, messages, expected))
+        logger.warning(f"Cassette miss for prompt {digest} (call {self.calls}); "
+                       f"prompt diverges from recorded exchange {expected}")
+        if self.strict or expected is None:
+            raise CassetteMissError(f"No recorded exchange for prompt {digest} in {self.path}")
+        return expected
+
+    def _describe_miss(self, digest: str, messages: Any, expected: Optional[int]) -> Dict[str, Any]:
+        miss = {"call": self.calls, "prompt_hash": digest, "expected_index": expected}
+        if expected is None:
+            return miss
+        recorded = self._interactions[expected]["request"]["messages"]
+        actual = json.loads(_canonical(messages))
+        diverge = next((i for i, (a, b) in enumerate(zip(recorded, actual)) if _canonical(a) != _canonical(b)),
+                       min(len(recorded), len(actual)))
+        miss.update({
+            "expected_hash": self._interactions[expected]["prompt_hash"],
+            "first_divergent_message": diverge,
+            "recorded_messages": len(recorded),
+            "actual_messages": len(actual),
+            "recorded_excerpt": _excerpt(recorded[diverge]) if diverge < len(recorded) else None,
+            "actual_excerpt": _excerpt(actual[diverge]) if diverge < len(actual) else None
+        })
+        return miss
+
+    async def _replay_response(self, entry: Dict[str, Any]):
+        from litellm import ModelResponse
+
+        if "response" not in entry:
+            raise CassetteMissError(f"Exchange {entry['index']} was recorded streamed; replay it with streaming on")
+        await self._sleep(entry.get("latency_ms", 0))
+        return ModelResponse(**json.loads(entry["response"]))
+
+    def _replay_stream(self, entry: Dict[str, Any]):
+        from litellm.types.utils import ModelResponseStream
+
+        if "chunks" not in entry:
+            raise CassetteMissError(f"Exchange {entry['index']} was recorded unstreamed; replay it with streaming off")
+
+        async def chunks() -> AsyncIterator[Any]:
+            for chunk in entry["chunks"]:
+                await self._sleep(chunk["delay_ms"])
+                yield ModelResponseStream(**json.loads(chunk["data"]))
+
+        return chunks()
+
+    async def _sleep(self, recorded_ms: float) -> None:
+        if self.time_scale > 0 and recorded_ms > 0:
+            await asyncio.sleep(recorded_ms * self.time_scale / 1000)
+
+
+def create_llm_client() -> LiteLLMClient:
+    """
+    Build the LiteLLM client for the agent's model. A cassette is used when
+    CONSULTANT_LLM_CASSETTE is set (mode from CONSULTANT_LLM_CASSETTE_MODE, timing from
+    CONSULTANT_LLM_CASSETTE_TIME_SCALE, CONSULTANT_LLM_CASSETTE_STRICT to fail on misses).
+    """
+    path = os.getenv("CONSULTANT_LLM_CASSETTE")
+    if not path:
+        return LiteLLMClient()
+    return CassetteLiteLLMClient(
+        path=path,
+        mode=os.getenv("CONSULTANT_LLM_CASSETTE_MODE", "replay"),
+        time_scale=float(os.getenv("CONSULTANT_LLM_CASSETTE_TIME_SCALE", "1.0")),
+        strict=os.getenv("CONSULTANT_LLM_CASSETTE_STRICT", "false").lower() in ("1", "true", "yes", "on")
+    )
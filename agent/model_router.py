@@ -0,0 +1,296 @@
+"""
+Model routing for the Strategic Consultant Agent's LiteLLM calls.
+
+Wraps the LiteLLM client (plain or cassette) with an ordered list of backends: the primary
+model followed by fallbacks (another model, or the same model on another endpoint). Each
+completion goes to the first backend whose circuit breaker admits it. If the response has
+not arrived within the hedge delay, a second request is fired and whichever answers first
+wins (for streams, whichever produces its first chunk first); the loser is cancelled.
+Retryable failures (rate limits, 5xx, timeouts, connection errors) fail over to the next
+backend, and repeated failures open a backend's breaker for a cool-down period.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from google.adk.models.lite_llm import LiteLLMClient
+
+from .llm_cassette import create_llm_client
+
+logger = logging.getLogger(__name__)
+
+# Breaker states, also the value of the consultant_llm_breaker_state gauge
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+# One breaker per backend, shared by every client routing to it
+_BREAKERS: Dict[str, "CircuitBreaker"] = {}
+
+
+class BackendsUnavailableError(Exception):
+    """Raised when every backend's circuit breaker is open."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed completion may succeed elsewhere: rate limits, 408, 5xx, timeouts, connection errors."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # LiteLLM connection/timeout errors carry no status; request errors (bad prompt) do
+        return type(error).__name__ in ("APIConnectionError", "Timeout", "APITimeoutError", "ServiceUnavailableError")
+    return status in (408, 429) or status >= 500
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after `reset_timeout` lets one probe through (half-open)."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> int:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the single probe when half-open)."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """Give back an unused half-open probe (e.g. the attempt was cancelled)."""
+        self._probing = False
+
+
+class Backend:
+    """One place a completion can be sent: a LiteLLM model id and optional API base."""
+
+    def __init__(self, model: str, api_base: Optional[str] = None, breaker: Optional[CircuitBreaker] = None):
+        self.model = model
+        self.api_base = api_base
+        self.breaker = breaker or CircuitBreaker()
+        self.name = f"{model}@{api_base}" if api_base else model
+
+
+class RoutingLiteLLMClient(LiteLLMClient):
+    """LiteLLM client that hedges, fails over across backends and trips per-backend breakers."""
+
+    def __init__(self, backends: List[Backend], transport: Optional[LiteLLMClient] = None,
+                 hedge_delay: Optional[float] = None, max_hedge_ratio: float = 0.2):
+        """
+        Args:
+            backends: Primary first, then fallbacks in order of preference
+            transport: Client that performs each request (defaults to a plain LiteLLMClient)
+            hedge_delay: Seconds to wait for a response before firing a hedged request (None disables hedging)
+            max_hedge_ratio: Upper bound on hedged requests as a fraction of calls, capping the extra spend
+        """
+        if not backends:
+            raise ValueError("At least one backend is required")
+        self.backends = backends
+        self.transport = transport or LiteLLMClient()
+        self.hedge_delay = hedge_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.calls = 0
+        self.hedges = 0
+        self._metrics: Optional[Dict[str, Any]] = None
+
+    def register_metrics(self, registry) -> None:
+        """Publish per-backend outcomes, hedge and fallback counts and breaker states."""
+        self._metrics = {
+            "calls": registry.counter("consultant_llm_calls_total", "Model completions requested by the agent"),
+            "attempts": registry.counter("consultant_llm_attempts_total",
+                                         "Requests sent to a backend, by outcome (success, error, cancelled)",
+                                         ["backend", "outcome"]),
+            "hedges": registry.counter("consultant_llm_hedges_total", "Hedged requests fired after the hedge delay"),
+            "hedge_wins": registry.counter("consultant_llm_hedge_wins_total", "Completions won by the hedged request"),
+            "fallbacks": registry.counter("consultant_llm_fallbacks_total",
+                                          "Failovers to the next backend after a retryable error", ["backend"])
+        }
+        breaker_state = registry.gauge("consultant_llm_breaker_state",
+                                       "Circuit breaker state per backend (0 closed, 1 half-open, 2 open)", ["backend"])
+
+        def refresh() -> None:
+            for backend in self.backends:
+                breaker_state.set(backend.breaker.state, backend=backend.name)
+        registry.add_callback(refresh)
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        self.calls += 1
+        self._count("calls")
+        result = await self._race(messages, tools, kwargs)
+        if not kwargs.get("stream"):
+            return result
+        first_chunk, chunks = result
+        return self._resume_stream(first_chunk, chunks)
+
+    # Racing and failover
+
+    async def _race(self, messages: Any, tools: Any, kwargs: Dict[str, Any]) -> Any:
+        queue = list(self.backends)
+        pending: Dict[asyncio.Task, Tuple[Backend, bool]] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def next_backend() -> Optional[Backend]:
+            while queue:
+                backend = queue.pop(0)
+                if backend.breaker.allow():
+                    return backend
+            return None
+
+        def launch(backend: Backend, hedge: bool = False) -> None:
+            task = asyncio.ensure_future(self._attempt(backend, messages, tools, kwargs))
+            pending[task] = (backend, hedge)
+
+        first = next_backend()
+        if first is None:
+            raise BackendsUnavailableError(f"All model backends are unavailable: "
+                                           f"{', '.join(backend.name for backend in self.backends)}")
+        launch(first)
+        try:
+            while pending:
+                timeout = self.hedge_delay if not hedged and self._may_hedge() else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow response: hedge on the next backend, or the same one if there is no other
+                    hedged = True
+                    self.hedges += 1
+                    self._count("hedges")
+                    target = next_backend() or next(iter(pending.values()))[0]
+                    logger.info(f"Hedging model request on {target.name} after {self.hedge_delay:.2f}s")
+                    launch(target, hedge=True)
+                    continue
+
+                for task in done:
+                    backend, hedge = pending.pop(task)
+                    error = task.exception()
+                    if error is None or not is_retryable(error):
+                        # A request error (e.g. a bad prompt) still means the backend is healthy
+                        backend.breaker.record_success()
+                        self._count("attempts", backend=backend.name, outcome="success" if error is None else "error")
+                        if error is not None:
+                            raise error
+                        if hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+
+                    last_error = error
+                    backend.breaker.record_failure()
+                    self._count("attempts", backend=backend.name, outcome="error")
+                    logger.warning(f"Model backend {backend.name} failed: {type(error).__name__}: {error}")
+                    if not pending:
+                        fallback = next_backend()
+                        if fallback is not None:
+                            self._count("fallbacks", backend=fallback.name)
+                            logger.info(f"Falling back to model backend {fallback.name}")
+                            launch(fallback)
+            raise last_error
+        finally:
+            # Losers (and attempts finished in the same wakeup as the winner) are cancelled or closed
+            for task, (backend, _) in pending.items():
+                self._discard(task, backend)
+
+    async def _attempt(self, backend: Backend, messages: Any, tools: Any, kwargs: Dict[str, Any]) -> Any:
+        """Send one request to `backend`; for streams, wait for the first chunk so hedges race on it."""
+        request = dict(kwargs)
+        request.pop("api_base", None)
+        if backend.api_base:
+            request["api_base"] = backend.api_base
+        response = await self.transport.acompletion(model=backend.model, messages=messages, tools=tools, **request)
+        if not request.get("stream"):
+            return response
+        chunks = response.__aiter__()
+        return await chunks.__anext__(), chunks
+
+    def _discard(self, task: asyncio.Task, backend: Backend) -> None:
+        """Cancel a losing attempt, or close its stream if it already produced a first chunk."""
+        backend.breaker.release_probe()
+        self._count("attempts", backend=backend.name, outcome="cancelled")
+        if not task.done():
+            task.cancel()
+            return
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        close = getattr(result[1], "aclose", None) if isinstance(result, tuple) else None
+        if close is not None:
+            asyncio.ensure_future(close())
+
+    @staticmethod
+    async def _resume_stream(first_chunk: Any, chunks: Any):
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    def _may_hedge(self) -> bool:
+        return self.hedge_delay is not None and self.hedges < self.max_hedge_ratio * self.calls
+
+    def _count(self, name: str, **labels: Any) -> None:
+        if self._metrics:
+            self._metrics[name].inc(**labels)
+
+
+def _parse_backends(spec: str) -> List[Backend]:
+    """Parse "model[@api_base],..." into backends."""
+    backends = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, api_base = item.partition("@")
+        backends.append(Backend(model.strip(), api_base.strip() or None))
+    return backends
+
+
+def create_model_client(model: str, api_base: Optional[str] = None,
+                        transport: Optional[LiteLLMClient] = None) -> LiteLLMClient:
+    """
+    Build the LiteLLM client for the agent's model. CONSULTANT_MODEL_FALLBACKS
+    ("model[@api_base],...") adds fallback backends and CONSULTANT_HEDGE_DELAY_MS enables
+    hedging (capped at CONSULTANT_MAX_HEDGE_RATIO of calls). Breakers open after
+    CONSULTANT_BREAKER_FAILURES consecutive failures for CONSULTANT_BREAKER_RESET_SECONDS.
+    Without fallbacks or hedging the plain (or cassette) client is returned unchanged.
+    Pass `transport` to share one underlying client (e.g. a cassette) between models.
+    """
+    transport = transport or create_llm_client()
+    fallbacks = _parse_backends(os.getenv("CONSULTANT_MODEL_FALLBACKS", ""))
+    hedge_delay_ms = float(os.getenv("CONSULTANT_HEDGE_DELAY_MS", "0"))
+    if not fallbacks and hedge_delay_ms <= 0:
+        return transport
+
+    failure_threshold = int(os.getenv("CONSULTANT_BREAKER_FAILURES", "5"))
+    reset_timeout = float(os.getenv("CONSULTANT_BREAKER_RESET_SECONDS", "30"))
+    backends = [Backend(model, api_base)] + fallbacks
+    for backend in backends:
+        backend.breaker = _BREAKERS.setdefault(backend.name, CircuitBreaker(failure_threshold, reset_timeout))
+    logger.info(f"Model routing over {', '.join(backend.name for backend in backends)}"
+                + (f", hedging after {hedge_delay_ms:.0f}ms" if hedge_delay_ms > 0 else ""))
+    return RoutingLiteLLMClient(
+        backends,
+        transport=transport,
+        hedge_delay=hedge_delay_ms / 1000 if hedge_delay_ms > 0 else None,
+        max_hedge_ratio=float(os.getenv("CONSULTANT_MAX_HEDGE_RATIO", "0.2"))
+    )
@@ -0,0 +1,133 @@
+"""
+Stage-aware model tiering for the Strategic Consultant Agent.
+
+The gathering stages only need a short, polite question (usually via a widget tool), so
+they run on a cheap, low-latency tier. The analysis phase, which scores priorities on the
+Eisenhower and Impact/Effort matrices, runs on the strong tier. Each tier fixes the model,
+the maximum output tokens and the temperature; TaskManager runs each turn on the tier its
+stage maps to and records which tier served it.
+"""
+
+import os
+import logging
+from typing import Dict, Optional
+
+from google.adk.agents import Agent
+from google.adk.models.lite_llm import LiteLlm
+from google.genai import types as genai_types
+
+from .model_router import create_model_client
+
+logger = logging.getLogger(__name__)
+
+# Tier used for each conversation stage (see ConversationState.classify); unlisted stages use DEFAULT_TIER
+STAGE_TIERS = {
+    "initial_engagement": "fast",
+    "role_context_gathering": "fast",
+    "performance_data_gathering": "fast",
+    "analysis_phase": "strong",
+    "consultation_complete": "fast"
+}
+DEFAULT_TIER = "strong"
+
+
+class ModelTier:
+    """A model configuration a turn can run on."""
+
+    def __init__(self, name: str, model: str, max_output_tokens: Optional[int] = None,
+                 temperature: Optional[float] = None, api_base: Optional[str] = None):
+        self.name = name
+        self.model = model
+        self.max_output_tokens = max_output_tokens
+        self.temperature = temperature
+        self.api_base = api_base
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "max_output_tokens": self.max_output_tokens,
+            "temperature": self.temperature
+        }
+
+
+class ModelTiers:
+    """The tier table plus the stage mapping; builds one agent variant per tier."""
+
+    def __init__(self, tiers: Dict[str, ModelTier], stage_tiers: Optional[Dict[str, str]] = None,
+                 default_tier: str = DEFAULT_TIER):
+        """
+        Args:
+            tiers: Tiers by name
+            stage_tiers: Tier name per conversation stage (defaults to STAGE_TIERS)
+            default_tier: Tier for stages not in stage_tiers
+        """
+        self.tiers = tiers
+        self.stage_tiers = dict(STAGE_TIERS if stage_tiers is None else stage_tiers)
+        self.default_tier = default_tier
+        for stage, name in list(self.stage_tiers.items()) + [("(default)", default_tier)]:
+            if name not in tiers:
+                raise ValueError(f"Stage {stage} maps to unknown model tier {name!r}")
+
+    def tier_for(self, stage: str) -> ModelTier:
+        return self.tiers[self.stage_tiers.get(stage, self.default_tier)]
+
+    def build_agent(self, agent: Agent, tier: ModelTier) -> Agent:
+        """A copy of `agent` (same name, instruction and tools) running on `tier`."""
+        config = agent.generate_content_config.model_copy() if agent.generate_content_config \
+            else genai_types.GenerateContentConfig()
+        if tier.max_output_tokens is not None:
+            config.max_output_tokens = tier.max_output_tokens
+        if tier.temperature is not None:
+            config.temperature = tier.temperature
+        # Share the base agent's transport so a cassette records/replays every tier in one file
+        base_client = getattr(agent.model, "llm_client", None)
+        transport = getattr(base_client, "transport", base_client)
+        model = LiteLlm(tier.model, llm_client=create_model_client(tier.model, tier.api_base, transport),
+                        **({"api_base": tier.api_base} if tier.api_base else {}))
+        return agent.clone(update={"model": model, "generate_content_config": config})
+
+
+def _optional(name: str, cast):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else None
+
+
+def _tier_from_env(name: str, model: str, max_output_tokens: int, temperature: float,
+                   api_base: Optional[str]) -> ModelTier:
+    prefix = f"CONSULTANT_TIER_{name.upper()}_"
+    max_tokens = _optional(prefix + "MAX_OUTPUT_TOKENS", int)
+    tier_temperature = _optional(prefix + "TEMPERATURE", float)
+    return ModelTier(
+        name,
+        os.getenv(prefix + "MODEL", model),
+        max_output_tokens=max_tokens if max_tokens is not None else max_output_tokens,
+        temperature=tier_temperature if tier_temperature is not None else temperature,
+        api_base=os.getenv(prefix + "API_BASE", api_base)
+    )
+
+
+def create_model_tiers(default_model: str, default_api_base: Optional[str] = None) -> Optional[ModelTiers]:
+    """
+    Build the tier table from the environment, or None when CONSULTANT_MODEL_TIERING=false.
+
+    Two tiers are defined: "fast" (default gemini/gemini-2.5-flash-lite, 1024 output tokens,
+    temperature 0.4) and "strong" (default: the agent's own model, 8192 tokens, 0.7). When the
+    agent's model points at a custom endpoint, both tiers default to that model. Each is
+    adjusted with CONSULTANT_TIER_<NAME>_MODEL / _API_BASE / _MAX_OUTPUT_TOKENS / _TEMPERATURE,
+    and CONSULTANT_STAGE_TIERS ("analysis_phase=strong,initial_engagement=fast") remaps stages.
+    """
+    if os.getenv("CONSULTANT_MODEL_TIERING", "true").lower() in ("0", "false", "no", "off"):
+        return None
+    tiers = {
+        "fast": _tier_from_env("fast", default_model if default_api_base else "gemini/gemini-2.5-flash-lite",
+                               1024, 0.4, default_api_base),
+        "strong": _tier_from_env("strong", default_model, 8192, 0.7, default_api_base)
+    }
+    stage_tiers = dict(STAGE_TIERS)
+    for item in filter(None, (part.strip() for part in os.getenv("CONSULTANT_STAGE_TIERS", "").split(","))):
+        stage, _, tier = item.partition("=")
+        stage_tiers[stage.strip()] = tier.strip()
+    model_tiers = ModelTiers(tiers, stage_tiers)
+    logger.info("Model tiers: " + ", ".join(f"{tier.name}={tier.model}" for tier in tiers.values()))
+    return model_tiers
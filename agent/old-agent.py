@@ -1,20 +1,62 @@
 # No local keyword extraction — the agent must decide the focus keyword.
-# The tool takes a focus_keyword and returns selected HTML snippets from TAFE NSW search.
+# The tool takes a focus_keyword and returns a compact, ranked list of courses from TAFE NSW search.
 
 from google.adk.agents import Agent
-from urllib.parse import quote_plus
 import os
+import sys
 from typing import List
 
 # Import selenium components for web scraping
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 
+# Add the parent directory (backend) to the Python path to allow importing common
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from common.browser_pool import create_browser_pool, chrome_driver_factory
+from common.course_search import create_course_search_fetcher, course_search_url, format_course_record
+from common.course_cache import create_course_search_cache
+from common.course_index import open_course_index, rank_records
+from common.metrics import MetricsRegistry, serve_metrics
+
+# Warm headless browsers shared by every search, started on the first browser fallback (most
+# searches never need one); ChromeDriver is resolved once, on the first launch
+BROWSER_POOL = create_browser_pool(chrome_driver_factory(page_load_timeout=20))
+
+# Pool utilisation and queue waits; served on BROWSER_POOL_METRICS_PORT if set
+METRICS = MetricsRegistry()
+BROWSER_POOL.register_metrics(METRICS)
+if os.getenv("BROWSER_POOL_METRICS_PORT"):
+    serve_metrics(METRICS, int(os.getenv("BROWSER_POOL_METRICS_PORT")))
+
+
+def _collect_course_divs(driver, user_query: str, delay: float) -> List[str]:
+    """Load the course search page in a pooled browser and return the raw HTML of each course div."""
+    url = course_search_url(user_query)
+
+    print(f"Navigating to: {url}")
+    driver.get(url)
+
+    # Wait for the course results to load
+    wait = WebDriverWait(driver, 20)  # Increased timeout for potentially slow loading
+    wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'flex.items-start.px-3.py-4.lg\\:px-0')))
+
+    if delay:
+        print(f"Page loaded. Waiting for {delay} seconds for additional content.")
+        time.sleep(delay)  # Additional delay to ensure all dynamic content loads
+
+    # Find all divs with the specified class
+    course_divs = driver.find_elements(By.CLASS_NAME, 'flex.items-start.px-3.py-4.lg\\:px-0')
+
+    raw_html_contents = []
+    for div in course_divs:
+        raw_html_contents.append(div.get_attribute('outerHTML'))
+
+    print(f"Successfully found {len(raw_html_contents)} course divs for query: '{user_query}'")
+    return raw_html_contents
+
 
 def scrape_tafe_courses_selenium(user_query: str, delay: float = 1.0) -> List[str]:
     """
@@ -27,83 +69,72 @@ def scrape_tafe_courses_selenium(user_query: str, delay: float = 1.0) -> List[st
     Returns:
         List[str]: List of raw HTML strings of the course divs
     """
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')  # Run in headless mode
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    # On Windows, Chrome should be in the default location
-    # options.binary_location = 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
-
-    driver = None
     try:
-        # Setup Chrome WebDriver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-
-        # URL encode the user query
-        encoded_query = quote_plus(user_query)
-        url = f"https://www.tafensw.edu.au/course-search?keyword={encoded_query}"
-
-        print(f"Navigating to: {url}")
-        driver.get(url)
+        return BROWSER_POOL.run(_collect_course_divs, user_query, delay)
+    except Exception as e:
+        print(f"An error occurred during scraping: {e}")
+        return []
 
-        # Wait for the course results to load
-        wait = WebDriverWait(driver, 20)  # Increased timeout for potentially slow loading
-        wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'flex.items-start.px-3.py-4.lg\\:px-0')))
 
-        print(f"Page loaded. Waiting for {delay} seconds for additional content.")
-        time.sleep(delay)  # Additional delay to ensure all dynamic content loads
+async def scrape_tafe_courses_async(user_query: str, delay: float = 1.0) -> List[str]:
+    """Same as scrape_tafe_courses_selenium, awaiting the pooled browser instead of blocking the event loop."""
+    try:
+        return await BROWSER_POOL.arun(_collect_course_divs, user_query, delay)
+    except Exception as e:
+        print(f"An error occurred during scraping: {e}")
+        return []
 
-        # Find all divs with the specified class
-        course_divs = driver.find_elements(By.CLASS_NAME, 'flex.items-start.px-3.py-4.lg\\:px-0')
 
-        raw_html_contents = []
-        for div in course_divs:
-            raw_html_contents.append(div.get_attribute('outerHTML'))
+# Static HTTP fetch first; the browser pool only when the page has no static results
+COURSE_SEARCH = create_course_search_fetcher(browser_search=lambda keyword: scrape_tafe_courses_async(keyword, delay=0.0))
+COURSE_SEARCH.register_metrics(METRICS)
 
-        print(f"Successfully found {len(raw_html_contents)} course divs for query: '{user_query}'")
-        return raw_html_contents
+# Listings change rarely and keywords repeat: memory + SQLite cache of course records, refreshed in the background once stale
+COURSE_CACHE = create_course_search_cache(COURSE_SEARCH.search_records)
+COURSE_CACHE.register_metrics(METRICS)
 
-    except Exception as e:
-        print(f"An error occurred during scraping: {e}")
-        return []
-    finally:
-        if driver:
-            driver.quit()  # Ensure the browser is closed
+# Offline catalogue index (python -m common.course_index ingest|crawl); queried before the live site when built
+COURSE_INDEX = open_course_index()
+# Courses returned to the model per search
+COURSE_RESULTS_LIMIT = int(os.getenv("COURSE_RESULTS_LIMIT", "8"))
+if COURSE_INDEX is not None:
+    COURSE_INDEX.register_metrics(METRICS)
 
 
-def realtime_courses_search__tool(focus_keyword: str) -> str:
+async def realtime_courses_search__tool(focus_keyword: str) -> str:
     """
-    Tool: Given a single focus keyword, hit the TAFE NSW course search,
-    and return ONLY the HTML of divs with class="flex items-start px-3 py-4 lg:px-0".
+    Tool: Given a single focus keyword, search TAFE NSW courses and return the best matches,
+    one line each: title [code] | mode | location | duration | URL.
     """
     focus_keyword = (focus_keyword or "").strip()
     if not focus_keyword:
         return "ERROR: focus_keyword is empty."
 
     try:
-        # Use Selenium to scrape the course divs
-        snippets = scrape_tafe_courses_selenium(focus_keyword, delay=0.0)
-        
-        if not snippets:
+        # Ranked matches from the local index; otherwise cached course records, else fetched over HTTP
+        # (or with a pooled browser if the page has none) and ranked here
+        records = []
+        if COURSE_INDEX is not None:
+            found, hits = COURSE_INDEX.search_counted(focus_keyword, COURSE_RESULTS_LIMIT)
+            records = [record for _, record in hits]
+        if not records:
+            results = await COURSE_CACHE.get(focus_keyword)
+            found = len(results)
+            records = rank_records(results, focus_keyword, COURSE_RESULTS_LIMIT)
+
+        if not records:
             return f"No course results found for keyword: {focus_keyword}"
-            
-        # Join all the HTML snippets with newlines for better readability
-        combined = "\n\n".join(snippets)
-        
-        # Print the scraped content
-        print(f"FOCUS_KEYWORD: {focus_keyword}")
-        print(f"SOURCE_URL: https://www.tafensw.edu.au/course-search?keyword={quote_plus(focus_keyword)}")
-        print(f"FOUND: {len(snippets)} course divs")
-        print("HTML_SNIPPETS:")
-        print(combined)
+
+        # One compact line per course instead of the cards' markup
+        courses = "\n".join(f"{number}. {format_course_record(record)}" for number, record in enumerate(records, 1))
+        print(f"FOCUS_KEYWORD: {focus_keyword} | FOUND: {found} courses | RETURNED: {len(records)}")
 
         # Return to the agent
         return f"""FOCUS_KEYWORD: {focus_keyword}
-SOURCE_URL: https://www.tafensw.edu.au/course-search?keyword={quote_plus(focus_keyword)}
-FOUND: {len(snippets)} course divs
-HTML_SNIPPETS:
-{combined}"""
+SOURCE_URL: {course_search_url(focus_keyword)}
+FOUND: {found} courses (top {len(records)} shown)
+COURSES:
+{courses}"""
 
     except Exception as e:
         error_msg = f"ERROR: Failed to retrieve course information: {str(e)}"
@@ -121,7 +152,7 @@ root_agent = Agent(
     Responsibility:
     - You must choose the single most relevant focus keyword from the user's query yourself.
     - Call the tool 'realtime_courses_search__tool' with that focus keyword.
-    - Read only the returned HTML and answer strictly based on that content.
+    - Read only the returned course list and answer strictly based on that content.
     - If the tool returns an error or empty content, explain that you couldn't retrieve results.
 
     Knowledge:
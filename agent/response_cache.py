@@ -0,0 +1,265 @@
+"""
+Response cache for repeatable consultation turns.
+
+Greetings, the farewell after "thanks" and clarification questions about a widget get the
+same answer whoever asks. Such turns are keyed on the normalised dynamic prompt: the
+conversation stage, strategic focus, model tier, the whole transcript so far and the
+user's message, with the stakeholder's name, role and department replaced by placeholders.
+The stored reply is de-personalised the same way and re-personalised on a hit; a reply
+that still mentions part of the stakeholder's name (e.g. their first name) is not stored.
+
+Lookups try an exact match first, then (if enabled) a similarity match among entries
+sharing the same stage, focus and preceding context, using hashed character n-gram
+embeddings. Entries expire after a TTL, the least recently used are evicted beyond
+`max_entries`, and the whole cache is dropped when the prompt fingerprint (agent
+instruction plus prompt templates) changes.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Stages whose replies may be cached. The key covers the whole transcript, since a reply can
+# draw on anything said earlier in the session. Analysis also runs tools, so it is never cached.
+CACHEABLE_STAGES = frozenset({
+    "initial_engagement",
+    "consultation_complete",
+    "role_context_gathering",
+    "performance_data_gathering"
+})
+
+# Only short messages (greetings, thanks, clarifications) are worth caching
+MAX_CACHEABLE_MESSAGE_CHARS = 200
+
+# Context fields re-applied to cached replies, with their placeholders
+PERSONAL_FIELDS = ("name", "role", "department")
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def _placeholder(field: str) -> str:
+    return "{{" + field + "}}"
+
+
+class Personalisation:
+    """Swaps a stakeholder's details for placeholders and back."""
+
+    def __init__(self, context: Dict[str, Any]):
+        values = {}
+        for field in PERSONAL_FIELDS:
+            value = context.get(field)
+            # Very short values ("IT") would match inside ordinary words
+            if isinstance(value, str) and len(value.strip()) >= 3:
+                values[field] = value.strip()
+        self.values = values
+        # Longest first, so "Riley Smith" is replaced before "Riley"
+        ordered = sorted(values.items(), key=lambda item: len(item[1]), reverse=True)
+        self._patterns = [(re.compile(r"\b" + re.escape(value) + r"\b", re.IGNORECASE), _placeholder(field))
+                          for field, value in ordered]
+        # Parts of the name ("Sam" of "Sam Taylor") have no placeholder; a reply using one is not reusable
+        pieces = [piece for piece in values.get("name", "").split() if len(piece) >= 3]
+        self._name_pieces = re.compile(r"\b(?:" + "|".join(map(re.escape, pieces)) + r")\b",
+                                       re.IGNORECASE) if pieces else None
+
+    def strip(self, text: str) -> str:
+        for pattern, placeholder in self._patterns:
+            text = pattern.sub(placeholder, text)
+        return text
+
+    def identifies(self, text: str) -> bool:
+        """Whether de-personalised text still names the stakeholder (first name, surname)."""
+        return bool(self._name_pieces and self._name_pieces.search(text))
+
+    def apply(self, text: str) -> Optional[str]:
+        """Fill placeholders with this stakeholder's details; None if one of them is unknown."""
+        for field in PERSONAL_FIELDS:
+            placeholder = _placeholder(field)
+            if placeholder in text:
+                if field not in self.values:
+                    return None
+                text = text.replace(placeholder, self.values[field])
+        return text
+
+
+def normalise(text: str, personalisation: Personalisation) -> str:
+    """Case-, whitespace- and edge-punctuation-insensitive form of a message, without personal details."""
+    text = _WHITESPACE.sub(" ", personalisation.strip(text).lower()).strip()
+    return _EDGE_PUNCTUATION.sub("", text)
+
+
+def embed(text: str, dimensions: int = 512) -> Dict[int, float]:
+    """Unit-length sparse vector of hashed character trigrams (word-bounded)."""
+    vector: Dict[int, float] = {}
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            bucket = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode("utf-8"), digest_size=4).digest(),
+                                    "little") % dimensions
+            vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {bucket: weight / norm for bucket, weight in vector.items()} if norm else {}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+class CacheKey:
+    """Exact key and similarity bucket for one turn, with the personalisation used to build it."""
+
+    __slots__ = ("exact", "bucket", "message", "personalisation")
+
+    def __init__(self, exact: str, bucket: str, message: str, personalisation: Personalisation):
+        self.exact = exact
+        self.bucket = bucket
+        self.message = message
+        self.personalisation = personalisation
+
+
+class _Entry:
+    __slots__ = ("reply", "bucket", "vector", "stored_at", "hits")
+
+    def __init__(self, reply: str, bucket: str, vector: Optional[Dict[int, float]]):
+        self.reply = reply
+        self.bucket = bucket
+        self.vector = vector
+        self.stored_at = time.time()
+        self.hits = 0
+
+
+class ResponseCache:
+    """Exact and similarity lookup of de-personalised replies, with LRU/TTL eviction."""
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 24 * 3600,
+                 similarity_threshold: float = 0.0):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used are evicted
+            ttl_seconds: Age after which an entry is no longer served
+            similarity_threshold: Minimum cosine similarity for a similarity hit (0 disables that tier)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.fingerprint: Optional[str] = None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def ensure_fingerprint(self, fingerprint: str) -> None:
+        """Drop every entry if the prompts they were generated from have changed."""
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                if self._entries:
+                    logger.info(f"Prompt fingerprint changed ({self.fingerprint} -> {fingerprint}); "
+                                f"dropping {len(self._entries)} cached responses")
+                self._entries.clear()
+                self._buckets.clear()
+                self.fingerprint = fingerprint
+
+    def cacheable(self, stage: str, message: str) -> bool:
+        """Whether a turn could be cached at all, before its transcript is read."""
+        return stage in CACHEABLE_STAGES and len(message) <= MAX_CACHEABLE_MESSAGE_CHARS
+
+    def key(self, stage: str, focus: str, tier: str, history: List[Dict[str, Any]], message: str,
+            personalisation: Personalisation) -> Optional[CacheKey]:
+        """Cache key for a turn given its whole transcript, or None if the turn is not cacheable."""
+        if not self.cacheable(stage, message):
+            return None
+        context = [(item.get("sender"), normalise(item.get("message", ""), personalisation)) for item in history]
+        normalised = normalise(message, personalisation)
+        if not normalised:
+            return None
+        bucket = hashlib.sha256(json.dumps([self.fingerprint, tier, stage, focus, context]).encode("utf-8")).hexdigest()
+        exact = hashlib.sha256(json.dumps([bucket, normalised]).encode("utf-8")).hexdigest()
+        return CacheKey(exact, bucket, normalised, personalisation)
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[str], Optional[str], float]:
+        """Return (reply template, "exact"/"similar", similarity) or (None, None, 0.0) on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key.exact)
+            if entry is not None and now - entry.stored_at <= self.ttl_seconds:
+                self._touch(key.exact, entry)
+                return entry.reply, "exact", 1.0
+
+            if self.similarity_threshold <= 0:
+                return None, None, 0.0
+            vector = embed(key.message)
+            best, best_score = None, self.similarity_threshold
+            for exact in self._buckets.get(key.bucket, ()):
+                candidate = self._entries[exact]
+                if now - candidate.stored_at > self.ttl_seconds:
+                    continue
+                score = cosine(vector, candidate.vector)
+                if score >= best_score:
+                    best, best_score = exact, score
+            if best is None:
+                return None, None, 0.0
+            entry = self._entries[best]
+            self._touch(best, entry)
+            return entry.reply, "similar", round(best_score, 4)
+
+    def store(self, key: CacheKey, reply: str) -> bool:
+        """Store a de-personalised reply; refused (False) if it still identifies the stakeholder."""
+        if key.personalisation.identifies(reply):
+            logger.debug("Not caching a reply that mentions part of the stakeholder's name")
+            return False
+        vector = embed(key.message) if self.similarity_threshold > 0 else None
+        with self._lock:
+            if key.exact in self._entries:
+                self._remove(key.exact)
+            self._entries[key.exact] = _Entry(reply, key.bucket, vector)
+            self._buckets.setdefault(key.bucket, []).append(key.exact)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "buckets": len(self._buckets), "fingerprint": self.fingerprint}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def _touch(self, exact: str, entry: _Entry) -> None:
+        entry.hits += 1
+        self._entries.move_to_end(exact)
+
+    def _remove(self, exact: str) -> None:
+        entry = self._entries.pop(exact)
+        members = self._buckets.get(entry.bucket)
+        if members is not None:
+            members.remove(exact)
+            if not members:
+                del self._buckets[entry.bucket]
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Build the response cache configured by environment variables, or None when
+    CONSULTANT_RESPONSE_CACHE=false. CONSULTANT_RESPONSE_CACHE_MAX_ENTRIES and
+    CONSULTANT_RESPONSE_CACHE_TTL_SECONDS bound it; CONSULTANT_RESPONSE_CACHE_SIMILARITY
+    (e.g. 0.9) enables the similarity tier.
+    """
+    if os.getenv("CONSULTANT_RESPONSE_CACHE", "true").lower() in ("0", "false", "no", "off"):
+        return None
+    return ResponseCache(
+        max_entries=int(os.getenv("CONSULTANT_RESPONSE_CACHE_MAX_ENTRIES", "2000")),
+        ttl_seconds=float(os.getenv("CONSULTANT_RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600))),
+        similarity_threshold=float(os.getenv("CONSULTANT_RESPONSE_CACHE_SIMILARITY", "0"))
+    )
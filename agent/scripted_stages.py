@@ -0,0 +1,92 @@
+"""
+Scripted consultation turns for the Strategic Consultant Agent.
+The welcome, the five role context questions and the closing farewell are fixed by Riley's
+instruction, so they are answered from templates instead of a model round trip.
+"""
+
+import os
+from typing import Dict, Any, Optional
+
+from .conversation_state import ConversationState
+from .keyword_matcher import KeywordMatcher
+
+WELCOME_TEMPLATE = (
+    "G'day {name}! I'm Riley, your strategic consultant.{position} To provide you with the best strategic "
+    "support, I'd like to understand your experience and working relationships better. "
+    "Let's start with your background:\n\n{question}"
+)
+POSITION_TEMPLATE = " I can see you're working as {role} in {department}."
+
+# The role context questions from the agent instruction, in order
+ROLE_CONTEXT_QUESTIONS = [
+    "How many years have you been in your current position?",
+    "How long have you been with TAFE NSW overall?",
+    "Do you have any direct reports? If so, how many?",
+    "Who are the key internal stakeholders you work with most regularly?",
+    "What about external stakeholders - who do you collaborate with outside TAFE NSW?"
+]
+
+# Rotated in front of each follow-up question
+ACKNOWLEDGEMENTS = ["Thanks, {name}.", "That's helpful, thank you.", "Got it, {name}.", "Thanks for sharing that."]
+
+FAREWELL_TEMPLATE = (
+    "You're very welcome, {name}! It's been a real pleasure working through your priorities with you. "
+    "All the best with putting them into action, and feel free to come back any time you'd like to revisit them."
+)
+
+# Longest user message still treated as a plain answer to a scripted question
+MAX_SCRIPTED_ANSWER_CHARS = 300
+
+# A user message with any of these is asking for something, so the model handles it
+OFF_SCRIPT_MATCHER = KeywordMatcher({
+    "off_script": [
+        "?", "can you", "could you", "would you", "please explain", "what do you mean", "tell me",
+        "help me", "rather not", "skip", "instead", "not sure what"
+    ]
+})
+
+
+class ScriptedStages:
+    """
+    Answers the scripted turns of a consultation.
+
+    `reply` returns the templated response for the turn, or None when the turn needs the
+    model: the conversation is past the scripted stages, the previous AI message was not
+    a scripted question, or the user's message looks like more than a plain answer.
+    """
+
+    def reply(self, stage: str, state: ConversationState, message: str, context: Dict[str, Any]) -> Optional[str]:
+        """
+        Args:
+            stage: Conversation stage classified for this turn
+            state: Stage tracker covering the transcript before this turn
+            message: The user's message
+            context: Request context with the stakeholder's name, role and department
+        """
+        if len(message) > MAX_SCRIPTED_ANSWER_CHARS or OFF_SCRIPT_MATCHER.scan(message):
+            return None
+
+        name = context.get('name') or 'there'
+
+        if stage == "initial_engagement" and state.cursor == 0:
+            role, department = context.get('role'), context.get('department')
+            position = POSITION_TEMPLATE.format(role=role, department=department) if role and department else ""
+            return WELCOME_TEMPLATE.format(name=name, position=position, question=ROLE_CONTEXT_QUESTIONS[0])
+
+        if stage == "role_context_gathering" and state.last_ai_context_question:
+            asked = state.context_questions_asked
+            if 0 < asked < len(ROLE_CONTEXT_QUESTIONS):
+                acknowledgement = ACKNOWLEDGEMENTS[asked % len(ACKNOWLEDGEMENTS)].format(name=name)
+                return f"{acknowledgement} {ROLE_CONTEXT_QUESTIONS[asked]}"
+
+        if stage == "consultation_complete":
+            return FAREWELL_TEMPLATE.format(name=name)
+
+        return None
+
+
+def create_scripted_stages() -> Optional[ScriptedStages]:
+    """Build the scripted-stage engine unless CONSULTANT_SCRIPTED_STAGES disables it."""
+    if os.getenv("CONSULTANT_SCRIPTED_STAGES", "true").lower() in ("0", "false", "no", "off"):
+        return None
+    return ScriptedStages()
@@ -0,0 +1,366 @@
+"""
+Persistent, bounded session storage for the Strategic Consultant Agent.
+SQLite is the source of truth; an in-memory LRU keeps hot sessions close.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, str]
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', '.data', 'sessions.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_update ON sessions (last_update_time);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+class TieredSessionService(BaseSessionService):
+    """
+    Session service backed by SQLite with an LRU hot tier in memory.
+
+    Every write goes straight to disk, so sessions survive restarts and the hot tier can
+    drop entries at any time. The hot tier is bounded by entry count and by the approximate
+    serialised size of the sessions it holds; sessions untouched for longer than the TTL
+    are purged from both tiers.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 7 * 24 * 3600,
+                 max_memory_bytes: int = 64 * 1024 * 1024, max_hot_sessions: int = 1000,
+                 sweep_interval: float = 300.0):
+        """
+        Args:
+            db_path: SQLite database file (created if missing)
+            ttl_seconds: Idle time after which a session is deleted
+            max_memory_bytes: Ceiling on the approximate size of the hot tier
+            max_hot_sessions: Ceiling on the number of sessions in the hot tier
+            sweep_interval: Minimum seconds between expiry sweeps
+        """
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.max_hot_sessions = max_hot_sessions
+        self.sweep_interval = sweep_interval
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+        self._hot: "OrderedDict[SessionKey, Tuple[Session, int]]" = OrderedDict()
+        self._hot_bytes = 0
+        self._last_sweep = 0.0
+
+        logger.info(f"TieredSessionService using {db_path} (ttl={ttl_seconds}s, hot tier <= {max_memory_bytes} bytes)")
+
+    # ------------------------------------------------------------------
+    # BaseSessionService API
+    # ------------------------------------------------------------------
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        self._maybe_sweep()
+        session_id = session_id.strip() if session_id else str(uuid.uuid4())
+        key = (app_name, user_id, session_id)
+
+        if self._load(key) is not None:
+            raise ValueError(f"Session with id {session_id} already exists.")
+
+        app_delta, user_delta, session_state = self._split_state(state or {})
+        now = time.time()
+        with self._transaction():
+            self._merge_scoped_state(app_name, user_id, app_delta, user_delta)
+            self._conn.execute(
+                "INSERT INTO sessions (app_name, user_id, session_id, state, last_update_time) VALUES (?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, json.dumps(session_state), now)
+            )
+
+        session = Session(id=session_id, app_name=app_name, user_id=user_id, state=session_state, last_update_time=now)
+        self._remember(key, session, len(json.dumps(session_state)))
+        return self._with_scoped_state(self._copy(session))
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        self._maybe_sweep()
+        session = self._load((app_name, user_id, session_id))
+        if session is None:
+            return None
+
+        session = self._copy(session)
+        if config:
+            if config.num_recent_events is not None:
+                session.events = session.events[-config.num_recent_events:] if config.num_recent_events else []
+            if config.after_timestamp:
+                session.events = [event for event in session.events if event.timestamp >= config.after_timestamp]
+        return self._with_scoped_state(session)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        query = "SELECT user_id, session_id, state, last_update_time FROM sessions WHERE app_name = ?"
+        params: Tuple = (app_name,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY last_update_time", params).fetchall()
+
+        sessions = [
+            self._with_scoped_state(Session(id=sid, app_name=app_name, user_id=uid, state=json.loads(state),
+                                            last_update_time=updated))
+            for uid, sid, state, updated in rows
+        ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._forget(key)
+        with self._transaction():
+            self._conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        # Let the base class apply state deltas and append to the caller's session object
+        event = await super().append_event(session, event)
+        key = (session.app_name, session.user_id, session.id)
+
+        app_delta, user_delta, session_delta = self._split_state(event.actions.state_delta if event.actions else {})
+        payload = event.model_dump_json(exclude_none=True)
+        now = time.time()
+        session.last_update_time = now
+
+        # Apply the event to the stored session rather than saving the caller's copy, which may
+        # predate events appended meanwhile by another turn on the same session
+        with self._transaction():
+            self._merge_scoped_state(session.app_name, session.user_id, app_delta, user_delta)
+            self._conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, seq, timestamp, payload) "
+                "VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), -1) + 1 FROM events "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ?), ?, ?)",
+                key + key + (event.timestamp, payload)
+            )
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+            session_state = {**(json.loads(row[0]) if row else {}), **session_delta}
+            self._conn.execute(
+                "UPDATE sessions SET state = ?, last_update_time = ? WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (json.dumps(session_state), now) + key
+            )
+
+        entry = self._hot.get(key)
+        if entry is not None:
+            hot_session, size = entry
+            hot_session.events.append(event)
+            hot_session.state.update(session_delta)
+            hot_session.last_update_time = now
+            self._remember(key, hot_session, size + len(payload))
+        return event
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hot-tier and on-disk sizes."""
+        with self._lock:
+            session_count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            event_count = self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        return {
+            "hot_sessions": len(self._hot),
+            "hot_bytes": self._hot_bytes,
+            "stored_sessions": session_count,
+            "stored_events": event_count
+        }
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than the TTL. Returns the number removed."""
+        cutoff = time.time() - self.ttl_seconds
+        for key in [key for key, (session, _) in self._hot.items() if session.last_update_time < cutoff]:
+            self._forget(key)
+
+        with self._transaction():
+            self._conn.execute(
+                "DELETE FROM events WHERE (app_name, user_id, session_id) IN "
+                "(SELECT app_name, user_id, session_id FROM sessions WHERE last_update_time < ?)",
+                (cutoff,)
+            )
+            removed = self._conn.execute("DELETE FROM sessions WHERE last_update_time < ?", (cutoff,)).rowcount
+
+        if removed:
+            logger.info(f"Purged {removed} expired sessions")
+        return removed
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the connection lock for a single write transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _load(self, key: SessionKey) -> Optional[Session]:
+        """Fetch a session from the hot tier, falling back to disk."""
+        entry = self._hot.get(key)
+        if entry is not None:
+            self._hot.move_to_end(key)
+            return entry[0]
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            payloads = [payload for (payload,) in self._conn.execute(
+                "SELECT payload FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq", key
+            )]
+
+        app_name, user_id, session_id = key
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=json.loads(row[0]),
+            events=[Event.model_validate_json(payload) for payload in payloads],
+            last_update_time=row[1]
+        )
+        self._remember(key, session, len(row[0]) + sum(len(payload) for payload in payloads))
+        return session
+
+    def _remember(self, key: SessionKey, session: Session, size: int) -> None:
+        """Insert or refresh a hot-tier entry, evicting least recently used entries over the limits."""
+        self._forget(key)
+        self._hot[key] = (session, size)
+        self._hot_bytes += size
+
+        while len(self._hot) > 1 and (len(self._hot) > self.max_hot_sessions or self._hot_bytes > self.max_memory_bytes):
+            _, (_, evicted_size) = self._hot.popitem(last=False)
+            self._hot_bytes -= evicted_size
+
+    def _forget(self, key: SessionKey) -> None:
+        entry = self._hot.pop(key, None)
+        if entry is not None:
+            self._hot_bytes -= entry[1]
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.purge_expired()
+
+    def _merge_scoped_state(self, app_name: str, user_id: str, app_delta: Dict[str, Any], user_delta: Dict[str, Any]) -> None:
+        """Merge app:/user: scoped deltas into their tables. Caller holds the lock and transaction."""
+        if app_delta:
+            row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **app_delta}
+            self._conn.execute("INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)",
+                               (app_name, json.dumps(state)))
+        if user_delta:
+            row = self._conn.execute("SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+                                     (app_name, user_id)).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **user_delta}
+            self._conn.execute("INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)",
+                               (app_name, user_id, json.dumps(state)))
+
+    def _with_scoped_state(self, session: Session) -> Session:
+        """Overlay app:/user: scoped state onto a session copy."""
+        with self._lock:
+            app_row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?",
+                                         (session.app_name,)).fetchone()
+            user_row = self._conn.execute("SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+                                          (session.app_name, session.user_id)).fetchone()
+        if app_row:
+            for k, v in json.loads(app_row[0]).items():
+                session.state[State.APP_PREFIX + k] = v
+        if user_row:
+            for k, v in json.loads(user_row[0]).items():
+                session.state[State.USER_PREFIX + k] = v
+        return session
+
+    @staticmethod
+    def _split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """Split a state dict into app-, user- and session-scoped parts, dropping temp: keys."""
+        app_state, user_state, session_state = {}, {}, {}
+        for k, v in (state or {}).items():
+            if k.startswith(State.APP_PREFIX):
+                app_state[k[len(State.APP_PREFIX):]] = v
+            elif k.startswith(State.USER_PREFIX):
+                user_state[k[len(State.USER_PREFIX):]] = v
+            elif not k.startswith(State.TEMP_PREFIX):
+                session_state[k] = v
+        return app_state, user_state, session_state
+
+    @staticmethod
+    def _copy(session: Session) -> Session:
+        """Copy a session's containers so callers can't mutate the hot tier."""
+        copied = session.model_copy()
+        copied.events = list(session.events)
+        copied.state = dict(session.state)
+        return copied
+
+
+def create_session_service() -> BaseSessionService:
+    """Build the session service configured by environment variables."""
+    return TieredSessionService(
+        db_path=os.getenv("CONSULTANT_SESSION_DB", DEFAULT_DB_PATH),
+        ttl_seconds=float(os.getenv("CONSULTANT_SESSION_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_memory_bytes=int(float(os.getenv("CONSULTANT_SESSION_MEMORY_MB", "64")) * 1024 * 1024),
+        max_hot_sessions=int(os.getenv("CONSULTANT_SESSION_HOT_MAX", "1000"))
+    )
@@ -4,17 +4,35 @@ Handles consultation sessions and priority analysis.
 """
 
 import os
+import time
+import asyncio
 import logging
 import uuid
 import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService
 from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+from google.adk.events import Event, EventActions
 from google.genai import types as adk_types
 
+from .session_store import create_session_service
+from .conversation_state import ConversationState, STATE_KEY
+from .keyword_matcher import KeywordMatcher
+from .transcript_store import TranscriptStore, create_transcript_store
+from .prompt_segments import render_turn_context, prompt_version, turn_template_version, estimate_tokens
+from .scripted_stages import ScriptedStages, create_scripted_stages
+from .tracing import Tracer, create_tracer
+from .agent_metrics import AgentMetrics
+from .usage_store import TurnUsage, UsageStore, create_usage_store
+from .deadlines import DeadlinePolicy, DeadlineExceeded, create_deadline_policy
+from .model_tiers import ModelTier, ModelTiers, create_model_tiers
+from .response_cache import ResponseCache, CacheKey, Personalisation, create_response_cache
+from .widgets import expand_widget_markers, summarize_widget, get_widget, MARKER_PATTERN
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,17 +40,61 @@ logger = logging.getLogger(__name__)
 # Define app name for the runner
 A2A_APP_NAME = "strategic_consultant_app"
 
+# Number of trailing transcript messages quoted back to the model each turn
+HISTORY_WINDOW = 5
+
+# Markers in a model response that trigger special handling
+SPECIAL_RESPONSE_MATCHER = KeywordMatcher({
+    "analysis_completed": ["priority_analysis_tool", "analysis_result"],
+    "action_plan_generated": ["generate_action_plan_tool", "action_plan"],
+    "consultation_complete": ["consultation complete", "summary", "next steps"]
+})
+
 class TaskManager:
     """Task Manager for the Strategic Consultant Agent."""
     
-    def __init__(self, agent: Agent):
+    def __init__(self, agent: Agent, session_service: Optional[BaseSessionService] = None,
+                 transcript_store: Optional[TranscriptStore] = None,
+                 scripted_stages: Optional[ScriptedStages] = None,
+                 tracer: Optional[Tracer] = None,
+                 usage_store: Optional[UsageStore] = None,
+                 deadline_policy: Optional[DeadlinePolicy] = None,
+                 model_tiers: Optional[ModelTiers] = None,
+                 response_cache: Optional[ResponseCache] = None):
         """Initialize with an Agent instance and set up ADK Runner."""
         logger.info(f"Initializing TaskManager for agent: {agent.name}")
         self.agent = agent
         
-        # Initialize ADK services
-        self.session_service = InMemorySessionService()
+        # Initialize ADK services (persistent, bounded sessions unless a backend is supplied)
+        self.session_service = session_service or create_session_service()
         self.artifact_service = InMemoryArtifactService()
+
+        # Canonical user/AI transcript per session, so clients only send the new message
+        self.transcripts = transcript_store or create_transcript_store()
+
+        # Templated answers for the fixed parts of the consultation script
+        self.scripted_stages = scripted_stages or create_scripted_stages()
+
+        # Per-session token and cost totals
+        self.usage = usage_store or create_usage_store()
+
+        # Per-stage time budgets after which a turn's model run is aborted
+        self.deadlines = deadline_policy or create_deadline_policy()
+
+        # Replies to repeatable turns, shared across users
+        self.response_cache = response_cache or create_response_cache()
+
+        # Per-phase latency traces for each turn
+        self.tracer = tracer or create_tracer()
+
+        # Set once a server registers its metrics registry (see register_metrics)
+        self.metrics: Optional[AgentMetrics] = None
+        
+        # Size of the cacheable static prefix (agent instruction incl. static prompt segments)
+        instruction = self.agent.instruction if isinstance(self.agent.instruction, str) else ""
+        self.prompt_version = prompt_version(instruction)
+        self.static_prompt_tokens = estimate_tokens(instruction)
+        logger.info(f"Prompt version {self.prompt_version}: ~{self.static_prompt_tokens} static tokens")
         
         # Create the runner
         self.runner = Runner(
@@ -43,7 +105,22 @@ class TaskManager:
         )
         logger.info(f"ADK Runner initialized for app '{self.runner.app_name}'")
 
-    async def process_task(self, message: str, context: Dict[str, Any] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        # One runner per model tier; each turn runs on the tier its conversation stage maps to
+        self.model_tiers = model_tiers or create_model_tiers(
+            getattr(self.agent.model, "model", str(self.agent.model)), os.getenv("CONSULTANT_MODEL_API_BASE")
+        )
+        self.tier_runners: Dict[str, Runner] = {}
+        if self.model_tiers:
+            for name, tier in self.model_tiers.tiers.items():
+                self.tier_runners[name] = Runner(
+                    agent=self.model_tiers.build_agent(self.agent, tier),
+                    app_name=A2A_APP_NAME,
+                    session_service=self.session_service,
+                    artifact_service=self.artifact_service
+                )
+
+    async def process_task(self, message: str, context: Dict[str, Any] = None, session_id: Optional[str] = None,
+                           deadline_ms: Optional[float] = None) -> Dict[str, Any]:
         """
         Process a strategic consultation request.
         
@@ -51,88 +128,288 @@ class TaskManager:
             message: The user's message
             context: Context containing user_id, department info, etc.
             session_id: Session identifier
+            deadline_ms: Time budget for the turn, overriding the stage's default
             
         Returns:
             Response dict with message and status
         """
-        try:
-            # Extract context information
-            if not context:
-                context = {}
-            
-            user_id = context.get("user_id", "default_user")
-            department = context.get("department", "Unknown Department")
-            conversation_history = context.get("conversationHistory", []) # Same key as first file
-
-            # Build comprehensive system instruction using Riley's context
-            system_instruction = self._build_riley_context(
-                current_message=message, 
-                context=context, 
-                department=department, 
-                conversation_history=conversation_history
-            )
-            
-            # Create or generate session
-            if not session_id:
-                session_id = str(uuid.uuid4())
+        response = None
+        async for event in self.stream_task(message, context, session_id, partial=False, deadline_ms=deadline_ms):
+            if event["event"] == "final":
+                response = event["response"]
+        return response
+
+    async def stream_task(self, message: str, context: Dict[str, Any] = None, session_id: Optional[str] = None,
+                          partial: bool = True, deadline_ms: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a strategic consultation request, yielding events as the agent produces them.
+        
+        Args:
+            message: The user's message
+            context: Context containing user_id, department info, etc.
+            session_id: Session identifier
+            partial: Ask the model for partial (token-level) text chunks
+            deadline_ms: Time budget for the turn, overriding the stage's default
             
-            # Create session
+        Yields:
+            Event dicts keyed by "event": "start" once the session is ready, "delta" for
+            partial model text, "tool_call"/"tool_response" for function events and a
+            closing "final" whose "response" is the dict process_task returns
+
+        If the deadline passes, the model run is aborted and "final" reports the cancellation.
+        If the consumer goes away (the task is cancelled or the stream closed), the model run
+        is cancelled with it. Either way the cancellation is recorded in the session.
+        """
+        # Extract context information
+        if not context:
+            context = {}
+        
+        user_id = context.get("user_id", "default_user")
+        department = context.get("department", "Unknown Department")
+
+        # Create or generate session
+        if not session_id:
+            session_id = str(uuid.uuid4())
+
+        trace = self.tracer.start_trace("process_task", session_id=session_id, user_id=user_id, streaming=partial)
+        turn_started = time.perf_counter()
+        conversation_stage, turn_status, scripted_reply = "unknown", "error", None
+        session = None
+        turn_usage = TurnUsage()
+        if self.metrics:
+            self.metrics.turn_started()
+        try:
+            # Resume the stored session or create it
+            session_span = trace.span("session.load")
             try:
-                await self.session_service.create_session(
+                session = await self.session_service.get_session(
                     app_name=A2A_APP_NAME,
                     user_id=user_id,
-                    session_id=session_id,
-                    state={}
+                    session_id=session_id
                 )
+                if session is None:
+                    session = await self.session_service.create_session(
+                        app_name=A2A_APP_NAME,
+                        user_id=user_id,
+                        session_id=session_id,
+                        state={}
+                    )
+                    session_span.set("created", True)
             except Exception as e:
                 logger.warning(f"Session creation issue: {e}")
+            session_span.end()
+
+            yield {"event": "start", "session_id": session_id}
+
+            # Legacy clients still upload the whole history; reconcile it with the stored transcript
+            if "conversationHistory" in context: # Same key as first file
+                with trace.span("transcript.sync", messages=len(context["conversationHistory"])):
+                    self.transcripts.sync(A2A_APP_NAME, user_id, session_id, context["conversationHistory"])
+
+            # Fold only the messages added since the last turn into the persisted stage tracker
+            with trace.span("conversation.state"):
+                conversation_state = self._load_conversation_state(session, user_id, session_id)
+                conversation_stage, strategic_focus = conversation_state.classify(message)
+                conversation_history = self.transcripts.read(A2A_APP_NAME, user_id, session_id, last=HISTORY_WINDOW)
+            trace.set("stage", conversation_stage)
+            trace.set("focus", strategic_focus)
+
+            client_version = context.get("transcript_version")
+            transcript_resync = client_version is not None and client_version != conversation_state.cursor
+
+            final_message = "Hello! I'm Riley, your strategic consultant. How can I help you today?"
+            interactive_question_data = None
+            prompt_stats = None
+
+            # Scripted turns (welcome, role context questions, farewell) skip the model entirely
+            if self.scripted_stages and session is not None:
+                scripted_reply = self.scripted_stages.reply(conversation_stage, conversation_state, message, context)
+
+            trace.set("scripted", scripted_reply is not None)
+
+            # Cheap tier for the gathering stages, strong tier for analysis
+            tier = self.model_tiers.tier_for(conversation_stage) if self.model_tiers else None
+
+            # Repeatable turns (greetings, thanks, widget clarifications) may reuse another user's reply
+            cache_key, cached_reply = None, None
+            if scripted_reply is None and self.response_cache is not None and session is not None:
+                with trace.span("cache.lookup") as cache_span:
+                    cache_key, cached_reply, cache_result = self._lookup_cached_reply(
+                        message, context, user_id, session_id, conversation_stage, strategic_focus, tier)
+                    cache_span.set("result", cache_result)
+                trace.set("cache", cache_result)
+
+            if scripted_reply is not None or cached_reply is not None:
+                final_message = scripted_reply if scripted_reply is not None else cached_reply
+                with trace.span("scripted.record"):
+                    await self._record_scripted_turn(session, message, final_message, conversation_state)
+                if partial:
+                    yield {"event": "delta", "text": final_message}
+            else:
+                # Build comprehensive system instruction using Riley's context
+                with trace.span("prompt.build"):
+                    system_instruction = self._build_riley_context(
+                        current_message=message, 
+                        context=context, 
+                        department=department, 
+                        conversation_history=conversation_history,
+                        conversation_stage=conversation_stage,
+                        strategic_focus=strategic_focus
+                    )
             
-            # Create user message with comprehensive system instruction
-            # The system_instruction now includes the conversation history and current user message
-            request_content = adk_types.Content(
-                role="user", # The ADK runner expects the new message to be from the user
-                parts=[adk_types.Part(text=system_instruction)]
-            )
+                prompt_stats = {
+                    "version": self.prompt_version,
+                    "static_tokens": self.static_prompt_tokens,
+                    "dynamic_tokens": estimate_tokens(system_instruction)
+                }
             
-            # Run the agent with the new message
-            events_async = self.runner.run_async(
-                user_id=user_id,
-                session_id=session_id,
-                new_message=request_content # Pass the single new message
-            )
+                # Create user message with comprehensive system instruction
+                # The system_instruction now includes the conversation history and current user message
+                request_content = adk_types.Content(
+                    role="user", # The ADK runner expects the new message to be from the user
+                    parts=[adk_types.Part(text=system_instruction)]
+                )
             
-            # Process response
-            final_message = "Hello! I'm Riley, your strategic consultant. How can I help you today?"
-            interactive_question_data = None
+                # The deadline covers the whole turn; when it passes, ADK aborts the run (and the model call)
+                deadline_seconds = self.deadlines.seconds_for(conversation_stage, deadline_ms)
+                abort_signal = asyncio.Event()
+                deadline_timer = None
+                if deadline_seconds is not None:
+                    remaining = deadline_seconds - (time.perf_counter() - turn_started)
+                    deadline_timer = asyncio.get_running_loop().call_later(max(remaining, 0), abort_signal.set)
+                trace.set("deadline_s", deadline_seconds)
+
+                runner = self.tier_runners[tier.name] if tier else self.runner
+                if tier:
+                    trace.set("model_tier", tier.name)
+                    if self.metrics:
+                        self.metrics.tier_selected(conversation_stage, tier.name)
+
+                # Run the agent with the new message
+                model_span = trace.span("model.run")
+                first_event_span = trace.span("model.first_event")
+                open_tool_calls = {}
+                answered = False
+                events_async = runner.run_async(
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=request_content, # Pass the single new message
+                    state_delta={STATE_KEY: conversation_state.to_dict()},
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE if partial else StreamingMode.NONE),
+                    abort_signal=abort_signal
+                )
             
-            async for event in events_async:
-                if event.is_final_response() and event.content and event.content.role == "model":
-                    if event.content.parts and event.content.parts[0].text:
-                        final_message = event.content.parts[0].text
-                        logger.info(f"Agent response: {final_message}")
-
-                        # Parse for interactive questions
-                        # parsed_interactive = self._parse_interactive_questions(final_message)
-                        # if parsed_interactive:
-                        #     interactive_question_data = parsed_interactive
-                        #     final_message = parsed_interactive.get("clean_message", "") # Use clean message for display
-                        #     logger.info(f"Parsed interactive question: {interactive_question_data}")
+                # Process response
+                try:
+                    async for event in events_async:
+                        first_event_span.end()
+                        if not event.partial and event.usage_metadata:
+                            usage = event.usage_metadata
+                            turn_usage.add_model_usage(usage)
+                            if self.metrics:
+                                self.metrics.llm_usage(conversation_stage, usage.prompt_token_count or 0,
+                                                       usage.cached_content_token_count or 0, usage.candidates_token_count or 0)
+                        for call in event.get_function_calls():
+                            turn_usage.tool_calls += 1
+                            open_tool_calls[call.id] = (time.perf_counter(), trace.span("tool.execute", tool=call.name))
+                            yield {"event": "tool_call", "name": call.name, "args": dict(call.args or {})}
+                        for tool_response in event.get_function_responses():
+                            if tool_response.id in open_tool_calls:
+                                called_at, tool_span = open_tool_calls.pop(tool_response.id)
+                                tool_span.end()
+                                if self.metrics:
+                                    failed = isinstance(tool_response.response, dict) and "error" in tool_response.response
+                                    self.metrics.tool_finished(tool_response.name, "error" if failed else "success",
+                                                               time.perf_counter() - called_at)
+                            # Widget tools only return a marker; the page is expanded into the final message
+                            yield {"event": "tool_response", "name": tool_response.name}
+
+                        if event.partial:
+                            if event.content and event.content.parts:
+                                text = "".join(part.text for part in event.content.parts if part.text)
+                                if text:
+                                    yield {"event": "delta", "text": text}
+                            continue
+
+                        if event.is_final_response() and event.content and event.content.role == "model":
+                            if event.content.parts and event.content.parts[0].text:
+                                final_message = event.content.parts[0].text
+                                answered = True
+                                logger.info(f"Agent response: {final_message}")
+
+                                # Parse for interactive questions
+                                # parsed_interactive = self._parse_interactive_questions(final_message)
+                                # if parsed_interactive:
+                                #     interactive_question_data = parsed_interactive
+                                #     final_message = parsed_interactive.get("clean_message", "") # Use clean message for display
+                                #     logger.info(f"Parsed interactive question: {interactive_question_data}")
+                finally:
+                    # Closing the run cancels the in-flight model call if we are leaving early
+                    if deadline_timer is not None:
+                        deadline_timer.cancel()
+                    await events_async.aclose()
+                    model_span.end()
+                if abort_signal.is_set() and not answered:
+                    raise DeadlineExceeded(deadline_seconds)
+                if cache_key is not None and answered and not SPECIAL_RESPONSE_MATCHER.scan(final_message):
+                    self.response_cache.store(cache_key, cache_key.personalisation.strip(final_message))
+
+            # Swap widget markers for the page itself, unless the client loads widgets by reference
+            with trace.span("response.widgets"):
+                expanded_message, widget = expand_widget_markers(final_message)
+                client_message = final_message if context.get("widget_refs") else expanded_message
+
+            with trace.span("transcript.append"):
+                transcript_version = self.transcripts.append(A2A_APP_NAME, user_id, session_id, [
+                    {"sender": "user", "message": message},
+                    {"sender": "ai", "message": expanded_message}
+                ])
+
+            # Token/cost accounting for this turn and the session so far
+            request_usage = turn_usage.to_dict()
+            session_usage = self.usage.record(A2A_APP_NAME, user_id, session_id, conversation_stage, request_usage)
+
+            turn_data = {
+                "conversation_stage": conversation_stage,
+                "transcript_version": transcript_version,
+                "usage": {"request": request_usage, "session": session_usage}
+            }
+            if prompt_stats:
+                turn_data["prompt"] = prompt_stats
+                if tier:
+                    turn_data["model_tier"] = tier.describe()
+            elif cached_reply is not None:
+                turn_data["cache"] = {"result": cache_result}
+            else:
+                turn_data["scripted"] = True
+            if widget:
+                turn_data["widget"] = widget.reference()
+            if transcript_resync:
+                turn_data["transcript_resync"] = True
 
             # Handle special cases like analysis completion (same as first file)
-            response_result = await self._handle_special_responses(
-                final_message, message, context, user_id
-            )
+            with trace.span("response.special"):
+                response_result = await self._handle_special_responses(
+                    final_message, message, context, user_id
+                )
+            trace.set("status", "success")
+            turn_status = "success"
             
             if response_result:
-                return response_result
+                response_result["message"] = client_message
+                response_result.setdefault("session_id", session_id)
+                response_result["data"].update(turn_data)
+                yield {"event": "final", "response": response_result}
+                return
             
             response_data = {
-                "message": final_message,
+                "message": client_message,
                 "status": "success",
                 "session_id": session_id,
                 "data": {
-                    "conversation_stage": self._analyze_conversation_context(message, conversation_history),
-                    "department": department
+                    "conversation_stage": conversation_stage,
+                    "department": department,
+                    **turn_data
                 }
             }
             
@@ -140,251 +417,205 @@ class TaskManager:
             if interactive_question_data:
                 response_data["interactive_question_data"] = interactive_question_data
             
-            return response_data
+            yield {"event": "final", "response": response_data}
             
+        except DeadlineExceeded as e:
+            logger.warning(f"Session {session_id}: {e} in stage {conversation_stage}")
+            turn_status = "deadline_exceeded"
+            trace.set("status", turn_status)
+            await self._record_cancellation(user_id, session_id, conversation_stage, turn_status, turn_usage,
+                                            time.perf_counter() - turn_started)
+            yield {
+                "event": "final",
+                "response": {
+                    "message": "I'm sorry, that took longer than expected. Could you send your message again?",
+                    "status": "error",
+                    "session_id": session_id,
+                    "data": {
+                        "error_type": type(e).__name__,
+                        "cancelled": True,
+                        "cancel_reason": turn_status,
+                        "deadline_ms": round(e.seconds * 1000),
+                        # Whether the budget was the client's own (deadline_ms) or the stage default
+                        "deadline_source": "request" if deadline_ms else "server",
+                        "conversation_stage": conversation_stage
+                    }
+                }
+            }
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client went away (request task cancelled or stream closed); the model run is already torn down
+            logger.info(f"Session {session_id}: turn cancelled by the client in stage {conversation_stage}")
+            turn_status = "client_disconnected"
+            trace.set("status", turn_status)
+            try:
+                await asyncio.shield(self._record_cancellation(user_id, session_id, conversation_stage, turn_status,
+                                                               turn_usage, time.perf_counter() - turn_started))
+            except asyncio.CancelledError:
+                pass
+            raise
+
         except Exception as e:
             logger.error(f"Error processing task: {e}")
-            return {
-                "message": f"I apologize, but I encountered an error while processing your request: {str(e)}",
-                "status": "error"
+            trace.set("status", "error")
+            trace.set("error", type(e).__name__)
+            yield {
+                "event": "final",
+                "response": {
+                    "message": f"I apologize, but I encountered an error while processing your request: {str(e)}",
+                    "status": "error",
+                    "data": {"error_type": type(e).__name__}
+                }
             }
+        finally:
+            trace.end()
+            if self.metrics:
+                self.metrics.turn_finished(conversation_stage, turn_status, scripted_reply is not None,
+                                           time.perf_counter() - turn_started)
     
-    def _build_riley_context(self, current_message: str, context: Dict, department: str, conversation_history: List[Dict]) -> str:
-        """Build comprehensive context for Riley's response."""
-        
-        # Extract stakeholder information from context
-        user_name = context.get('name', 'there')
-        user_role = context.get('role', 'unknown role')
-        user_department = context.get('department', department)
-        
-        # Analyze conversation stage and user needs
-        conversation_stage = self._analyze_conversation_context(current_message, conversation_history)
-        strategic_focus = self._identify_strategic_focus(current_message, conversation_history)
-        
-        # Format conversation history
-        formatted_history = self._format_conversation_history(conversation_history)
-        
-        # Get Riley's strategic questioning approach
-        questioning_strategy = self._get_strategic_questioning_approach(conversation_stage, strategic_focus)
-        
-        # Add progression trigger
-        progression_guidance = ""
-        if conversation_stage == "analysis_phase":
-            progression_guidance = """
-    
-CRITICAL: ALL CONTEXT QUESTIONS COMPLETED. Riley must now START ANALYSIS. Say something like:
-"Thank you for providing all that context, {user_name}! Based on our conversation, I can see several strategic priorities emerging. Let me provide you with my analysis..."
-
-Then provide:
-1. Summary of priorities discussed
-2. Strategic analysis with scores (Importance/Urgency out of 10)
-3. Categorization by themes
-4. Recommendations for next steps
-"""
-        elif conversation_stage == "role_context_gathering":
-            progression_guidance = """
-
-CRITICAL: CONTINUE ROLE CONTEXT QUESTIONS. Do NOT provide analysis yet. Ask the next role context question in sequence.
-"""
-        elif conversation_stage == "performance_data_gathering":
-            progression_guidance = """
-
-CRITICAL: ASK PERFORMANCE DATA QUESTIONS. Do NOT provide analysis yet. Ask about performance metrics familiarity.
-"""
-
-        return f"""
-RILEY'S CONSULTATION CONTEXT:
-
-STAKEHOLDER INFORMATION:
-- Name: {user_name}
-- Role: {user_role}
-- Department: {user_department}
-- User ID: {context.get('user_id', 'unknown')}
+    def get_transcript(self, session_id: str, user_id: str = "default_user", since: int = 0) -> Dict[str, Any]:
+        """Return the stored transcript from position `since`, for clients resyncing their copy."""
+        messages = self.transcripts.read(A2A_APP_NAME, user_id, session_id, since=since)
+        return {
+            "session_id": session_id,
+            "since": since,
+            "transcript_version": since + len(messages),
+            "messages": messages
+        }
 
-CURRENT SITUATION:
-- Conversation Stage: {conversation_stage}
-- Strategic Focus Area: {strategic_focus}
+    def register_metrics(self, registry) -> None:
+        """Create the consultation metrics on the server's registry and start recording them."""
+        self.metrics = AgentMetrics(registry, self.session_service, self.response_cache)
+        # Model routing (hedges, fallbacks, breakers) reports through the same registry
+        agents = [runner.agent for runner in self.tier_runners.values()] or [self.agent]
+        for agent in agents:
+            llm_client = getattr(agent.model, "llm_client", None)
+            if hasattr(llm_client, "register_metrics"):
+                llm_client.register_metrics(registry)
 
-CONVERSATION HISTORY:
-{formatted_history}
+    def get_slowest_traces(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The slowest recent turn traces, for /debug."""
+        return self.tracer.slowest(limit)
 
-RILEY'S STRATEGIC APPROACH FOR THIS RESPONSE:
-{questioning_strategy}
+    def get_usage(self, session_id: str, user_id: str = "default_user") -> Dict[str, Any]:
+        """Return the session's token/cost totals and their breakdown by conversation stage."""
+        return {"session_id": session_id, **self.usage.session_usage(A2A_APP_NAME, user_id, session_id)}
 
-TAFE NSW CONTEXT TO CONSIDER:
-- TAFE NSW is Australia's largest vocational education provider
-- Focus on industry-relevant training and student outcomes
-- Strategic priorities include digital transformation, industry partnerships, and future skills
-- Operates across multiple faculties with diverse departmental needs
-- Subject to ASQA requirements and government policy frameworks
+    def get_widget(self, widget_id: str):
+        """Look up a widget page for the /widgets endpoint."""
+        return get_widget(widget_id)
 
-RILEY'S RESPONSE GUIDELINES:
-1. Use the stakeholder's actual name ({user_name}) in your responses
-2. Acknowledge what the user has shared
-3. Use strategic thinking to identify underlying priorities
-4. Ask 1 probing question on each response that help uncover strategic insights
-5. Reference TAFE NSW context when relevant
-6. Keep response conversational but professionally focused
-7. Build on previous conversation threads
-8. Challenge assumptions constructively when appropriate
+    def _load_conversation_state(self, session, user_id: str, session_id: str) -> ConversationState:
+        """Advance the session's stage tracker over transcript messages added since its last turn."""
+        state = ConversationState.from_dict(session.state.get(STATE_KEY) if session else None)
+        start = state.resume_from
+        if not state.advance_from(start, self.transcripts.read(A2A_APP_NAME, user_id, session_id, since=start)):
+            state = ConversationState()
+            state.advance_from(0, self.transcripts.read(A2A_APP_NAME, user_id, session_id))
+        return state
 
-Remember: You are Riley having a strategic conversation with {user_name}, who works as {user_role} in {user_department}. Be warm, curious, and genuinely interested in helping them discover their priorities.
+    async def _record_scripted_turn(self, session, message: str, reply: str, conversation_state: ConversationState) -> None:
+        """Append a scripted exchange to the ADK session so later model turns see it in their history."""
+        invocation_id = f"e-{uuid.uuid4()}"
+        await self.session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author="user",
+            content=adk_types.Content(role="user", parts=[adk_types.Part(text=message)]),
+            actions=EventActions(state_delta={STATE_KEY: conversation_state.to_dict()})
+        ))
+        await self.session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author=self.agent.name,
+            content=adk_types.Content(role="model", parts=[adk_types.Part(text=reply)])
+        ))
 
-CURRENT USER MESSAGE: "{current_message}"
+    async def _record_cancellation(self, user_id: str, session_id: str, stage: str, reason: str,
+                                   turn_usage: TurnUsage, elapsed: float) -> None:
+        """Note an abandoned turn in the ADK session and bill any model usage it incurred."""
+        try:
+            # Re-read the session: the runner has appended to it since this turn loaded it
+            session = await self.session_service.get_session(
+                app_name=A2A_APP_NAME, user_id=user_id, session_id=session_id
+            )
+            if session is not None:
+                await self.session_service.append_event(session, Event(
+                    invocation_id=f"e-{uuid.uuid4()}",
+                    author=self.agent.name,
+                    custom_metadata={"cancelled": {
+                        "reason": reason,
+                        "stage": stage,
+                        "elapsed_ms": round(elapsed * 1000, 1)
+                    }}
+                ))
+            self.usage.record(A2A_APP_NAME, user_id, session_id, stage, turn_usage.to_dict())
+        except Exception as e:
+            logger.warning(f"Could not record cancelled turn for session {session_id}: {e}")
 
-Respond as Riley would in this consultation context, using {user_name}'s actual name:
+    def _lookup_cached_reply(self, message: str, context: Dict, user_id: str, session_id: str, stage: str,
+                             focus: str, tier: Optional[ModelTier]) -> Tuple[Optional[CacheKey], Optional[str], str]:
+        """
+        Look the turn up in the response cache, keyed on the session's whole transcript (not
+        just the prompt's history window, since a reply may draw on anything said earlier).
 
-{progression_guidance}
-"""
-    
-    # Replace the _analyze_conversation_context method in your task_manager.py:
+        Returns (key, reply, result): the key is None for uncacheable turns, the reply is
+        personalised for this stakeholder, and result is "exact", "similar", "miss" or "uncacheable".
+        """
+        key, reply, result = None, None, "uncacheable"
+        if self.response_cache.cacheable(stage, message):
+            instruction = self.agent.instruction if isinstance(self.agent.instruction, str) else ""
+            # Entries made under another instruction or template set are dropped
+            self.response_cache.ensure_fingerprint(f"{prompt_version(instruction)}-{turn_template_version()}")
+            model = f"{tier.name}:{tier.model}" if tier else getattr(self.agent.model, "model", str(self.agent.model))
+            transcript = self.transcripts.read(A2A_APP_NAME, user_id, session_id)
+            key = self.response_cache.key(stage, focus, model, transcript, message, Personalisation(context))
+        if key is not None:
+            template, result, similarity = self.response_cache.lookup(key)
+            reply = key.personalisation.apply(template) if template is not None else None
+            # A reply whose widget can no longer be rendered is regenerated
+            if reply is not None and any(get_widget(widget_id) is None for widget_id in MARKER_PATTERN.findall(reply)):
+                reply = None
+            if reply is None:
+                result = "miss"
+            else:
+                logger.info(f"Response cache {result} hit (similarity {similarity}) in stage {stage}")
+        if self.metrics:
+            self.metrics.cache_lookup(stage, result)
+        return key, reply, result
 
-    def _analyze_conversation_context(self, current_message: str, history: List[Dict]) -> str:
-        """Analyze the conversation to determine current stage."""
+    def _build_riley_context(self, current_message: str, context: Dict, department: str, conversation_history: List[Dict],
+                             conversation_stage: Optional[str] = None, strategic_focus: Optional[str] = None) -> str:
+        """Build the dynamic part of Riley's context for this turn (see prompt_segments)."""
         
-        message_lower = current_message.lower()
-        history_length = len(history)
-        
-        # Initialize last_ai_message outside the if block
-        last_ai_message = ""
-        
-        # Check if consultation is complete based on previous messages
-        if history_length > 0:
-            for msg in reversed(history):
-                if msg.get('sender') == 'ai':
-                    last_ai_message = msg.get('message', '').lower()
-                    break
-            
-            # If the last AI message contained analysis/action plan and user is saying thanks/goodbye
-            if (any(phrase in last_ai_message for phrase in ["action plan", "strategic analysis", "recommendations for next steps", "pleasure helping"]) 
-                and any(phrase in message_lower for phrase in ["thanks", "thank you", "bye", "goodbye", "see you", "great", "perfect", "excellent"])):
-                return "consultation_complete"
-
-        # Count questions asked by checking AI messages for question patterns
-        ai_questions_asked = 0
-        context_questions = [
-            "years have you been in your current position",
-            "years with tafe nsw",
-            "direct reports",
-            "internal stakeholders",
-            "external stakeholders"
-        ]
-        
-        for msg in history:
-            if msg.get('sender') == 'ai':
-                ai_msg = msg.get('message', '').lower()
-                for question in context_questions:
-                    if question in ai_msg:
-                        ai_questions_asked += 1
-                        break
+        # Extract stakeholder information from context
+        user_name = context.get('name', 'there')
+        user_role = context.get('role', 'unknown role')
+        user_department = context.get('department', department)
         
-        # Performance data question patterns
-        performance_questions = [
-            "familiar are you with the performance metrics",
-            "performance metrics for your area",
-            "additional data would be helpful"
-        ]
+        # Analyze conversation stage and user needs (callers with session state pass these in)
+        if conversation_stage is None:
+            conversation_stage = self._analyze_conversation_context(current_message, conversation_history)
+        if strategic_focus is None:
+            strategic_focus = self._identify_strategic_focus(current_message, conversation_history)
         
-        performance_questions_asked = 0
-        for msg in history:
-            if msg.get('sender') == 'ai':
-                ai_msg = msg.get('message', '').lower()
-                for question in performance_questions:
-                    if question in ai_msg:
-                        performance_questions_asked += 1
-                        break
-
-        # Determine stage based on questions asked
-        if history_length == 0 or any(keyword in message_lower for keyword in ["hello", "hi", "start", "begin"]):
-            return "initial_engagement"
-        elif ai_questions_asked < 5:  # Need all 5 role context questions first
-            return "role_context_gathering"
-        elif ai_questions_asked >= 5 and performance_questions_asked < 2:  # Then performance data questions
-            return "performance_data_gathering"
-        elif performance_questions_asked >= 2:  # Only after all context questions
-            return "analysis_phase"
-        else:
-            return "role_context_gathering"  # Default back to context gathering
+        # Only the per-turn suffix is sent here; the static segments live in the agent instruction
+        return render_turn_context({
+            "user_name": user_name,
+            "user_role": user_role,
+            "user_department": user_department,
+            "user_id": context.get('user_id', 'unknown'),
+            "conversation_stage": conversation_stage,
+            "strategic_focus": strategic_focus,
+            "formatted_history": self._format_conversation_history(conversation_history),
+            "current_message": current_message
+        })
+    
+    def _analyze_conversation_context(self, current_message: str, history: List[Dict]) -> str:
+        """Analyze the conversation to determine current stage (full rescan; see ConversationState)."""
+        return ConversationState().advance(history).stage(current_message)
             
     def _identify_strategic_focus(self, current_message: str, history: List[Dict]) -> str:
-        """Identify the strategic focus area from the conversation."""
-        
-        combined_text = current_message.lower()
-        if history:
-            combined_text += " " + " ".join([msg.get('message', '').lower() for msg in history[-3:]])
-        
-        if any(keyword in combined_text for keyword in ["student", "learner", "enrollment", "completion"]):
-            return "student_outcomes"
-        elif any(keyword in combined_text for keyword in ["industry", "employer", "partnership", "workplace"]):
-            return "industry_engagement"
-        elif any(keyword in combined_text for keyword in ["digital", "technology", "online", "system"]):
-            return "digital_transformation"
-        elif any(keyword in combined_text for keyword in ["staff", "teacher", "faculty", "workforce"]):
-            return "workforce_development"
-        elif any(keyword in combined_text for keyword in ["quality", "compliance", "asqa", "standard"]):
-            return "quality_assurance"
-        elif any(keyword in combined_text for keyword in ["budget", "resource", "funding", "cost"]):
-            return "resource_management"
-        else:
-            return "strategic_planning"
-    
-    def _get_strategic_questioning_approach(self, stage: str, focus: str) -> str:
-        """Get Riley's strategic questioning approach based on context."""
-        
-        stage_approaches = {
-            "initial_engagement": """
-            Riley should:
-            - Welcome them warmly using their actual name
-            - Acknowledge their role and department
-            - Start with the first role context question: "How many years have you been in your current position?"
-            """,
-            "role_context_gathering": """
-            Riley should:
-            - Continue with the role context questions in order
-            - Ask ONE question at a time from the sequence:
-              1. Years in current position
-              2. Years with TAFE NSW overall  
-              3. Number of direct reports
-              4. Key internal stakeholders
-              5. Key external stakeholders
-            - Do NOT proceed to performance data until ALL 5 questions are answered
-            - Do NOT provide analysis yet
-            """,
-            "performance_data_gathering": """
-            Riley should:
-            - After ALL role context questions, ask about performance data familiarity
-            - Ask: "Now I'd like to understand your relationship with performance data. How familiar are you with the performance metrics for your area?" with checkbox options
-            - Then ask: "What additional data would be most helpful for you in your role?"
-            - Do NOT provide analysis until BOTH performance questions are answered
-            """,
-            "analysis_phase": """
-            Riley should:
-            - NOW provide strategic analysis based on all gathered context
-            - Summarize the priorities discussed
-            - Provide strategic analysis using frameworks (Eisenhower Matrix, Impact/Effort)
-            - Score priorities on importance (1-10) and urgency (1-10)
-            - Categorize by themes (Student Outcomes, Digital Transformation, etc.)
-            """,
-            "consultation_complete": """
-            Riley should:
-            - Acknowledge the thanks/farewell graciously
-            - Provide a brief, warm closing statement
-            - NOT repeat analysis or action plans
-            - Keep response short and professional
-            """
-        }
-        
-        focus_context = {
-            "student_outcomes": "Consider student success metrics, completion rates, industry readiness",
-            "industry_engagement": "Think about employer satisfaction, job placement rates, industry feedback", 
-            "digital_transformation": "Focus on technology adoption, digital literacy, system integration",
-            "workforce_development": "Consider staff capabilities, professional development, change management",
-            "quality_assurance": "Think about compliance requirements, standards, continuous improvement",
-            "resource_management": "Focus on budget optimization, resource allocation, efficiency",
-            "strategic_planning": "Consider broader organizational alignment and future direction"
-        }
-        
-        return f"{stage_approaches.get(stage, 'Continue systematic context gathering - do not analyze yet')}\n\nFocus Context: {focus_context.get(focus, 'General strategic thinking')}"    
+        """Identify the strategic focus area from the conversation (full rescan; see ConversationState)."""
+        return ConversationState().advance(history).focus(current_message)
     
     def _format_conversation_history(self, history: List[Dict]) -> str:
         """Format conversation history for context."""
@@ -393,9 +624,9 @@ Respond as Riley would in this consultation context, using {user_name}'s actual
         
         # Format exactly like the first file - using 'USER' and 'MODEL' labels
         formatted = []
-        for msg in history[-5:]:  # Last 5 messages for context
+        for msg in history[-HISTORY_WINDOW:]:  # Last 5 messages for context
             sender = "USER" if msg.get('sender') == 'user' else "MODEL"
-            message = msg.get('message', '')
+            message = summarize_widget(msg.get('message', ''))
             formatted.append(f"{sender}: {message}")
         
         return "\n".join(formatted)
@@ -404,8 +635,10 @@ Respond as Riley would in this consultation context, using {user_name}'s actual
                                       context: Dict, user_id: str) -> Optional[Dict]:
         """Handle special response cases like analysis completion or action plan generation."""
         
+        hits = SPECIAL_RESPONSE_MATCHER.scan(response)
+
         # Check if analysis was completed
-        if "priority_analysis_tool" in response or "analysis_result" in response.lower():
+        if "analysis_completed" in hits:
             logger.info("Priority analysis completed")
             return {
                 "message": response,
@@ -417,7 +650,7 @@ Respond as Riley would in this consultation context, using {user_name}'s actual
             }
         
         # Check if action plan was generated
-        if "generate_action_plan_tool" in response or "action_plan" in response.lower():
+        if "action_plan_generated" in hits:
             logger.info("Action plan generated")
             return {
                 "message": response,
@@ -429,7 +662,7 @@ Respond as Riley would in this consultation context, using {user_name}'s actual
             }
         
         # Handle consultation completion
-        if any(phrase in response.lower() for phrase in ["consultation complete", "summary", "next steps"]):
+        if "consultation_complete" in hits:
             return {
                 "message": response,
                 "status": "success",
@@ -0,0 +1,210 @@
+"""
+Lightweight per-request tracing for the Strategic Consultant Agent.
+
+A trace covers one consultation turn and holds a span per phase (session load, prompt
+build, model wait, tool execution, response handling). Finished traces go to an exporter
+(no-op, JSONL file or in-memory) and a bounded window of recent traces is kept so the
+slowest can be inspected from /debug. A disabled tracer hands out shared no-op objects.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A timed phase within a trace."""
+
+    __slots__ = ("name", "attributes", "_start", "_end")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        if self._end is None:
+            self._end = time.perf_counter()
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.end()
+
+    def to_dict(self, trace_start: float) -> Dict[str, Any]:
+        end = self._end if self._end is not None else time.perf_counter()
+        return {
+            "name": self.name,
+            "offset_ms": round((self._start - trace_start) * 1000, 3),
+            "duration_ms": round((end - self._start) * 1000, 3),
+            "attributes": self.attributes
+        }
+
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.spans: List[Span] = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def span(self, name: str, **attributes: Any) -> Span:
+        """Start a span; use it as a context manager or call end() on it."""
+        span = Span(name, attributes)
+        self.spans.append(span)
+        return span
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        """Close the trace (and any open spans) and hand it to the tracer. Idempotent."""
+        if self.duration_ms is not None:
+            return
+        for span in self.spans:
+            span.end()
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "spans": [span.to_dict(self._start) for span in self.spans]
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+class _NoopTrace:
+    __slots__ = ()
+
+    def span(self, name: str, **attributes: Any) -> _NoopSpan:
+        return _NOOP_SPAN
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_NOOP_TRACE = _NoopTrace()
+
+
+class NoopExporter:
+    """Discards finished traces (they still feed the tracer's recent-trace window)."""
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        pass
+
+
+class InMemoryExporter:
+    """Keeps the last `max_traces` finished traces in memory."""
+
+    def __init__(self, max_traces: int = 1000):
+        self.traces: deque = deque(maxlen=max_traces)
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        self.traces.append(trace)
+
+
+class JsonlExporter:
+    """Appends each finished trace as one JSON line to a file."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        line = json.dumps(trace, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+class Tracer:
+    """Creates traces and keeps a window of recent ones for `slowest`."""
+
+    def __init__(self, exporter=None, enabled: bool = True, recent: int = 500):
+        """
+        Args:
+            exporter: Receives each finished trace as a dict (defaults to NoopExporter)
+            enabled: When False, start_trace returns a shared no-op trace
+            recent: Number of recent traces kept for `slowest`
+        """
+        self.exporter = exporter or NoopExporter()
+        self.enabled = enabled
+        self._recent: deque = deque(maxlen=recent)
+
+    def start_trace(self, name: str, **attributes: Any):
+        if not self.enabled:
+            return _NOOP_TRACE
+        return Trace(self, name, attributes)
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The slowest of the recent traces, slowest first."""
+        return sorted(list(self._recent), key=lambda trace: trace["duration_ms"], reverse=True)[:limit]
+
+    def _finish(self, trace: Trace) -> None:
+        data = trace.to_dict()
+        self._recent.append(data)
+        try:
+            self.exporter.export(data)
+        except Exception as e:
+            logger.warning(f"Trace export failed: {e}")
+
+
+def create_tracer() -> Tracer:
+    """
+    Build the tracer configured by CONSULTANT_TRACE_EXPORTER: "none" disables tracing,
+    "memory" (default) keeps traces in memory, "jsonl" appends them to CONSULTANT_TRACE_FILE.
+    """
+    exporter = os.getenv("CONSULTANT_TRACE_EXPORTER", "memory").lower()
+    if exporter == "none":
+        return Tracer(enabled=False)
+    if exporter == "jsonl":
+        default_path = os.path.join(os.path.dirname(__file__), "..", ".data", "traces.jsonl")
+        return Tracer(JsonlExporter(os.getenv("CONSULTANT_TRACE_FILE", default_path)))
+    if exporter != "memory":
+        logger.warning(f"Unknown CONSULTANT_TRACE_EXPORTER {exporter!r}; keeping traces in memory")
+    return Tracer(InMemoryExporter())
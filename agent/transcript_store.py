@@ -0,0 +1,160 @@
+"""
+Canonical per-session consultation transcripts for the Strategic Consultant Agent.
+Clients send only the new user message; the server keeps the user/AI exchange.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .session_store import DEFAULT_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+"""
+
+
+def message_fingerprint(message: Dict) -> str:
+    """Stable digest of a transcript message, used to check two transcripts line up."""
+    return hashlib.sha1(f"{message.get('sender')}:{message.get('message', '')}".encode("utf-8")).hexdigest()
+
+
+class TranscriptStore:
+    """
+    Append-only message log per session, stored in SQLite.
+
+    The transcript version is simply its length: a client that knows version N can fetch
+    messages[N:] to resync. Transcripts idle for longer than the TTL are purged.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 7 * 24 * 3600, sweep_interval: float = 300.0):
+        """
+        Args:
+            db_path: SQLite database file (created if missing; may be shared with the session store)
+            ttl_seconds: Idle time after which a transcript is deleted
+            sweep_interval: Minimum seconds between expiry sweeps
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def length(self, app_name: str, user_id: str, session_id: str) -> int:
+        """Return the transcript version (number of stored messages)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM transcripts WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id)
+            ).fetchone()
+        return row[0]
+
+    def read(self, app_name: str, user_id: str, session_id: str, since: int = 0,
+             last: Optional[int] = None) -> List[Dict]:
+        """Return messages from position `since` onwards, or only the trailing `last` messages."""
+        query = "SELECT sender, message FROM transcripts WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq >= ?"
+        params = (app_name, user_id, session_id, since)
+        with self._lock:
+            if last is not None:
+                rows = self._conn.execute(query + " ORDER BY seq DESC LIMIT ?", params + (last,)).fetchall()[::-1]
+            else:
+                rows = self._conn.execute(query + " ORDER BY seq", params).fetchall()
+        return [{"sender": sender, "message": message} for sender, message in rows]
+
+    def append(self, app_name: str, user_id: str, session_id: str, messages: List[Dict]) -> int:
+        """Append messages and return the new transcript version."""
+        self._maybe_sweep()
+        now = time.time()
+        with self._transaction():
+            start = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM transcripts WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO transcripts (app_name, user_id, session_id, seq, sender, message, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(app_name, user_id, session_id, start + i, msg.get('sender', 'user'), msg.get('message', ''), now)
+                 for i, msg in enumerate(messages)]
+            )
+        return start + len(messages)
+
+    def sync(self, app_name: str, user_id: str, session_id: str, history: List[Dict]) -> int:
+        """
+        Reconcile with a full client-side history (legacy clients).
+
+        If the history extends the stored transcript only the extra messages are appended;
+        otherwise the client's copy replaces the stored one. Returns the new version.
+        """
+        version = self.length(app_name, user_id, session_id)
+        if version <= len(history):
+            tail = self.read(app_name, user_id, session_id, last=1)
+            if not tail or message_fingerprint(tail[0]) == message_fingerprint(history[version - 1]):
+                if len(history) > version:
+                    return self.append(app_name, user_id, session_id, history[version:])
+                return version
+
+        logger.info(f"Transcript for session {session_id} diverged from client history; replacing it")
+        self.delete(app_name, user_id, session_id)
+        return self.append(app_name, user_id, session_id, history)
+
+    def delete(self, app_name: str, user_id: str, session_id: str) -> None:
+        with self._transaction():
+            self._conn.execute(
+                "DELETE FROM transcripts WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id)
+            )
+
+    def purge_expired(self) -> int:
+        """Delete transcripts whose newest message is older than the TTL. Returns rows removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._transaction():
+            removed = self._conn.execute(
+                "DELETE FROM transcripts WHERE (app_name, user_id, session_id) IN "
+                "(SELECT app_name, user_id, session_id FROM transcripts GROUP BY app_name, user_id, session_id "
+                "HAVING MAX(created) < ?)",
+                (cutoff,)
+            ).rowcount
+        return removed
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.purge_expired()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+
+def create_transcript_store() -> TranscriptStore:
+    """Build the transcript store configured by environment variables."""
+    return TranscriptStore(
+        db_path=os.getenv("CONSULTANT_SESSION_DB", DEFAULT_DB_PATH),
+        ttl_seconds=float(os.getenv("CONSULTANT_SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+    )
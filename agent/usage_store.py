@@ -0,0 +1,180 @@
+"""
+Token and cost accounting for the Strategic Consultant Agent.
+Model usage is summed per turn and accumulated per session and conversation stage in SQLite,
+next to the session store, so spend can be broken down by stage.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any
+
+from .session_store import DEFAULT_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ("turns", "llm_calls", "prompt_tokens", "cached_tokens", "completion_tokens", "tool_calls")
+
+# USD per million tokens; defaults approximate gemini-2.5-flash list prices, override per deployment
+PRICING = {
+    "input": float(os.getenv("CONSULTANT_PRICE_INPUT_PER_MTOK", "0.30")),
+    "cached_input": float(os.getenv("CONSULTANT_PRICE_CACHED_INPUT_PER_MTOK", "0.075")),
+    "output": float(os.getenv("CONSULTANT_PRICE_OUTPUT_PER_MTOK", "2.50"))
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_usage (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    turns INTEGER NOT NULL DEFAULT 0,
+    llm_calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    tool_calls INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, stage)
+);
+"""
+
+
+def estimate_cost(usage: Dict[str, int]) -> float:
+    """Estimated USD cost of a usage record (cached tokens are a subset of prompt tokens)."""
+    uncached = usage.get("prompt_tokens", 0) - usage.get("cached_tokens", 0)
+    return round((uncached * PRICING["input"]
+                  + usage.get("cached_tokens", 0) * PRICING["cached_input"]
+                  + usage.get("completion_tokens", 0) * PRICING["output"]) / 1_000_000, 6)
+
+
+class TurnUsage:
+    """Model usage accumulated over one consultation turn."""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+
+    def add_model_usage(self, usage_metadata) -> None:
+        """Fold in the usage_metadata of one (non-partial) model response."""
+        self.llm_calls += 1
+        self.prompt_tokens += usage_metadata.prompt_token_count or 0
+        self.cached_tokens += usage_metadata.cached_content_token_count or 0
+        self.completion_tokens += usage_metadata.candidates_token_count or 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        usage = {
+            "turns": 1,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_calls": self.tool_calls
+        }
+        usage["cost_usd"] = estimate_cost(usage)
+        return usage
+
+
+class UsageStore:
+    """Per-session, per-stage usage totals in SQLite; entries idle longer than the TTL are purged."""
+
+    def __init__(self, db_path: str, ttl_seconds: float = 7 * 24 * 3600, sweep_interval: float = 300.0):
+        """
+        Args:
+            db_path: SQLite database file (created if missing; may be shared with the session store)
+            ttl_seconds: Idle time after which a session's usage is deleted
+            sweep_interval: Minimum seconds between expiry sweeps
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def record(self, app_name: str, user_id: str, session_id: str, stage: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a turn's usage to the session's totals and return the updated session totals."""
+        self._maybe_sweep()
+        values = [usage.get(field, 0) for field in USAGE_FIELDS]
+        with self._transaction():
+            self._conn.execute(
+                f"INSERT INTO session_usage (app_name, user_id, session_id, stage, {', '.join(USAGE_FIELDS)}, updated) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in USAGE_FIELDS)}, ?) "
+                f"ON CONFLICT (app_name, user_id, session_id, stage) DO UPDATE SET "
+                + ", ".join(f"{field} = {field} + excluded.{field}" for field in USAGE_FIELDS)
+                + ", updated = excluded.updated",
+                (app_name, user_id, session_id, stage, *values, time.time())
+            )
+        return self.session_usage(app_name, user_id, session_id)["total"]
+
+    def session_usage(self, app_name: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        """Return the session's usage totals and their breakdown by conversation stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT stage, {', '.join(USAGE_FIELDS)} FROM session_usage "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY stage",
+                (app_name, user_id, session_id)
+            ).fetchall()
+
+        total = dict.fromkeys(USAGE_FIELDS, 0)
+        by_stage = {}
+        for stage, *values in rows:
+            stage_usage = dict(zip(USAGE_FIELDS, values))
+            stage_usage["cost_usd"] = estimate_cost(stage_usage)
+            by_stage[stage] = stage_usage
+            for field, value in zip(USAGE_FIELDS, values):
+                total[field] += value
+        total["cost_usd"] = estimate_cost(total)
+        return {"total": total, "by_stage": by_stage}
+
+    def delete(self, app_name: str, user_id: str, session_id: str) -> None:
+        with self._transaction():
+            self._conn.execute(
+                "DELETE FROM session_usage WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id)
+            )
+
+    def purge_expired(self) -> int:
+        """Delete usage for sessions idle longer than the TTL. Returns rows removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._transaction():
+            removed = self._conn.execute(
+                "DELETE FROM session_usage WHERE (app_name, user_id, session_id) IN "
+                "(SELECT app_name, user_id, session_id FROM session_usage GROUP BY app_name, user_id, session_id "
+                "HAVING MAX(updated) < ?)",
+                (cutoff,)
+            ).rowcount
+        return removed
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.purge_expired()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+
+def create_usage_store() -> UsageStore:
+    """Build the usage store configured by environment variables."""
+    return UsageStore(
+        db_path=os.getenv("CONSULTANT_SESSION_DB", DEFAULT_DB_PATH),
+        ttl_seconds=float(os.getenv("CONSULTANT_SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+    )
@@ -0,0 +1,190 @@
+"""
+Latency benchmark for course search: the HTTP fast path (pooled client + streaming card
+parser) against the browser path, both served by the local fixture server
+(benchmarks/course_fixture_server.py), so no network access is needed.
+
+The browser path is measured twice when Selenium and Chrome are available: "browser_cold"
+starts a browser per search (the old behaviour) and "browser_pooled" reuses a warm one
+from common/browser_pool.py. Reports latency percentiles per path as JSON.
+
+Usage: python benchmarks/bench_course_fetch.py --rounds 20 --latency-ms 50 --output fetch.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import timeit
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from common.course_search import CourseSearchFetcher, extract_course_cards, course_search_url
+from benchmarks.course_fixture_server import load_fixtures
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+KEYWORDS = ["nursing", "electrician", "cyber security"]
+
+CARD_SELECTOR = 'flex.items-start.px-3.py-4.lg\\:px-0'
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 2)
+
+
+def _summarize(latencies_ms: List[float], cards: List[int]) -> Dict[str, Any]:
+    return {
+        "searches": len(latencies_ms),
+        "cards_min": min(cards) if cards else None,
+        "p50_ms": _percentile(latencies_ms, 50),
+        "p95_ms": _percentile(latencies_ms, 95),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None
+    }
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, log_path: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with {process.returncode}; see {log_path}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not healthy after {timeout}s; see {log_path}")
+
+
+def bench_parse() -> Dict[str, Any]:
+    """Parse time per saved page, with no I/O."""
+    report = {}
+    for slug, page in load_fixtures().items():
+        if slug.startswith("_"):
+            continue
+        runs = 50
+        seconds = timeit.timeit(lambda: extract_course_cards(page), number=runs)
+        report[slug] = {"bytes": len(page), "cards": len(extract_course_cards(page)),
+                        "parse_ms": round(seconds / runs * 1000, 3)}
+    return report
+
+
+async def bench_http(base_url: str, rounds: int) -> Dict[str, Any]:
+    fetcher = CourseSearchFetcher(base_url=base_url)
+    latencies, cards = [], []
+    try:
+        await fetcher.fetch_static(KEYWORDS[0])  # open the pooled connection
+        for _ in range(rounds):
+            for keyword in KEYWORDS:
+                started = time.perf_counter()
+                found = await fetcher.fetch_static(keyword)
+                latencies.append((time.perf_counter() - started) * 1000)
+                cards.append(len(found))
+    finally:
+        await fetcher.close()
+    return _summarize(latencies, cards)
+
+
+def _collect(driver, url: str) -> List[str]:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, CARD_SELECTOR)))
+    return [div.get_attribute('outerHTML') for div in driver.find_elements(By.CLASS_NAME, CARD_SELECTOR)]
+
+
+def bench_browser(base_url: str, rounds: int) -> Dict[str, Any]:
+    try:
+        from common.browser_pool import BrowserPool, chrome_driver_factory
+        factory = chrome_driver_factory(page_load_timeout=20)
+    except ImportError as e:
+        return {"skipped": f"Selenium unavailable: {e}"}
+
+    report = {}
+    latencies, cards = [], []
+    for keyword in KEYWORDS:
+        # The old behaviour: a fresh browser per search
+        started = time.perf_counter()
+        driver = factory()
+        try:
+            found = _collect(driver, course_search_url(keyword, base_url))
+        finally:
+            driver.quit()
+        latencies.append((time.perf_counter() - started) * 1000)
+        cards.append(len(found))
+    report["browser_cold"] = _summarize(latencies, cards)
+
+    pool = BrowserPool(factory, size=1)
+    latencies, cards = [], []
+    try:
+        pool.run(_collect, course_search_url(KEYWORDS[0], base_url))  # warm up
+        for _ in range(rounds):
+            for keyword in KEYWORDS:
+                started = time.perf_counter()
+                found = pool.run(_collect, course_search_url(keyword, base_url))
+                latencies.append((time.perf_counter() - started) * 1000)
+                cards.append(len(found))
+    finally:
+        pool.close()
+    report["browser_pooled"] = _summarize(latencies, cards)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the keyword list per path")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fixture server think time per page")
+    parser.add_argument("--no-browser", action="store_true", help="Skip the browser paths")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="course-fetch-bench-")
+    server_log = os.path.join(workdir, "fixture_server.log")
+    base_url = f"http://127.0.0.1:{args.port}/course-search"
+    with open(server_log, "wb") as log:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join("benchmarks", "course_fixture_server.py"), "--port", str(args.port),
+             "--latency-ms", str(args.latency_ms)],
+            cwd=REPO_ROOT, stdout=log, stderr=subprocess.STDOUT
+        )
+    try:
+        _wait_healthy(f"http://127.0.0.1:{args.port}/health", server, server_log, timeout=30)
+        report = {
+            "timestamp": time.time(),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "parse": bench_parse(),
+            "http": asyncio.run(bench_http(base_url, args.rounds))
+        }
+        if not args.no_browser:
+            report.update(bench_browser(base_url, args.rounds))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark for the offline course index (common/course_index.py), with no network access.
+
+The saved search pages in benchmarks/fixtures/course_search are ingested, then the
+catalogue is padded with synthetic courses (recombined titles, codes, study modes and
+locations) up to --courses. Reports ingestion and build time, how long opening the
+memory-mapped index takes against re-parsing the saved pages, the cost of re-ingesting
+unchanged pages, and query latency percentiles, as JSON.
+
+Usage: python benchmarks/bench_course_index.py --courses 5000 --queries 2000 --output index.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from common.course_index import CourseCatalogue, CourseIndex, build_index
+from common.course_search import extract_course_cards, parse_course_card
+from benchmarks.course_fixture_server import FIXTURE_DIR, load_fixtures
+
+QUERIES = ["nursing", "diploma of nursing", "electrician", "electric", "cyber security", "HLT54121",
+           "certificate iii online", "part time sydney", "community services", "automotive", "accounting"]
+
+LEVELS = ["Certificate II in", "Certificate III in", "Certificate IV in", "Diploma of", "Advanced Diploma of"]
+SUBJECTS = ["Nursing", "Electrotechnology", "Cyber Security", "Accounting", "Automotive Mechanical Technology",
+            "Community Services", "Early Childhood Education and Care", "Commercial Cookery", "Plumbing",
+            "Information Technology", "Business", "Horticulture", "Fitness", "Mental Health", "Carpentry"]
+MODES = ["On campus", "Online", "Blended", "Full time, on campus", "Part time, online", "Workplace"]
+LOCATIONS = ["Sydney", "Ultimo", "Newcastle", "Wollongong", "Randwick", "Meadowbank", "Orange", "Albury",
+             "Online"]
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 3)
+
+
+def synthetic_courses(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    courses = []
+    for number in range(count):
+        title = f"{rng.choice(LEVELS)} {rng.choice(SUBJECTS)}"
+        code = f"SYN{number:05d}"
+        courses.append({
+            "title": title,
+            "code": code,
+            "study_mode": rng.choice(MODES),
+            "location": ", ".join(rng.sample(LOCATIONS, rng.randint(1, 3))),
+            "duration": f"{rng.randint(6, 36)} months",
+            "url": f"https://www.tafensw.edu.au/course/{code.lower()}",
+            "summary": f"Build skills for a career in {title.split(' in ')[-1].split(' of ')[-1].lower()}."
+        })
+    return courses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=5000, help="Catalogue size after synthetic padding")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries timed (cycling over the query list)")
+    parser.add_argument("--limit", type=int, default=10, help="Results per query")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="course-index-bench-")
+    catalogue = CourseCatalogue(os.path.join(workdir, "catalogue.db"))
+    index_path = os.path.join(workdir, "course_index.bin")
+
+    started = time.perf_counter()
+    fixtures = catalogue.ingest_directory(FIXTURE_DIR)
+    fixture_seconds = time.perf_counter() - started
+    padding = max(0, args.courses - len(catalogue))
+    started = time.perf_counter()
+    catalogue.upsert(synthetic_courses(padding))
+    synthetic_seconds = time.perf_counter() - started
+    build = build_index(catalogue, index_path)
+
+    # Re-ingesting unchanged pages only marks courses as seen, and leaves the index as built
+    started = time.perf_counter()
+    reingest = catalogue.ingest_directory(FIXTURE_DIR)
+    rebuild = build_index(catalogue, index_path)
+    reingest_ms = (time.perf_counter() - started) * 1000
+
+    # Startup: map the index against parsing the saved pages again
+    started = time.perf_counter()
+    index = CourseIndex(index_path)
+    open_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for page in load_fixtures().values():
+        for card in extract_course_cards(page):
+            parse_course_card(card)
+    reparse_ms = (time.perf_counter() - started) * 1000
+
+    latencies, results = [], []
+    for number in range(args.queries):
+        query = QUERIES[number % len(QUERIES)]
+        started = time.perf_counter()
+        hits = index.search(query, args.limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(len(hits))
+
+    report = {
+        "timestamp": time.time(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "ingest": {"fixtures": fixtures, "fixture_ms": round(fixture_seconds * 1000, 2),
+                   "synthetic_courses": padding, "synthetic_ms": round(synthetic_seconds * 1000, 2)},
+        "build": build,
+        "reingest_unchanged": {"counts": reingest, "rebuilt": rebuild["built"], "ms": round(reingest_ms, 2)},
+        "startup": {"mmap_open_ms": round(open_ms, 3), "fixture_reparse_ms": round(reparse_ms, 3)},
+        "query": {
+            "queries": len(latencies),
+            "results_min": min(results) if results else None,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None
+        },
+        "top_hits": {query: [record["title"] for _, record in index.search(query, 3)] for query in QUERIES}
+    }
+    index.close()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
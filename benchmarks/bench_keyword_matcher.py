@@ -0,0 +1,150 @@
+"""
+Micro-benchmark for _handle_special_responses' marker detection across response sizes:
+the original per-phrase scans, a single compiled regex alternation, a pure-Python
+Aho-Corasick automaton, and KeywordMatcher. The 256 B case is also the size of the user
+messages ConversationState.classify scans every turn.
+
+Usage: python benchmarks/bench_keyword_matcher.py
+"""
+
+import os
+import re
+import sys
+import random
+import timeit
+from collections import deque
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agent.task_manager import SPECIAL_RESPONSE_MATCHER
+
+SIZES = [256, 1024, 8 * 1024, 64 * 1024]
+
+WORDS = ("riley strategic priorities department students industry analysis consider "
+         "importance urgency framework eisenhower matrix impact effort recommendations").split()
+
+
+def make_response(size: int) -> str:
+    rng = random.Random(size)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS).capitalize() if rng.random() < 0.1 else rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def naive_special_responses(response: str) -> str:
+    """The checks _handle_special_responses made before the shared matcher."""
+    if "priority_analysis_tool" in response or "analysis_result" in response.lower():
+        return "analysis_completed"
+    if "generate_action_plan_tool" in response or "action_plan" in response.lower():
+        return "action_plan_generated"
+    if any(phrase in response.lower() for phrase in ["consultation complete", "summary", "next steps"]):
+        return "consultation_complete"
+    return ""
+
+
+SPECIAL_PHRASES = {
+    "analysis_completed": ["priority_analysis_tool", "analysis_result"],
+    "action_plan_generated": ["generate_action_plan_tool", "action_plan"],
+    "consultation_complete": ["consultation complete", "summary", "next steps"]
+}
+PHRASE_CATEGORY = {phrase: category for category, phrases in SPECIAL_PHRASES.items() for phrase in phrases}
+ALTERNATION = re.compile(
+    "|".join(re.escape(phrase) for phrase in sorted(PHRASE_CATEGORY, key=len, reverse=True)),
+    re.IGNORECASE
+)
+
+
+def regex_special_responses(response: str) -> str:
+    hits = {PHRASE_CATEGORY[match.group().lower()] for match in ALTERNATION.finditer(response)}
+    for category in SPECIAL_PHRASES:
+        if category in hits:
+            return category
+    return ""
+
+
+class AhoCorasick:
+    """Single-pass multi-phrase automaton (goto/fail/output), built once over the lower-cased phrases."""
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        for phrase in phrases:
+            state = 0
+            for char in phrase:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(phrase)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def find(self, text: str) -> set:
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+AUTOMATON = AhoCorasick(PHRASE_CATEGORY)
+
+
+def aho_corasick_special_responses(response: str) -> str:
+    hits = {PHRASE_CATEGORY[phrase] for phrase in AUTOMATON.find(response.lower())}
+    for category in SPECIAL_PHRASES:
+        if category in hits:
+            return category
+    return ""
+
+
+def matcher_special_responses(response: str) -> str:
+    hits = SPECIAL_RESPONSE_MATCHER.scan(response)
+    for category in ("analysis_completed", "action_plan_generated", "consultation_complete"):
+        if category in hits:
+            return category
+    return ""
+
+
+def main():
+    print(f"{'size':>8} {'naive_us':>10} {'regex_us':>10} {'aho_us':>10} {'matcher_us':>11} {'speedup':>8}")
+    for size in SIZES:
+        response = make_response(size)
+        expected = naive_special_responses(response)
+        assert regex_special_responses(response) == expected
+        assert aho_corasick_special_responses(response) == expected
+        assert matcher_special_responses(response) == expected
+
+        number = max(20, 200000 // size)
+        timings = [
+            min(timeit.repeat(lambda: scan(response), number=number, repeat=5)) / number
+            for scan in (naive_special_responses, regex_special_responses, aho_corasick_special_responses,
+                         matcher_special_responses)
+        ]
+        naive, regex, aho, matcher = timings
+        print(f"{size:>8} {naive * 1e6:>10.2f} {regex * 1e6:>10.2f} {aho * 1e6:>10.2f} {matcher * 1e6:>11.2f} "
+              f"{naive / matcher:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
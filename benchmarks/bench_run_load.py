@@ -0,0 +1,271 @@
+"""
+End-to-end throughput benchmark for /run.
+
+Starts the fake model endpoint (benchmarks/fake_llm_server.py) and the real agent server
+(python -m agent) pointed at it, then drives scripted multi-turn consultations at the given
+concurrency. Reports latency percentiles, requests/sec and the agent server's CPU and RSS
+over time as JSON, for tracking regressions between runs.
+
+Usage: python benchmarks/bench_run_load.py --consultations 40 --concurrency 8 --output run.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# User turns of one consultation, following Riley's structured sequence
+CONSULTATION_SCRIPT = [
+    "Hi Riley",
+    "About 4 years",
+    "12 years overall",
+    "Yes, 6 teachers report to me",
+    "The faculty director, student services and the timetabling team",
+    "Local employers, the industry association and a few schools",
+    "Somewhat familiar",
+    "Enrolment and completion trends by campus",
+    "Staffing and equipment are the main pressures",
+    "Thanks, that was great"
+]
+
+CONTEXT = {"name": "Sam Taylor", "role": "Head Teacher", "department": "Plumbing"}
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 2)
+
+
+class ProcessSampler(threading.Thread):
+    """Samples a process's CPU utilisation and RSS from /proc at a fixed interval (Linux)."""
+
+    def __init__(self, pid: int, interval: float):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop_event = threading.Event()
+        self._ticks = os.sysconf("SC_CLK_TCK")
+
+    def _read(self):
+        with open(f"/proc/{self.pid}/stat") as stat_file:
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / self._ticks  # utime + stime
+        rss_kb = 0
+        with open(f"/proc/{self.pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    rss_kb = int(line.split()[1])
+        return cpu_seconds, rss_kb
+
+    def run(self):
+        start = time.monotonic()
+        last_wall, (last_cpu, _) = start, self._read()
+        while not self._stop_event.wait(self.interval):
+            try:
+                cpu, rss_kb = self._read()
+            except (OSError, IndexError, ValueError):
+                break
+            now = time.monotonic()
+            self.samples.append({
+                "t": round(now - start, 2),
+                "cpu_percent": round((cpu - last_cpu) / (now - last_wall) * 100, 1),
+                "rss_mb": round(rss_kb / 1024, 1)
+            })
+            last_wall, last_cpu = now, cpu
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _start(command: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, log_path: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with {process.returncode}; see {log_path}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not healthy after {timeout}s; see {log_path}")
+
+
+async def _run_consultation(client: httpx.AsyncClient, index: int, results: List[Dict[str, Any]]) -> None:
+    session_id = f"bench-{uuid.uuid4()}"
+    context = dict(CONTEXT, user_id=f"bench-user-{index}")
+    for turn, message in enumerate(CONSULTATION_SCRIPT):
+        start = time.perf_counter()
+        status, error, scripted = None, None, False
+        try:
+            response = await client.post("/run", json={"message": message, "context": context, "session_id": session_id})
+            status = response.status_code
+            body = response.json()
+            if status != 200 or body.get("status") != "success":
+                error = body.get("message") or body.get("detail") or f"HTTP {status}"
+            scripted = bool(body.get("data", {}).get("scripted"))
+        except (httpx.HTTPError, ValueError) as e:
+            error = str(e) or type(e).__name__
+        results.append({
+            "consultation": index, "turn": turn, "status": status, "error": error, "scripted": scripted,
+            "latency_ms": (time.perf_counter() - start) * 1000
+        })
+
+
+async def _drive(base_url: str, consultations: int, concurrency: int, timeout: float) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int):
+        async with semaphore:
+            await _run_consultation(client, index, results)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(i) for i in range(consultations)))
+        duration = time.perf_counter() - start
+    return {"results": results, "duration_s": duration}
+
+
+def _summarize(results: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    def stats(rows):
+        latencies = [row["latency_ms"] for row in rows]
+        return {
+            "count": len(rows),
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+            "max": round(max(latencies), 2) if latencies else None
+        }
+
+    ok = [row for row in results if row["error"] is None]
+    errors: Dict[str, int] = {}
+    for row in results:
+        if row["error"] is not None:
+            errors[row["error"][:120]] = errors.get(row["error"][:120], 0) + 1
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_messages": errors,
+        "duration_s": round(duration, 3),
+        "requests_per_sec": round(len(results) / duration, 2) if duration else None,
+        "latency_ms": stats(ok),
+        "latency_ms_scripted": stats([row for row in ok if row["scripted"]]),
+        "latency_ms_model": stats([row for row in ok if not row["scripted"]]),
+        "latency_ms_by_turn": {str(turn): stats([row for row in ok if row["turn"] == turn])
+                               for turn in range(len(CONSULTATION_SCRIPT))}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--consultations", type=int, default=20, help="Consultations to run (each is the full script)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Consultations in flight at once")
+    parser.add_argument("--agent-port", type=int, default=8104)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="Fake model time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="Fake model generation rate")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="Fake model reply length")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of model calls that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--no-tool-calls", action="store_true", help="Fake model never calls widget tools")
+    parser.add_argument("--no-scripted", action="store_true", help="Send scripted stages to the model too")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between CPU/RSS samples")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="riley-bench-")
+    llm_log, agent_log = os.path.join(workdir, "fake_llm.log"), os.path.join(workdir, "agent.log")
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(args.agent_port),
+        "CONSULTANT_MODEL": "openai/fake-riley",
+        "CONSULTANT_MODEL_API_BASE": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENAI_API_KEY": "fake",
+        "CONSULTANT_SESSION_DB": os.path.join(workdir, "sessions.db"),
+        "CONSULTANT_SCRIPTED_STAGES": "false" if args.no_scripted else "true",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True"
+    })
+
+    llm_command = [
+        sys.executable, os.path.join("benchmarks", "fake_llm_server.py"), "--port", str(args.llm_port),
+        "--latency-ms", str(args.latency_ms), "--tokens-per-sec", str(args.tokens_per_sec),
+        "--reply-tokens", str(args.reply_tokens), "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status), "--seed", "1"
+    ] + (["--no-tool-calls"] if args.no_tool_calls else [])
+
+    processes = []
+    try:
+        fake_llm = _start(llm_command, env, llm_log)
+        processes.append(fake_llm)
+        _wait_healthy(f"http://127.0.0.1:{args.llm_port}/health", fake_llm, llm_log, timeout=30)
+
+        agent = _start([sys.executable, "-m", "agent"], env, agent_log)
+        processes.append(agent)
+        _wait_healthy(f"http://127.0.0.1:{args.agent_port}/health", agent, agent_log, timeout=120)
+
+        sampler = ProcessSampler(agent.pid, args.sample_interval)
+        sampler.start()
+        run = asyncio.run(_drive(f"http://127.0.0.1:{args.agent_port}", args.consultations,
+                                 args.concurrency, args.request_timeout))
+        sampler.stop()
+
+        cpu = [sample["cpu_percent"] for sample in sampler.samples]
+        rss = [sample["rss_mb"] for sample in sampler.samples]
+        report = {
+            "timestamp": time.time(),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "turns_per_consultation": len(CONSULTATION_SCRIPT),
+            "model_calls": httpx.get(f"http://127.0.0.1:{args.llm_port}/health").json()["requests"],
+            **_summarize(run["results"], run["duration_s"]),
+            "server": {
+                "cpu_percent_mean": round(sum(cpu) / len(cpu), 1) if cpu else None,
+                "cpu_percent_max": max(cpu) if cpu else None,
+                "rss_mb_max": max(rss) if rss else None,
+                "samples": sampler.samples
+            },
+            "logs": {"agent": agent_log, "fake_llm": llm_log}
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
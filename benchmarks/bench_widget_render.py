@@ -0,0 +1,56 @@
+"""
+Micro-benchmark for widget rendering: a cold render (template fill, encode, gzip, ETag)
+against a memoised cache hit for each widget type, plus the cache's memory footprint.
+
+Usage: python benchmarks/bench_widget_render.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agent.widgets import WidgetRenderer, WIDGET_TYPES
+
+CUSTOM_ARGS = {
+    "single_choice": {"question": "Which delivery mode suits your learners best?",
+                      "options": ["Face to face", "Online", "Blended", "Workplace based"]},
+    "rating_scale": {"question": "Rate these barriers to completion:",
+                     "items": [f"Barrier {i}" for i in range(8)], "scale_size": 7,
+                     "low_label": "Minor", "high_label": "Severe"},
+    "rating_scale_v2": {"question": "Rank these digital initiatives:",
+                        "items": [f"Initiative {i}" for i in range(6)], "scale_size": 6},
+    "checklist": {"question": "Which partnerships would you expand?",
+                  "options": [f"Partner type {i}" for i in range(10)], "allow_other": False},
+}
+
+
+def main():
+    print(f"{'type':>16} {'cold_us':>10} {'hit_us':>8} {'speedup':>8} {'bytes':>8}")
+    for type_name in WIDGET_TYPES:
+        args = CUSTOM_ARGS[type_name]
+
+        def cold():
+            renderer = WidgetRenderer()
+            renderer.get(renderer.register(type_name, args))
+
+        renderer = WidgetRenderer()
+        widget_id = renderer.register(type_name, args)
+        widget = renderer.get(widget_id)
+
+        number = 200
+        cold_time = min(timeit.repeat(cold, number=number, repeat=5)) / number
+        hit_time = min(timeit.repeat(lambda: renderer.get(renderer.register(type_name, args)),
+                                     number=number * 10, repeat=5)) / (number * 10)
+        print(f"{type_name:>16} {cold_time * 1e6:>10.1f} {hit_time * 1e6:>8.1f} "
+              f"{cold_time / hit_time:>7.1f}x {widget.size:>8}")
+
+    renderer = WidgetRenderer(max_cache_bytes=1024 * 1024)
+    for i in range(500):
+        renderer.get(renderer.register("checklist", {"question": f"Question {i}", "options": ["Yes", "No"]}))
+    print(f"\n500 distinct checklists with a 1MB cap: {renderer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Local stand-in for the TAFE NSW course-search page, serving saved result pages from
+benchmarks/fixtures/course_search. Point the course agent at it with
+TAFE_COURSE_SEARCH_URL=http://127.0.0.1:<port>/course-search.
+
+A keyword is served the fixture named after it ("cyber security" -> cyber-security.html),
+or the no-results page. --client-rendered serves a page whose cards are injected by script
+after load, so only the browser fallback can see them.
+
+Usage: python benchmarks/course_fixture_server.py --port 8200 --latency-ms 150
+"""
+
+import os
+import re
+import html
+import asyncio
+import argparse
+from typing import Dict
+
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "course_search")
+NO_RESULTS = "_no_results"
+CLIENT_RENDERED = "_client_rendered"
+
+
+def fixture_slug(keyword: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", keyword.lower()).strip("-")
+
+
+def load_fixtures(directory: str = FIXTURE_DIR) -> Dict[str, str]:
+    """Saved pages by slug (file name without .html)."""
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                pages[name[:-5]] = f.read()
+    return pages
+
+
+def create_app(latency_ms: float = 0.0, client_rendered: bool = False, directory: str = FIXTURE_DIR) -> FastAPI:
+    app = FastAPI(title="Course search fixtures")
+    pages = load_fixtures(directory)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "fixtures": sorted(pages)}
+
+    @app.get("/course-search", response_class=HTMLResponse)
+    async def course_search(keyword: str = ""):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        slug = CLIENT_RENDERED if client_rendered else fixture_slug(keyword)
+        page = pages.get(slug) or pages[NO_RESULTS]
+        return page.replace("{keyword}", html.escape(keyword))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Server think time per page")
+    parser.add_argument("--client-rendered", action="store_true", help="Serve pages without static results")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms, args.client_rendered), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
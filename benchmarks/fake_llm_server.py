@@ -0,0 +1,204 @@
+"""
+Local stand-in for the model endpoint, speaking the OpenAI chat completions protocol that
+LiteLLM uses for "openai/..." models. Point the agent at it with
+CONSULTANT_MODEL=openai/fake-riley and CONSULTANT_MODEL_API_BASE=http://127.0.0.1:<port>/v1.
+
+Latency, token rate, error injection and tool calls are configurable. Tool calls follow
+the consultation: the first turn in a stage listed in STAGE_TOOLS calls that stage's widget
+tool, and the turn after a tool result echoes the widget marker as the agent instruction asks.
+
+Usage: python benchmarks/fake_llm_server.py --port 8100 --latency-ms 400 --tokens-per-sec 60
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from typing import Dict, Any, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Widget tool the stand-in calls on the first model turn of each stage
+STAGE_TOOLS = {
+    "performance_data_gathering": "single_choice_selection__tool",
+    "analysis_phase": "rating_scale_tool"
+}
+
+# Stage-specific sentences so the agent's stage heuristics progress as with the real model
+STAGE_LINES = {
+    "performance_data_gathering": "What additional data would be helpful for you in your role?",
+    "analysis_phase": "Here is my strategic analysis with recommendations for next steps.",
+    "consultation_complete": "It has been a pleasure helping you today."
+}
+
+FILLER = ("thank you for sharing that context it helps me understand the priorities for your area "
+          "and how they connect to industry partnerships student outcomes and resourcing").split()
+
+_STAGE_PATTERN = re.compile(r"Conversation Stage: (\w+)")
+
+
+class FakeLlmConfig:
+    """Behaviour of the stand-in endpoint."""
+
+    def __init__(self, latency_ms: float = 400.0, tokens_per_sec: float = 60.0, reply_tokens: int = 60,
+                 error_rate: float = 0.0, error_status: int = 500, tool_calls: bool = True, seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: Delay before the first token
+            tokens_per_sec: Generation rate after the first token (0 = instant)
+            reply_tokens: Length of generated text replies, in tokens (words)
+            error_rate: Fraction of requests answered with `error_status`
+            error_status: HTTP status used for injected errors (e.g. 500, 429, 503)
+            tool_calls: Call widget tools on the stages in STAGE_TOOLS
+            seed: Random seed for error injection
+        """
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tool_calls = tool_calls
+        self.rng = random.Random(seed)
+
+
+def _text_of(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _plan_reply(config: FakeLlmConfig, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Decide the reply for a request: a tool call, an echoed widget marker or generated text."""
+    messages = body.get("messages", [])
+    last = messages[-1] if messages else {}
+
+    if last.get("role") == "tool":
+        try:
+            marker = json.loads(_text_of(last)).get("message", "")
+        except (ValueError, AttributeError):
+            marker = ""
+        return {"content": marker or "Thanks, let's continue."}
+
+    stage_match = _STAGE_PATTERN.search(_text_of(last))
+    stage = stage_match.group(1) if stage_match else ""
+    tool = STAGE_TOOLS.get(stage)
+    tool_names = {tool_def.get("function", {}).get("name") for tool_def in body.get("tools") or []}
+    called = {call.get("function", {}).get("name")
+              for message in messages for call in message.get("tool_calls") or []}
+    if config.tool_calls and tool in tool_names and tool not in called:
+        return {"tool_call": {"id": f"call_{uuid.uuid4().hex[:12]}", "name": tool, "arguments": "{}"}}
+
+    words = [FILLER[i % len(FILLER)] for i in range(config.reply_tokens)]
+    line = STAGE_LINES.get(stage)
+    return {"content": " ".join(words).capitalize() + "." + (f" {line}" if line else "")}
+
+
+def _usage(body: Dict[str, Any], completion_tokens: int) -> Dict[str, int]:
+    prompt_tokens = sum(len(_text_of(message)) for message in body.get("messages", [])) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def create_app(config: FakeLlmConfig) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    app.state.config = config
+    app.state.requests = 0
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+        created = int(time.time())
+        model = body.get("model", "fake-riley")
+
+        await asyncio.sleep(config.latency_ms / 1000)
+        if config.error_rate and config.rng.random() < config.error_rate:
+            return JSONResponse(status_code=config.error_status, content={
+                "error": {"message": "Injected failure", "type": "server_error", "code": config.error_status}
+            })
+
+        reply = _plan_reply(config, body)
+        tokens = reply["content"].split(" ") if "content" in reply else []
+        delay = 1 / config.tokens_per_sec if config.tokens_per_sec else 0
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay * len(tokens))
+            if "tool_call" in reply:
+                call = reply["tool_call"]
+                message = {"role": "assistant", "content": None, "tool_calls": [{
+                    "id": call["id"], "type": "function",
+                    "function": {"name": call["name"], "arguments": call["arguments"]}
+                }]}
+                finish_reason = "tool_calls"
+            else:
+                message = {"role": "assistant", "content": reply["content"]}
+                finish_reason = "stop"
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": _usage(body, max(len(tokens), 1))
+            }
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage: Optional[Dict] = None) -> str:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if usage:
+                payload["usage"] = usage
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            if "tool_call" in reply:
+                call = reply["tool_call"]
+                yield chunk({"role": "assistant", "tool_calls": [{
+                    "index": 0, "id": call["id"], "type": "function",
+                    "function": {"name": call["name"], "arguments": call["arguments"]}
+                }]})
+                yield chunk({}, "tool_calls", _usage(body, 1))
+            else:
+                for i, token in enumerate(tokens):
+                    if i and delay:
+                        await asyncio.sleep(delay)
+                    yield chunk({"role": "assistant", "content": token if i == 0 else " " + token})
+                yield chunk({}, "stop", _usage(body, len(tokens)))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--no-tool-calls", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeLlmConfig(
+        latency_ms=args.latency_ms, tokens_per_sec=args.tokens_per_sec, reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate, error_status=args.error_status, tool_calls=not args.no_tool_calls, seed=args.seed
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
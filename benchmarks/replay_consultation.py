@@ -0,0 +1,130 @@
+"""
+Record a consultation's model exchanges to a cassette once, then replay them offline to
+profile TaskManager.process_task, session growth and serialization cost.
+
+Record against any LiteLLM-reachable model (the real one, or benchmarks/fake_llm_server.py
+via CONSULTANT_MODEL / CONSULTANT_MODEL_API_BASE):
+    python benchmarks/replay_consultation.py --cassette riley.jsonl --record
+
+Replay with no network, at recorded pace (--time-scale 1), faster, or instantly (0):
+    python benchmarks/replay_consultation.py --cassette riley.jsonl --time-scale 0 --profile
+
+The report includes the cassette's hit/miss counts; a miss means the prompt no longer
+matches the recording (e.g. a template change) and lists where it first diverges.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import cProfile
+import pstats
+import tempfile
+import io
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_run_load import CONSULTATION_SCRIPT, CONTEXT
+
+
+async def run_consultations(task_manager, consultations: int):
+    from agent.task_manager import A2A_APP_NAME
+
+    turns = []
+    # A fixed user id keeps prompts identical across runs; only the session id varies
+    context = dict(CONTEXT, user_id="replay-user")
+    for run in range(consultations):
+        session_id = f"replay-{uuid.uuid4()}"
+        for turn, message in enumerate(CONSULTATION_SCRIPT):
+            start = time.perf_counter()
+            result = await task_manager.process_task(message, context, session_id)
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            session = await task_manager.session_service.get_session(
+                app_name=A2A_APP_NAME, user_id=context["user_id"], session_id=session_id
+            )
+            serialize_start = time.perf_counter()
+            payload = session.model_dump_json()
+            serialize_ms = (time.perf_counter() - serialize_start) * 1000
+            turns.append({
+                "run": run,
+                "turn": turn,
+                "status": result.get("status"),
+                "scripted": bool(result.get("data", {}).get("scripted")),
+                "latency_ms": round(latency_ms, 2),
+                "session_events": len(session.events),
+                "session_bytes": len(payload),
+                "serialize_ms": round(serialize_ms, 3)
+            })
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", required=True, help="JSONL cassette to record to or replay from")
+    parser.add_argument("--record", action="store_true", help="Call the configured model and record its answers")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Replay pace relative to the recording")
+    parser.add_argument("--strict", action="store_true", help="Fail on prompts missing from the cassette")
+    parser.add_argument("--consultations", type=int, default=1, help="Times to run the scripted consultation")
+    parser.add_argument("--profile", action="store_true", help="Include the top cProfile entries in the report")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.record and os.path.exists(args.cassette):
+        os.remove(args.cassette)
+    workdir = tempfile.mkdtemp(prefix="riley-replay-")
+    os.environ.update({
+        "CONSULTANT_LLM_CASSETTE": os.path.abspath(args.cassette),
+        "CONSULTANT_LLM_CASSETTE_MODE": "record" if args.record else "replay",
+        "CONSULTANT_LLM_CASSETTE_TIME_SCALE": str(args.time_scale),
+        "CONSULTANT_LLM_CASSETTE_STRICT": "true" if args.strict else "false",
+        "CONSULTANT_SESSION_DB": os.path.join(workdir, "sessions.db"),
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True"
+    })
+
+    from agent.agent import root_agent
+    from agent.task_manager import TaskManager
+
+    task_manager = TaskManager(agent=root_agent)
+    # ADK imports litellm lazily on the first model call; pay that once outside the measurements
+    import litellm  # noqa: F401
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    turns = asyncio.run(run_consultations(task_manager, args.consultations))
+    if profiler:
+        profiler.disable()
+    duration = time.perf_counter() - start
+
+    # The cassette sits under the model router when fallbacks or hedging are configured
+    llm_client = root_agent.model.llm_client
+    cassette = getattr(llm_client, "transport", llm_client)
+    report = {
+        "mode": "record" if args.record else "replay",
+        "time_scale": args.time_scale,
+        "consultations": args.consultations,
+        "duration_s": round(duration, 3),
+        "errors": sum(1 for turn in turns if turn["status"] != "success"),
+        "session_db_bytes": os.path.getsize(os.environ["CONSULTANT_SESSION_DB"]),
+        "cassette": cassette.report(),
+        "turns": turns
+    }
+    if profiler:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        report["profile"] = stream.getvalue()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,29 @@ This module provides a FastAPI server implementation for agent-to-agent communic
 
 import os
 import json
+import time
+import asyncio
 import inspect
-from typing import Dict, Any, Callable, Optional
+from contextlib import aclosing
+from typing import Dict, Any, Callable, Optional, List
 
-from fastapi import FastAPI, Body, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Body, HTTPException, Request, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.routing import Match
+
+from .metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .admission import AdmissionController, AdmissionRejected, create_admission_controller, is_overloaded, result_stage
 
 class AgentRequest(BaseModel):
     """Standard A2A agent request format."""
     message: str = Field(..., description="The message to process")
     context: Dict[str, Any] = Field(default_factory=dict, description="Additional context for the request")
     session_id: Optional[str] = Field(None, description="Session identifier for stateful interactions")
+    deadline_ms: Optional[int] = Field(None, gt=0, description="Time budget for this request, overriding the agent's default")
 
 class AgentResponse(BaseModel):
     """Standard A2A agent response format."""
@@ -26,12 +36,174 @@ class AgentResponse(BaseModel):
     data: Dict[str, Any] = Field(default_factory=dict, description="Additional data returned by the agent")
     session_id: Optional[str] = Field(None, description="Session identifier for stateful interactions")
 
+class BatchRequest(BaseModel):
+    """Batch of independent A2A agent requests."""
+    requests: List[AgentRequest] = Field(..., description="Requests to process; same-session requests run in order")
+    max_concurrency: Optional[int] = Field(None, description="Concurrency cap for this batch (bounded by the server limit)")
+
+class BatchItemResult(BaseModel):
+    """Outcome of a single request within a batch."""
+    index: int = Field(..., description="Position of the request in the batch")
+    response: Optional[AgentResponse] = Field(None, description="Agent response, if the request completed")
+    error: Optional[str] = Field(None, description="Error message, if the request raised")
+    duration_ms: float = Field(..., description="Wall-clock time spent processing this request")
+
+class BatchResponse(BaseModel):
+    """Batch results in input order."""
+    results: List[BatchItemResult] = Field(default_factory=list, description="Per-request results in input order")
+    total_ms: float = Field(..., description="Wall-clock time for the whole batch")
+
+# Largest request body accepted, checked before the body is read or parsed
+MAX_REQUEST_BYTES = int(os.getenv("A2A_MAX_REQUEST_BYTES", str(256 * 1024)))
+
+# Batch limits (overridable via environment)
+BATCH_MAX_ITEMS = int(os.getenv("A2A_BATCH_MAX_ITEMS", "100"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("A2A_BATCH_MAX_CONCURRENCY", "8"))
+
+# Header carrying a request's time budget in milliseconds (the tighter of it and deadline_ms applies)
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+# Non-standard status (as used by nginx) logged for requests the client abandoned
+CLIENT_CLOSED_REQUEST = 499
+
+def _to_agent_response(result: Dict[str, Any], session_id: Optional[str]) -> AgentResponse:
+    """Wrap a TaskManager result dict in the standard response envelope."""
+    return AgentResponse(
+        message=result.get("message", "Task completed"),
+        status=result.get("status", "success"),
+        data=result.get("data", {}),
+        session_id=result.get("session_id", session_id)
+    )
+
+def _request_deadline_ms(request: AgentRequest, http_request: Optional[Request] = None) -> Optional[int]:
+    """Tighter of the body's deadline_ms and the deadline header, if either is set."""
+    deadlines = [request.deadline_ms] if request.deadline_ms else []
+    header = http_request.headers.get(DEADLINE_HEADER) if http_request is not None else None
+    if header and header.isdigit() and int(header) > 0:
+        deadlines.append(int(header))
+    return min(deadlines) if deadlines else None
+
+def _task_kwargs(task_manager: Any, deadline_ms: Optional[int]) -> Dict[str, Any]:
+    """Extra arguments for process_task/stream_task; deadlines only reach task managers that accept them."""
+    if deadline_ms is None or "deadline_ms" not in inspect.signature(task_manager.process_task).parameters:
+        return {}
+    return {"deadline_ms": deadline_ms}
+
+async def _cancel_on_disconnect(http_request: Request, task: asyncio.Task) -> bool:
+    """Cancel `task` if the client disconnects before it finishes. Returns True if it did."""
+    # The body has already been read, so the next message is the disconnect. (Request.is_disconnected
+    # cannot see through the middleware's receive wrapper, hence waiting on receive itself.)
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            if task.done():
+                return False
+            task.cancel()
+            return True
+
+def _admission_key(request: AgentRequest, http_request: Optional[Request] = None) -> str:
+    """Fairness key for admission control: the user, else the session, else the client address."""
+    user_id = request.context.get("user_id") if isinstance(request.context, dict) else None
+    if user_id:
+        return str(user_id)
+    if request.session_id:
+        return request.session_id
+    if http_request is not None and http_request.client:
+        return http_request.client.host
+    return "anonymous"
+
+async def _admitted_task(admission: Optional[AdmissionController], key: str, task_manager: Any,
+                         request: AgentRequest, deadline_ms: Optional[int]) -> Dict[str, Any]:
+    """Run process_task once admission control grants a slot, reporting its outcome back."""
+    if admission is None:
+        return await task_manager.process_task(request.message, request.context, request.session_id,
+                                               **_task_kwargs(task_manager, deadline_ms))
+    await admission.acquire(key)
+    started = time.perf_counter()
+    result = None
+    record = True
+    try:
+        result = await task_manager.process_task(request.message, request.context, request.session_id,
+                                                 **_task_kwargs(task_manager, deadline_ms))
+        return result
+    except asyncio.CancelledError:
+        # Cancelled because the client went away: says nothing about capacity, so only free the slot
+        record = False
+        raise
+    finally:
+        admission.release(time.perf_counter() - started, overloaded=is_overloaded(result), stage=result_stage(result),
+                          record=record)
+
+def _busy_response(rejected: AdmissionRejected) -> JSONResponse:
+    """429 telling the client when to retry, sent instead of queueing it indefinitely."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(rejected), "reason": rejected.reason, "retry_after": rejected.retry_after},
+        headers={"Retry-After": str(rejected.retry_after)}
+    )
+
+def _route_path(app: FastAPI, scope: Dict[str, Any]) -> str:
+    """Route template for a request (e.g. /widgets/{widget_id}), keeping metric labels bounded."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+def _sse_frame(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def _run_batch(task_manager: Any, requests: List[AgentRequest], concurrency: int,
+                     admission: Optional[AdmissionController] = None) -> List[BatchItemResult]:
+    """
+    Run a batch of requests concurrently with at most `concurrency` in flight.
+
+    Requests sharing a session_id form a chain that runs sequentially in input order;
+    requests without a session_id are independent of each other. Each request also goes
+    through admission control, so batches share the server's adaptive limit.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: List[Optional[BatchItemResult]] = [None] * len(requests)
+
+    chains: Dict[Any, List[int]] = {}
+    for index, request in enumerate(requests):
+        key = request.session_id if request.session_id else ("__independent__", index)
+        chains.setdefault(key, []).append(index)
+
+    async def run_one(index: int) -> None:
+        request = requests[index]
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await _admitted_task(admission, _admission_key(request), task_manager,
+                                              request, _request_deadline_ms(request))
+                results[index] = BatchItemResult(
+                    index=index,
+                    response=_to_agent_response(result, request.session_id),
+                    duration_ms=round((time.perf_counter() - started) * 1000, 1)
+                )
+            except Exception as e:
+                results[index] = BatchItemResult(
+                    index=index,
+                    error=f"{type(e).__name__}: {str(e)}",
+                    duration_ms=round((time.perf_counter() - started) * 1000, 1)
+                )
+
+    async def run_chain(indices: List[int]) -> None:
+        for index in indices:
+            await run_one(index)
+
+    await asyncio.gather(*(run_chain(indices) for indices in chains.values()))
+    return results
+
 def create_agent_server(
     name: str, 
     description: str, 
     task_manager: Any, 
     endpoints: Optional[Dict[str, Callable]] = None,
-    well_known_path: Optional[str] = None
+    well_known_path: Optional[str] = None,
+    admission: Optional[AdmissionController] = None
 ) -> FastAPI:
     """
     Create a FastAPI server for an agent following A2A protocol.
@@ -42,6 +214,7 @@ def create_agent_server(
         task_manager: TaskManager instance that handles agent processing
         endpoints: Optional additional endpoints to register
         well_known_path: Optional path for .well-known directory
+        admission: Admission controller for run requests (defaults to one configured by A2A_ADMISSION_*)
     
     Returns:
         FastAPI application instance
@@ -57,6 +230,46 @@ def create_agent_server(
         allow_headers=["*"],  # Allows all headers
     )
 
+    # Reject oversized payloads (e.g. legacy clients resending long histories) before parsing
+    @app.middleware("http")
+    async def limit_request_size(request: Request, call_next):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Request body exceeds {MAX_REQUEST_BYTES} bytes; send only the new message and use the server-side transcript"}
+            )
+        return await call_next(request)
+
+    # Request metrics, labelled by route template; the agent adds its own via register_metrics
+    metrics = MetricsRegistry()
+    http_requests = metrics.counter("a2a_http_requests_total", "HTTP requests handled", ["path", "method", "status"])
+    http_duration = metrics.histogram("a2a_http_request_duration_seconds",
+                                      "Time to response headers (streams continue after this)", ["path"])
+    http_in_flight = metrics.gauge("a2a_http_requests_in_flight", "HTTP requests being handled", ["path"])
+    if hasattr(task_manager, "register_metrics"):
+        task_manager.register_metrics(metrics)
+
+    # Adaptive concurrency limit and fair queue between the run endpoints and the task manager
+    admission = admission or create_admission_controller()
+    if admission is not None:
+        admission.register_metrics(metrics)
+
+    @app.middleware("http")
+    async def record_metrics(request: Request, call_next):
+        path = _route_path(app, request.scope)
+        http_in_flight.inc(path=path)
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            http_in_flight.dec(path=path)
+            http_duration.observe(time.perf_counter() - started, path=path)
+            http_requests.inc(path=path, method=request.method, status=str(status))
+
     # Create .well-known directory if it doesn't exist
     if well_known_path is None:
         module_path = inspect.getmodule(inspect.stack()[1][0]).__file__
@@ -67,7 +280,7 @@ def create_agent_server(
     # Generate agent.json if it doesn't exist
     agent_json_path = os.path.join(well_known_path, "agent.json")
     if not os.path.exists(agent_json_path):
-        endpoint_names = ["run"]
+        endpoint_names = ["run", "run/stream", "run/batch"]
         if endpoints:
             endpoint_names.extend(endpoints.keys())
         
@@ -83,16 +296,28 @@ def create_agent_server(
     
     # Standard A2A run endpoint
     @app.post("/run", response_model=AgentResponse)
-    async def run(request: AgentRequest = Body(...)):
-        """Standard A2A run endpoint for processing agent requests."""
+    async def run(http_request: Request, request: AgentRequest = Body(...)):
+        """
+        Standard A2A run endpoint for processing agent requests. The time budget comes from
+        deadline_ms or the X-Request-Deadline-Ms header; if the client disconnects first,
+        processing is cancelled. When admission control's queue is full the request is
+        answered with 429 and Retry-After.
+        """
+        task = asyncio.ensure_future(_admitted_task(
+            admission, _admission_key(request, http_request), task_manager, request,
+            _request_deadline_ms(request, http_request)
+        ))
+        watcher = asyncio.create_task(_cancel_on_disconnect(http_request, task))
         try:
-            result = await task_manager.process_task(request.message, request.context, request.session_id)
-            return AgentResponse(
-                message=result.get("message", "Task completed"),
-                status=result.get("status", "success"),
-                data=result.get("data", {}),
-                session_id=result.get("session_id", request.session_id)
-            )
+            result = await task
+            return _to_agent_response(result, request.session_id)
+        except AdmissionRejected as e:
+            return _busy_response(e)
+        except asyncio.CancelledError:
+            if not (watcher.done() and watcher.result()):
+                raise
+            # Nobody is listening; the status only shows up in logs and metrics
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
         except Exception as e:
             return AgentResponse(
                 message=f"Error processing request: {str(e)}",
@@ -100,7 +325,155 @@ def create_agent_server(
                 data={"error_type": type(e).__name__},
                 session_id=request.session_id
             )
+        finally:
+            watcher.cancel()
+
+    # Streaming run endpoint (Server-Sent Events)
+    @app.post("/run/stream")
+    async def run_stream(http_request: Request, request: AgentRequest = Body(...)):
+        """
+        Streaming variant of /run. Emits "start", "delta", "tool_call" and "tool_response"
+        events as the agent works, then a "final" event carrying the AgentResponse envelope.
+        Every event has elapsed_ms; "final" also reports first_token_ms and total_ms so
+        time-to-first-token can be tracked separately from total latency. Deadlines,
+        disconnects and admission control are handled as for /run; a request is admitted
+        (or rejected with 429) before the stream starts.
+        """
+        deadline_kwargs = _task_kwargs(task_manager, _request_deadline_ms(request, http_request))
+        if admission is not None:
+            try:
+                await admission.acquire(_admission_key(request, http_request))
+            except AdmissionRejected as e:
+                return _busy_response(e)
+        admitted_at = time.perf_counter()
+        released = False
+
+        def release_slot(latency: float, result: Optional[Dict[str, Any]] = None, record: bool = True) -> None:
+            nonlocal released
+            if admission is not None and not released:
+                released = True
+                admission.release(latency, overloaded=is_overloaded(result), stage=result_stage(result),
+                                  record=record)
+
+        async def release_unused_slot() -> None:
+            # Runs after the response; frees the slot if the stream was never iterated (a no-op otherwise)
+            release_slot(time.perf_counter() - admitted_at, record=False)
+
+        async def event_source():
+            started = time.perf_counter()
+            first_token_ms = None
+            result = None
+            # Only a stream that reached its final event feeds the adaptive limit; one the client
+            # abandoned (disconnect, or the response closed early) just frees its slot
+            finished = False
+            # Between frames nothing is written, so a vanished client would otherwise go unnoticed
+            watcher = asyncio.create_task(_cancel_on_disconnect(http_request, asyncio.current_task()))
+            try:
+                async with aclosing(task_manager.stream_task(request.message, request.context, request.session_id,
+                                                                **deadline_kwargs)) as events:
+                    async for event in events:
+                        event = dict(event)
+                        kind = event.pop("event")
+                        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                        if kind == "delta" and first_token_ms is None:
+                            first_token_ms = elapsed_ms
+                        if kind == "final":
+                            result = event["response"]
+                            envelope = _to_agent_response(result, request.session_id)
+                            yield _sse_frame("final", {
+                                "response": envelope,
+                                "first_token_ms": first_token_ms,
+                                "total_ms": elapsed_ms
+                            })
+                        else:
+                            event["elapsed_ms"] = elapsed_ms
+                            yield _sse_frame(kind, event)
+                finished = True
+            except Exception as e:
+                finished = True
+                envelope = AgentResponse(
+                    message=f"Error processing request: {str(e)}",
+                    status="error",
+                    data={"error_type": type(e).__name__},
+                    session_id=request.session_id
+                )
+                yield _sse_frame("final", {
+                    "response": envelope,
+                    "first_token_ms": first_token_ms,
+                    "total_ms": round((time.perf_counter() - started) * 1000, 1)
+                })
+            finally:
+                watcher.cancel()
+                release_slot(time.perf_counter() - started, result, record=finished or result is not None)
+
+        return StreamingResponse(
+            event_source(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(release_unused_slot)
+        )
     
+    # Batch run endpoint
+    @app.post("/run/batch", response_model=BatchResponse)
+    async def run_batch(batch: BatchRequest = Body(...)):
+        """
+        Process many requests in one round trip. Independent sessions run concurrently
+        (bounded by max_concurrency), same-session requests keep their order, and results
+        come back in input order with per-item errors and timings.
+        """
+        if len(batch.requests) > BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} requests")
+
+        concurrency = min(batch.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+        started = time.perf_counter()
+        results = await _run_batch(task_manager, batch.requests, concurrency, admission)
+        return BatchResponse(results=results, total_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    # Transcript resync endpoint
+    @app.get("/sessions/{session_id}/transcript")
+    async def get_transcript(session_id: str, user_id: str = Query("default_user"), since: int = Query(0, ge=0)):
+        """Return the server-side transcript from position `since` so clients can resync."""
+        if not hasattr(task_manager, "get_transcript"):
+            raise HTTPException(status_code=404, detail="This agent does not keep transcripts")
+        return task_manager.get_transcript(session_id, user_id=user_id, since=since)
+
+    # Token/cost accounting endpoint
+    @app.get("/sessions/{session_id}/usage")
+    async def get_usage(session_id: str, user_id: str = Query("default_user")):
+        """Return the session's accumulated model usage and estimated cost."""
+        if not hasattr(task_manager, "get_usage"):
+            raise HTTPException(status_code=404, detail="This agent does not track usage")
+        return task_manager.get_usage(session_id, user_id=user_id)
+
+    # Widget pages referenced from agent responses
+    @app.get("/widgets/{widget_id}")
+    async def get_widget(widget_id: str, request: Request):
+        """
+        Serve a widget page. Bodies are precompressed and versioned by ETag, so responses
+        are cacheable indefinitely and revalidation is answered with 304.
+        """
+        widget = task_manager.get_widget(widget_id) if hasattr(task_manager, "get_widget") else None
+        if widget is None:
+            raise HTTPException(status_code=404, detail=f"Unknown widget: {widget_id}")
+
+        headers = {
+            "ETag": widget.etag,
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Vary": "Accept-Encoding"
+        }
+        if request.headers.get("if-none-match") == widget.etag:
+            return Response(status_code=304, headers=headers)
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(widget.gzip_body, media_type="text/html; charset=utf-8",
+                            headers={**headers, "Content-Encoding": "gzip"})
+        return Response(widget.body, media_type="text/html; charset=utf-8", headers=headers)
+
+    # Prometheus scrape endpoint
+    @app.get("/metrics")
+    async def get_metrics():
+        """Request, stage, tool, token and session-store metrics in Prometheus text format."""
+        return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
     # Health check endpoint
     @app.get("/health")
     async def health_check():
@@ -116,13 +489,18 @@ def create_agent_server(
     
     # Debug endpoint for testing
     @app.get("/debug")
-    async def debug_info():
-        """Debug information endpoint."""
-        return {
+    async def debug_info(traces: int = Query(10, ge=0, le=100)):
+        """Debug information endpoint; includes the slowest recent traces when the agent records them."""
+        info = {
             "agent_name": name,
             "app_name": task_manager.runner.app_name if hasattr(task_manager, 'runner') else "unknown",
-            "available_endpoints": ["run", "health", "debug", ".well-known/agent.json"] + (list(endpoints.keys()) if endpoints else [])
+            "available_endpoints": ["run", "run/stream", "run/batch", "sessions/{id}/transcript", "sessions/{id}/usage", "widgets/{id}", "metrics", "health", "debug", ".well-known/agent.json"] + (list(endpoints.keys()) if endpoints else [])
         }
+        if admission is not None:
+            info["admission"] = admission.stats()
+        if hasattr(task_manager, "get_slowest_traces"):
+            info["slowest_traces"] = task_manager.get_slowest_traces(traces)
+        return info
     
     # Register additional endpoints if provided
     if endpoints:
@@ -0,0 +1,244 @@
+"""
+Admission control for A2A agent servers.
+Requests pass through an adaptive concurrency limit before reaching the task manager. The
+limit follows AIMD (additive increase, multiplicative decrease) driven by observed latency
+and overload errors from the model provider. Requests over the limit wait in a bounded
+queue served round-robin per user, and are shed with a Retry-After hint once it is full.
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+# Error types (as reported in a result's data.error_type) that mean the provider is overloaded:
+# 429, 503, or every backend's circuit breaker open
+OVERLOAD_ERROR_TYPES = frozenset({"RateLimitError", "ServiceUnavailableError", "BackendsUnavailableError"})
+
+# Deadline overruns count too, but only against the server's own budget (data.deadline_source);
+# a client asking for a tight deadline must not be able to shrink everyone's limit
+DEADLINE_ERROR_TYPE = "DeadlineExceeded"
+
+# Target latency (seconds) by conversation stage for turns that are slow by design
+DEFAULT_STAGE_TARGET_LATENCY = "analysis_phase=120"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued; retry_after is in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason}); retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def is_overloaded(result: Optional[Dict[str, Any]]) -> bool:
+    """Whether a task manager result reports a provider overload or an overrun of a server-set deadline."""
+    if not result or result.get("status") != "error":
+        return False
+    data = result.get("data") or {}
+    if data.get("error_type") == DEADLINE_ERROR_TYPE:
+        return data.get("deadline_source") == "server"
+    return data.get("error_type") in OVERLOAD_ERROR_TYPES
+
+
+def result_stage(result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Conversation stage a task manager result reports, if any."""
+    return ((result or {}).get("data") or {}).get("conversation_stage")
+
+
+def parse_stage_latencies(spec: str) -> Dict[str, float]:
+    """Parse "stage=seconds,stage=seconds" into per-stage target latencies."""
+    targets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        stage, _, seconds = item.partition("=")
+        try:
+            targets[stage.strip()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring malformed stage target latency {item!r}")
+    return targets
+
+
+class AdmissionController:
+    """AIMD concurrency limit with a bounded, per-user round-robin wait queue."""
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 max_queue: int = 100, max_queue_per_user: int = 10, queue_timeout: float = 30.0,
+                 target_latency: float = 10.0, backoff: float = 0.7,
+                 stage_target_latency: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            initial_limit: Concurrent requests allowed before any feedback
+            min_limit: Floor for the adaptive limit
+            max_limit: Ceiling for the adaptive limit
+            max_queue: Requests allowed to wait for a slot; beyond this they are rejected
+            max_queue_per_user: Waiting requests allowed per user, so one user cannot fill the queue
+            queue_timeout: Seconds a request may wait for a slot before it is rejected
+            target_latency: Seconds; completions slower than this shrink the limit
+            backoff: Factor applied to the limit on overload or slow completions
+            stage_target_latency: Seconds by conversation stage, replacing target_latency for
+                turns that are slow by design (e.g. the analysis turn)
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.stage_target_latency = dict(stage_target_latency or {})
+
+        self.in_flight = 0
+        self.queued = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._turns: Deque[str] = deque()
+        self._avg_latency = target_latency / 2
+        self._last_decrease = 0.0
+
+        self._rejected = None
+        self._queue_wait = None
+
+    def register_metrics(self, registry) -> None:
+        """Publish the limit, occupancy, queue waits and rejections on a metrics registry."""
+        limit = registry.gauge("a2a_admission_limit", "Current adaptive concurrency limit")
+        in_flight = registry.gauge("a2a_admission_in_flight", "Requests holding an admission slot")
+        queued = registry.gauge("a2a_admission_queued", "Requests waiting for an admission slot")
+        self._rejected = registry.counter("a2a_admission_rejected_total", "Requests shed by admission control", ["reason"])
+        self._queue_wait = registry.histogram("a2a_admission_queue_wait_seconds", "Time spent waiting for a slot")
+
+        def refresh() -> None:
+            limit.set(self.limit)
+            in_flight.set(self.in_flight)
+            queued.set(self.queued)
+        registry.add_callback(refresh)
+
+    async def acquire(self, user: str) -> None:
+        """Wait for a slot (FIFO per user, round-robin across users) or raise AdmissionRejected."""
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            return
+
+        queue = self._queues.get(user)
+        if self.queued >= self.max_queue:
+            self._reject("queue_full")
+        if queue is not None and len(queue) >= self.max_queue_per_user:
+            self._reject("user_queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[user] = deque()
+            self._turns.append(user)
+        queue.append(future)
+        self.queued += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we gave up; pass it on
+                self._release_slot()
+            else:
+                self._forget(user, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("queue_timeout")
+            raise
+        finally:
+            if self._queue_wait:
+                self._queue_wait.observe(time.perf_counter() - started)
+
+    def release(self, latency: float, overloaded: bool = False, stage: Optional[str] = None,
+                record: bool = True) -> None:
+        """
+        Return a slot, feeding the request's latency and outcome into the adaptive limit. With
+        `record` False (a request abandoned by its client) the slot is only freed.
+        """
+        if not record:
+            self._release_slot()
+            return
+        self._avg_latency += 0.2 * (latency - self._avg_latency)
+        now = time.monotonic()
+        target_latency = self.stage_target_latency.get(stage, self.target_latency)
+        if overloaded or latency > target_latency:
+            # At most one decrease per typical request lifetime, so one burst is not punished repeatedly
+            if now - self._last_decrease >= self._avg_latency and self.limit > self.min_limit:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                logger.info(f"Admission limit decreased to {self.limit:.1f} "
+                            f"({'overload' if overloaded else f'latency {latency:.1f}s'})")
+        elif self.limit < self.max_limit:
+            # About +1 per `limit` successful completions
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._release_slot()
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: roughly the time to drain the current queue."""
+        drain = self._avg_latency * (self.queued + 1) / max(1, int(self.limit))
+        return max(1, min(120, math.ceil(drain)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_users": len(self._queues),
+            "avg_latency_s": round(self._avg_latency, 3)
+        }
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.in_flight < int(self.limit) and self._turns:
+            user = self._turns.popleft()
+            queue = self._queues[user]
+            future = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._turns.append(user)
+            else:
+                del self._queues[user]
+            if future.done():  # timed out or cancelled, not yet cleaned up by its waiter
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _forget(self, user: str, future: asyncio.Future) -> None:
+        queue = self._queues.get(user)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self.queued -= 1
+        if not queue:
+            del self._queues[user]
+            self._turns.remove(user)
+
+    def _reject(self, reason: str) -> None:
+        if self._rejected:
+            self._rejected.inc(reason=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+
+def create_admission_controller() -> Optional[AdmissionController]:
+    """Build the admission controller configured by A2A_ADMISSION_* variables (None if disabled)."""
+    if os.getenv("A2A_ADMISSION_ENABLED", "true").lower() in ("0", "false", "no", "off"):
+        return None
+    return AdmissionController(
+        initial_limit=int(os.getenv("A2A_ADMISSION_INITIAL_LIMIT", "8")),
+        min_limit=int(os.getenv("A2A_ADMISSION_MIN_LIMIT", "1")),
+        max_limit=int(os.getenv("A2A_ADMISSION_MAX_LIMIT", "64")),
+        max_queue=int(os.getenv("A2A_ADMISSION_MAX_QUEUE", "100")),
+        max_queue_per_user=int(os.getenv("A2A_ADMISSION_MAX_QUEUE_PER_USER", "10")),
+        queue_timeout=float(os.getenv("A2A_ADMISSION_QUEUE_TIMEOUT_SECONDS", "30")),
+        target_latency=float(os.getenv("A2A_ADMISSION_TARGET_LATENCY_MS", "10000")) / 1000,
+        backoff=float(os.getenv("A2A_ADMISSION_BACKOFF", "0.7")),
+        stage_target_latency=parse_stage_latencies(
+            os.getenv("A2A_ADMISSION_STAGE_TARGET_LATENCY", DEFAULT_STAGE_TARGET_LATENCY))
+    )
@@ -0,0 +1,336 @@
+"""
+Pool of long-lived headless browsers for scraping.
+The WebDriver binary is resolved once and a fixed number of browsers are kept warm. Each
+scrape borrows one on a worker thread (so async callers never block the event loop), is
+bounded by a per-scrape timeout, and the browser is recycled after a number of pages or
+when it crashes or overruns the timeout.
+"""
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPoolTimeout(Exception):
+    """Raised when a scrape waits too long for a browser or overruns its time budget."""
+
+
+class _Browser:
+    """A live browser plus its bookkeeping."""
+
+    __slots__ = ("driver", "pages", "killed")
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.pages = 0
+        self.killed = False
+
+
+class BrowserPool:
+    """Fixed-size pool of warm browsers, each used by one worker thread at a time."""
+
+    def __init__(self, driver_factory: Callable[[], Any], size: int = 2, max_pages: int = 50,
+                 scrape_timeout: float = 30.0, queue_timeout: float = 60.0):
+        """
+        Args:
+            driver_factory: Starts a new browser (e.g. from chrome_driver_factory)
+            size: Browsers (and worker threads) in the pool
+            max_pages: Scrapes a browser serves before it is replaced, bounding memory growth
+            scrape_timeout: Seconds a scrape may run before its browser is killed
+            queue_timeout: Seconds a scrape may wait for a free browser before it fails with BrowserPoolTimeout
+        """
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_pages = max_pages
+        self.scrape_timeout = scrape_timeout
+        self.queue_timeout = queue_timeout
+
+        # One slot per browser; None marks a slot whose browser is (re)started on next use
+        self._slots: "queue.Queue[Optional[_Browser]]" = queue.Queue()
+        for _ in range(size):
+            self._slots.put(None)
+        # Exactly one worker per slot, so a worker never waits for a browser
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="browser-pool")
+        self._lock = threading.Lock()
+        self._started = False
+        self.busy = 0
+        self.waiting = 0
+        self.launched = 0
+
+        self._metrics: Optional[Dict[str, Any]] = None
+
+    def register_metrics(self, registry) -> None:
+        """Publish pool occupancy, queue waits, scrape outcomes and recycles on a metrics registry."""
+        size = registry.gauge("browser_pool_size", "Browsers in the pool")
+        busy = registry.gauge("browser_pool_busy", "Browsers running a scrape")
+        waiting = registry.gauge("browser_pool_waiting", "Scrapes waiting for a browser")
+        utilisation = registry.gauge("browser_pool_utilisation", "Fraction of the pool running a scrape")
+        self._metrics = {
+            "queue_wait": registry.histogram("browser_pool_queue_wait_seconds", "Time a scrape waited for a browser"),
+            "scrape": registry.histogram("browser_pool_scrape_seconds", "Time spent scraping with a browser",
+                                         ["outcome"]),
+            "scrapes": registry.counter("browser_pool_scrapes_total",
+                                        "Scrapes by outcome (success, error, timeout, rejected)", ["outcome"]),
+            "launches": registry.counter("browser_pool_launches_total", "Browsers started"),
+            "recycles": registry.counter("browser_pool_recycles_total",
+                                         "Browsers replaced, by reason (max_pages, crash, timeout)", ["reason"])
+        }
+
+        def refresh() -> None:
+            size.set(self.size)
+            busy.set(self.busy)
+            waiting.set(self.waiting)
+            utilisation.set(self.busy / self.size if self.size else 0)
+        registry.add_callback(refresh)
+
+    def start(self) -> None:
+        """Start every browser in the background so later scrapes find them warm. Done on first use otherwise."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._executor.submit(self._warm)
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call fn(driver, *args) with a pooled browser, blocking until it finishes."""
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call fn(driver, *args) with a pooled browser without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Queue fn(driver, *args) for the next free browser. If none is free within
+        queue_timeout, the scrape is withdrawn and the future fails with BrowserPoolTimeout.
+        """
+        self.start()
+        with self._lock:
+            self.waiting += 1
+        result: Future = Future()
+        task = self._executor.submit(self._work, time.perf_counter(), fn, args)
+        task.add_done_callback(self._forget_cancelled)
+        expired = threading.Event()
+
+        def expire() -> None:
+            # Still queued when the wait budget ran out; cancelling fails if a worker has just picked it up
+            expired.set()
+            if task.cancel():
+                self._count("scrapes", outcome="rejected")
+
+        expiry = threading.Timer(self.queue_timeout, expire)
+        expiry.daemon = True
+        expiry.start()
+
+        def settle(done: Future) -> None:
+            expiry.cancel()
+            if done.cancelled() and expired.is_set():
+                self._settle(result, error=BrowserPoolTimeout(f"Waited {self.queue_timeout:g}s for a browser"))
+            elif done.cancelled():
+                result.cancel()
+            elif done.exception() is not None:
+                self._settle(result, error=done.exception())
+            else:
+                self._settle(result, value=done.result())
+
+        task.add_done_callback(settle)
+        # A caller that gives up (e.g. a cancelled arun) withdraws its scrape if it is still queued
+        result.add_done_callback(lambda done: done.cancelled() and task.cancel())
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "busy": self.busy,
+            "waiting": self.waiting,
+            "launched": self.launched
+        }
+
+    def close(self) -> None:
+        """Stop accepting scrapes and quit every browser."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        while not self._slots.empty():
+            browser = self._slots.get_nowait()
+            if browser is not None:
+                self._quit(browser)
+
+    # Worker side
+
+    def _warm(self) -> None:
+        browser = self._slots.get()
+        try:
+            if browser is None:
+                browser = self._launch()
+        except Exception as e:
+            logger.warning(f"Could not start a browser during warm-up: {e}")
+        finally:
+            self._slots.put(browser)
+
+    def _work(self, submitted: float, fn: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self.waiting -= 1
+            self.busy += 1
+        self._observe("queue_wait", time.perf_counter() - submitted)
+        try:
+            browser = self._slots.get()
+            try:
+                if browser is None:
+                    browser = self._launch()
+            except Exception:
+                self._slots.put(None)
+                raise
+            return self._scrape(browser, fn, args)
+        finally:
+            with self._lock:
+                self.busy -= 1
+
+    def _scrape(self, browser: _Browser, fn: Callable[..., Any], args: tuple) -> Any:
+        # A hung page cannot be interrupted from its own thread; the watchdog kills the browser instead
+        watchdog = threading.Timer(self.scrape_timeout, self._kill, (browser,))
+        watchdog.daemon = True
+        started = time.perf_counter()
+        outcome = "error"
+        watchdog.start()
+        try:
+            result = fn(browser.driver, *args)
+            outcome = "success"
+            return result
+        except Exception as e:
+            if browser.killed:
+                outcome = "timeout"
+                raise BrowserPoolTimeout(f"Scrape exceeded {self.scrape_timeout:g}s") from e
+            raise
+        finally:
+            watchdog.cancel()
+            browser.pages += 1
+            self._count("scrapes", outcome=outcome)
+            self._observe("scrape", time.perf_counter() - started, outcome=outcome)
+            self._check_in(browser, outcome)
+
+    def _check_in(self, browser: _Browser, outcome: str) -> None:
+        """Return a browser to its slot, or free the slot if the browser must be replaced."""
+        reason = None
+        if browser.killed:
+            reason = "timeout"
+        elif outcome == "error" and not self._alive(browser):
+            reason = "crash"
+        elif browser.pages >= self.max_pages:
+            reason = "max_pages"
+        if reason is None:
+            self._slots.put(browser)
+            return
+        logger.info(f"Recycling browser after {browser.pages} pages ({reason})")
+        self._count("recycles", reason=reason)
+        if not browser.killed:
+            self._quit(browser)
+        # The next scrape on this slot starts a fresh browser
+        self._slots.put(None)
+
+    def _launch(self) -> _Browser:
+        browser = _Browser(self.driver_factory())
+        with self._lock:
+            self.launched += 1
+        self._count("launches")
+        return browser
+
+    def _kill(self, browser: _Browser) -> None:
+        logger.warning(f"Scrape exceeded {self.scrape_timeout:g}s; killing its browser")
+        browser.killed = True
+        self._quit(browser)
+
+    @staticmethod
+    def _alive(browser: _Browser) -> bool:
+        try:
+            browser.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(browser: _Browser) -> None:
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug(f"Browser quit failed: {e}")
+
+    @staticmethod
+    def _settle(result: Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+        try:
+            if error is not None:
+                result.set_exception(error)
+            else:
+                result.set_result(value)
+        except InvalidStateError:
+            pass  # already settled, or cancelled by the caller
+
+    def _forget_cancelled(self, future: Future) -> None:
+        # A scrape cancelled before a worker picked it up never reaches _work
+        if future.cancelled():
+            with self._lock:
+                self.waiting -= 1
+
+    def _count(self, name: str, **labels: Any) -> None:
+        if self._metrics:
+            self._metrics[name].inc(**labels)
+
+    def _observe(self, name: str, value: float, **labels: Any) -> None:
+        if self._metrics:
+            self._metrics[name].observe(value, **labels)
+
+
+def chrome_driver_factory(page_load_timeout: Optional[float] = None) -> Callable[[], Any]:
+    """
+    Factory for headless Chrome sessions. The ChromeDriver binary is resolved on the first
+    launch (CHROMEDRIVER_PATH, or downloaded by webdriver-manager) and reused afterwards.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    resolved: Dict[str, str] = {}
+    lock = threading.Lock()
+
+    def driver_path() -> str:
+        with lock:
+            if "path" not in resolved:
+                path = os.getenv("CHROMEDRIVER_PATH")
+                if not path:
+                    from webdriver_manager.chrome import ChromeDriverManager
+                    path = ChromeDriverManager().install()
+                logger.info(f"Using ChromeDriver at {path}")
+                resolved["path"] = path
+            return resolved["path"]
+
+    def launch() -> Any:
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        driver = webdriver.Chrome(service=Service(driver_path()), options=options)
+        if page_load_timeout:
+            driver.set_page_load_timeout(page_load_timeout)
+        return driver
+
+    return launch
+
+
+def create_browser_pool(driver_factory: Callable[[], Any]) -> BrowserPool:
+    """
+    Build a browser pool configured by BROWSER_POOL_SIZE, BROWSER_POOL_MAX_PAGES,
+    BROWSER_POOL_SCRAPE_TIMEOUT_SECONDS and BROWSER_POOL_QUEUE_TIMEOUT_SECONDS.
+    Browsers start on the first scrape, or when start() is called.
+    """
+    return BrowserPool(
+        driver_factory,
+        size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+        max_pages=int(os.getenv("BROWSER_POOL_MAX_PAGES", "50")),
+        scrape_timeout=float(os.getenv("BROWSER_POOL_SCRAPE_TIMEOUT_SECONDS", "30")),
+        queue_timeout=float(os.getenv("BROWSER_POOL_QUEUE_TIMEOUT_SECONDS", "60"))
+    )
@@ -0,0 +1,259 @@
+"""
+Two-level cache for course search results.
+An in-process LRU sits in front of a SQLite tier, both keyed by the normalised search
+keyword. Entries are fresh for a while, then served stale while a background refresh
+runs, and concurrent searches for the same keyword share a single fetch.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', '.data', 'course_search.db')
+
+# Seconds; lookups are expected well under a millisecond when served from memory
+LOOKUP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Results are course records (parse_course_card); the table name changed when they stopped being card HTML
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_results (
+    keyword TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_course_results_fetched_at ON course_results (fetched_at);
+"""
+
+_NON_WORD = re.compile(r"[^\w+#]+")
+
+# (results, fetched_at)
+Entry = Tuple[Any, float]
+
+
+def normalise_keyword(keyword: str) -> str:
+    """Cache key for a search keyword: case, punctuation and spacing do not matter."""
+    return " ".join(_NON_WORD.sub(" ", (keyword or "").lower()).split())
+
+
+class CourseSearchCache:
+    """Memory LRU + SQLite cache with stale-while-revalidate and per-keyword request coalescing."""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Any]], db_path: Optional[str] = None,
+                 fresh_seconds: float = 6 * 3600, stale_seconds: float = 7 * 24 * 3600,
+                 empty_seconds: float = 300.0, max_memory_entries: int = 256, sweep_interval: float = 3600.0):
+        """
+        Args:
+            fetch: Performs a search for a (normalised) keyword
+            db_path: SQLite file for the disk tier (None keeps the cache in memory only)
+            fresh_seconds: Age up to which an entry is served without refreshing
+            stale_seconds: Age up to which an entry is still served while a refresh runs in the background
+            empty_seconds: Freshness of empty results, which may come from a failed fetch
+            max_memory_entries: Entries held in the in-process LRU
+            sweep_interval: Minimum seconds between deletions of expired disk entries
+        """
+        self.fetch = fetch
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.empty_seconds = empty_seconds
+        self.max_memory_entries = max_memory_entries
+        self.sweep_interval = sweep_interval
+
+        self._memory: "OrderedDict[str, Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._last_sweep = 0.0
+        self._metrics: Optional[Dict[str, Any]] = None
+
+        self._conn = None
+        self._lock = threading.Lock()
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            logger.info(f"Course search cache using {db_path} (fresh {fresh_seconds:g}s, stale {stale_seconds:g}s)")
+
+    def register_metrics(self, registry) -> None:
+        """Publish lookups by result, refreshes, coalesced waits, lookup latency and tier sizes."""
+        memory_entries = registry.gauge("course_cache_memory_entries", "Searches held in the in-process tier")
+        self._metrics = {
+            "lookups": registry.counter("course_cache_lookups_total",
+                                        "Course search cache lookups by result (memory, disk, stale, miss)", ["result"]),
+            "refreshes": registry.counter("course_cache_refreshes_total",
+                                          "Fetches made by the cache by mode (foreground, background) and outcome",
+                                          ["mode", "outcome"]),
+            "coalesced": registry.counter("course_cache_coalesced_total",
+                                          "Searches that waited on a fetch already in flight"),
+            "latency": registry.histogram("course_cache_lookup_seconds", "Course search latency through the cache",
+                                          ["result"], buckets=LOOKUP_BUCKETS)
+        }
+        registry.add_callback(lambda: memory_entries.set(len(self._memory)))
+
+    async def get(self, keyword: str) -> Any:
+        """Results for `keyword`, from memory, disk or a (shared) fetch."""
+        started = time.perf_counter()
+        key = normalise_keyword(keyword)
+        if not key:
+            return await self.fetch(keyword)
+
+        entry, result = self._memory_get(key), "memory"
+        if entry is None:
+            entry, result = self._disk_get(key), "disk"
+            if entry is not None:
+                self._memory_put(key, entry)
+
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age > self._freshness(entry[0]):
+                if age <= self.stale_seconds:
+                    # Serve what we have; a background refresh replaces it for later searches
+                    result = "stale"
+                    self._refresh_in_background(key)
+                else:
+                    entry = None
+        if entry is None:
+            result = "miss"
+            value = await self._coalesced_fetch(key, "foreground")
+        else:
+            value = entry[0]
+
+        self._count("lookups", result=result)
+        if self._metrics:
+            self._metrics["latency"].observe(time.perf_counter() - started, result=result)
+        return value
+
+    def invalidate(self, keyword: Optional[str] = None) -> None:
+        """Drop one keyword, or everything when no keyword is given."""
+        key = normalise_keyword(keyword) if keyword is not None else None
+        if key is None:
+            self._memory.clear()
+        else:
+            self._memory.pop(key, None)
+        if self._conn is not None:
+            with self._lock:
+                if key is None:
+                    self._conn.execute("DELETE FROM course_results")
+                else:
+                    self._conn.execute("DELETE FROM course_results WHERE keyword = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        stored = None
+        if self._conn is not None:
+            with self._lock:
+                stored = self._conn.execute("SELECT COUNT(*) FROM course_results").fetchone()[0]
+        return {"memory_entries": len(self._memory), "stored_entries": stored, "inflight": len(self._inflight)}
+
+    # Fetching
+
+    async def _coalesced_fetch(self, key: str, mode: str) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key, mode))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._count("coalesced")
+        # A waiter that goes away must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, key: str, mode: str) -> Any:
+        try:
+            value = await self.fetch(key)
+        except Exception:
+            self._count("refreshes", mode=mode, outcome="error")
+            raise
+        previous = self._memory_get(key) or self._disk_get(key)
+        if not value and previous is not None and previous[0]:
+            # An empty refresh (often a failed fetch) keeps the known results, retried after empty_seconds
+            self._count("refreshes", mode=mode, outcome="kept_previous")
+            entry = (previous[0], max(previous[1], time.time() - self.fresh_seconds + self.empty_seconds))
+        else:
+            self._count("refreshes", mode=mode, outcome="found" if value else "empty")
+            entry = (value, time.time())
+        self._memory_put(key, entry)
+        self._disk_put(key, entry)
+        return entry[0]
+
+    def _refresh_in_background(self, key: str) -> None:
+        if key in self._inflight:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._coalesced_fetch(key, "background")
+            except Exception as e:
+                logger.warning(f"Background refresh of course search {key!r} failed: {e}")
+
+        task = asyncio.ensure_future(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _freshness(self, value: Any) -> float:
+        return self.fresh_seconds if value else self.empty_seconds
+
+    # Tiers
+
+    def _memory_get(self, key: str) -> Optional[Entry]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        return entry
+
+    def _memory_put(self, key: str, entry: Entry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Entry]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, fetched_at FROM course_results WHERE keyword = ?", (key,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _disk_put(self, key: str, entry: Entry) -> None:
+        if self._conn is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO course_results (keyword, results, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(entry[0]), entry[1])
+            )
+            if now - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = now
+                self._conn.execute("DELETE FROM course_results WHERE fetched_at < ?",
+                                   (time.time() - self.stale_seconds,))
+
+    def _count(self, name: str, **labels: Any) -> None:
+        if self._metrics:
+            self._metrics[name].inc(**labels)
+
+
+def create_course_search_cache(fetch: Callable[[str], Awaitable[Any]]) -> CourseSearchCache:
+    """
+    Build the cache configured by COURSE_CACHE_DB (empty for memory only),
+    COURSE_CACHE_FRESH_SECONDS, COURSE_CACHE_STALE_SECONDS, COURSE_CACHE_EMPTY_SECONDS
+    and COURSE_CACHE_MEMORY_ENTRIES.
+    """
+    return CourseSearchCache(
+        fetch,
+        db_path=os.getenv("COURSE_CACHE_DB", DEFAULT_DB_PATH) or None,
+        fresh_seconds=float(os.getenv("COURSE_CACHE_FRESH_SECONDS", str(6 * 3600))),
+        stale_seconds=float(os.getenv("COURSE_CACHE_STALE_SECONDS", str(7 * 24 * 3600))),
+        empty_seconds=float(os.getenv("COURSE_CACHE_EMPTY_SECONDS", "300")),
+        max_memory_entries=int(os.getenv("COURSE_CACHE_MEMORY_ENTRIES", "256"))
+    )
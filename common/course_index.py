@@ -0,0 +1,492 @@
+"""
+Offline course catalogue index for the course agent.
+
+Ingestion turns course search pages (saved HTML, or a crawl over a list of keywords) into
+course records held in a SQLite catalogue. Each record is tokenised once, when it is added
+or changes, so re-ingesting a page only re-processes the courses that differ.
+
+The catalogue is then compiled into a read-only index file: an inverted index whose
+postings carry precomputed BM25F weights (title, qualification code and study mode are
+boosted), plus the records themselves. The file is memory-mapped, so opening it costs a
+header read; terms are found by binary search and only the records of the top hits are
+decoded.
+
+Usage:
+    python -m common.course_index ingest benchmarks/fixtures/course_search
+    python -m common.course_index crawl nursing electrician "cyber security"
+    python -m common.course_index search "diploma of nursing online"
+"""
+
+import os
+import re
+import json
+import math
+import mmap
+import time
+import heapq
+import struct
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .course_cache import LOOKUP_BUCKETS
+from .course_search import extract_course_cards, parse_course_card
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '.data')
+DEFAULT_CATALOGUE_PATH = os.path.join(DATA_DIR, 'course_catalogue.db')
+DEFAULT_INDEX_PATH = os.path.join(DATA_DIR, 'course_index.bin')
+
+# Relative weight of a term occurrence in each field (BM25F); fields not listed are not searchable
+FIELD_BOOSTS = {
+    "title": 3.0,
+    "code": 5.0,
+    "study_mode": 2.0,
+    "location": 1.0,
+    "duration": 0.5,
+    "summary": 0.5
+}
+K1 = 1.2
+B = 0.75
+
+# Unmatched query terms are expanded to indexed terms they prefix ("electric" -> "electrical"), at a discount
+PREFIX_MIN_LENGTH = 4
+PREFIX_MAX_EXPANSIONS = 20
+PREFIX_WEIGHT = 0.5
+
+STOPWORDS = frozenset({"a", "an", "and", "the", "of", "in", "for", "to", "with", "on", "at", "by", "or", "course",
+                       "courses"})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# File layout: header, term table (sorted by term bytes), term bytes, postings, document table, records
+_MAGIC = b"CRSX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHIIQQQQQQ")    # magic, version, pad, docs, terms, generation, 5 section offsets
+_TERM = struct.Struct("<IHxxQI")            # term offset, term length, postings offset, document frequency
+_POSTING = struct.Struct("<If")             # document number, BM25F weight (idf included)
+_DOC = struct.Struct("<QI")                 # record offset, record length
+
+_CATALOGUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    terms TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _WORD.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def course_id(record: Dict[str, Any]) -> str:
+    """Stable identity of a course: its page URL, else its code, else its title."""
+    url = (record.get("url") or "").split("#")[0].rstrip("/").lower()
+    return url or (record.get("code") or "").upper() or (record.get("title") or "").lower()
+
+
+def card_records(cards: Iterable[str], base_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [parse_course_card(card, base_url) for card in cards]
+
+
+def rank_records(records: List[Dict[str, Any]], query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Order records (e.g. live search results) by the boosted fields the query terms appear
+    in, keeping the site's order between equals; the light-weight counterpart of CourseIndex.search.
+    """
+    terms = set(tokenize(query))
+
+    def score(record: Dict[str, Any]) -> float:
+        return sum(boost for field, boost in FIELD_BOOSTS.items() if terms & set(tokenize(record.get(field, ""))))
+
+    ranked = sorted(records, key=score, reverse=True)
+    return ranked[:limit] if limit is not None else ranked
+
+
+def _field_terms(record: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """Term frequencies per searchable field."""
+    return {field: dict(Counter(tokenize(record.get(field, "")))) for field in FIELD_BOOSTS}
+
+
+class CourseCatalogue:
+    """SQLite store of course records and their pre-tokenised fields; the source the index is built from."""
+
+    def __init__(self, db_path: str = DEFAULT_CATALOGUE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_CATALOGUE_SCHEMA)
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """Incremented whenever a course is added, changed or removed."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Add or update courses; unchanged ones are only marked as seen. Returns counts by outcome."""
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for record in records:
+                    if not record.get("title"):
+                        continue
+                    key = course_id(record)
+                    digest = hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+                    row = self._conn.execute("SELECT digest FROM courses WHERE id = ?", (key,)).fetchone()
+                    if row is not None and row[0] == digest:
+                        self._conn.execute("UPDATE courses SET seen_at = ? WHERE id = ?", (now, key))
+                        counts["unchanged"] += 1
+                        continue
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO courses (id, record, digest, terms, seen_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, json.dumps(record), digest, json.dumps(_field_terms(record)), now, now)
+                    )
+                    counts["added" if row is None else "updated"] += 1
+                if counts["added"] or counts["updated"]:
+                    self._bump_generation()
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return counts
+
+    def ingest_html(self, html: str, base_url: Optional[str] = None) -> Dict[str, int]:
+        """Ingest every course card in a search results page."""
+        return self.upsert(card_records(extract_course_cards(html), base_url))
+
+    def ingest_directory(self, directory: str) -> Dict[str, int]:
+        """Ingest every saved search page (*.html) in a directory."""
+        totals = Counter()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".html"):
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    totals.update(self.ingest_html(f.read()))
+        return dict(totals)
+
+    async def crawl(self, keywords: Iterable[str], fetcher) -> Dict[str, int]:
+        """Ingest live search results for each keyword, via a CourseSearchFetcher."""
+        totals = Counter()
+        for keyword in keywords:
+            cards = await fetcher.search(keyword)
+            totals.update(self.upsert(card_records(cards, fetcher.base_url)))
+        return dict(totals)
+
+    def prune(self, seen_before: float) -> int:
+        """Remove courses not seen by any ingestion since `seen_before` (epoch seconds)."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM courses WHERE seen_at < ?", (seen_before,)).rowcount
+            if removed:
+                self._bump_generation()
+        return removed
+
+    def documents(self) -> List[Tuple[str, str, str]]:
+        """(id, record JSON, terms JSON) for every course, in id order."""
+        with self._lock:
+            return self._conn.execute("SELECT id, record, terms FROM courses ORDER BY id").fetchall()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM courses").fetchone()[0]
+
+    def _bump_generation(self) -> None:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+
+def build_index(catalogue: CourseCatalogue, path: str = DEFAULT_INDEX_PATH, force: bool = False) -> Dict[str, Any]:
+    """
+    Compile the catalogue into the index file at `path` (written atomically). Skipped when
+    the file already reflects the catalogue's generation, unless `force` is set.
+    """
+    generation = catalogue.generation
+    if not force and _file_generation(path) == generation:
+        return {"built": False, "generation": generation}
+
+    started = time.perf_counter()
+    documents = catalogue.documents()
+    doc_terms = [json.loads(terms) for _, _, terms in documents]
+
+    # Average field lengths for BM25F length normalisation
+    totals = Counter()
+    for fields in doc_terms:
+        for field, frequencies in fields.items():
+            totals[field] += sum(frequencies.values())
+    count = max(1, len(documents))
+    avg_length = {field: (totals[field] / count) or 1.0 for field in FIELD_BOOSTS}
+
+    # Boosted, length-normalised term frequency per document (BM25F pseudo-frequency)
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for number, fields in enumerate(doc_terms):
+        weighted = Counter()
+        for field, frequencies in fields.items():
+            boost = FIELD_BOOSTS.get(field)
+            if not boost:
+                continue
+            length = sum(frequencies.values())
+            norm = (1 - B) + B * length / avg_length[field]
+            for term, frequency in frequencies.items():
+                weighted[term] += boost * frequency / norm
+        for term, frequency in weighted.items():
+            postings.setdefault(term, []).append((number, frequency))
+
+    terms = sorted(postings, key=lambda term: term.encode("utf-8"))
+    term_bytes = [term.encode("utf-8") for term in terms]
+    records = [record.encode("utf-8") for _, record, _ in documents]
+
+    offsets = [_HEADER.size]
+    offsets.append(offsets[-1] + _TERM.size * len(terms))                            # term bytes
+    offsets.append(offsets[-1] + sum(len(term) for term in term_bytes))             # postings
+    offsets.append(offsets[-1] + _POSTING.size * sum(len(p) for p in postings.values()))  # documents
+    offsets.append(offsets[-1] + _DOC.size * len(records))                          # records
+
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, len(records), len(terms), generation, *offsets))
+        term_offset, posting_offset = offsets[1], offsets[2]
+        for term, encoded in zip(terms, term_bytes):
+            f.write(_TERM.pack(term_offset, len(encoded), posting_offset, len(postings[term])))
+            term_offset += len(encoded)
+            posting_offset += _POSTING.size * len(postings[term])
+        for encoded in term_bytes:
+            f.write(encoded)
+        for term in terms:
+            idf = _idf(len(postings[term]), len(records))
+            for number, frequency in postings[term]:
+                f.write(_POSTING.pack(number, idf * frequency * (K1 + 1) / (frequency + K1)))
+        record_offset = offsets[4]
+        for encoded in records:
+            f.write(_DOC.pack(record_offset, len(encoded)))
+            record_offset += len(encoded)
+        for encoded in records:
+            f.write(encoded)
+    os.replace(tmp_path, path)
+
+    stats = {"built": True, "generation": generation, "documents": len(records), "terms": len(terms),
+             "bytes": os.path.getsize(path), "seconds": round(time.perf_counter() - started, 4)}
+    logger.info(f"Built course index {path}: {stats}")
+    return stats
+
+
+def _idf(document_frequency: int, documents: int) -> float:
+    return math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def _file_generation(path: str) -> Optional[int]:
+    try:
+        with open(path, "rb") as f:
+            header = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return header[5] if header[0] == _MAGIC and header[1] == _VERSION else None
+
+
+class CourseIndex:
+    """Read side of the index file: memory-mapped, reopened automatically when the file is rebuilt."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._signature = None
+        self._metrics: Optional[Dict[str, Any]] = None
+        self._open()
+
+    def register_metrics(self, registry) -> None:
+        """Publish queries by result (hit, empty) and query latency."""
+        documents = registry.gauge("course_index_documents", "Courses in the loaded index")
+        self._metrics = {
+            "queries": registry.counter("course_index_queries_total", "Course index queries by result (hit, empty)",
+                                        ["result"]),
+            "latency": registry.histogram("course_index_query_seconds", "Course index query latency",
+                                          buckets=LOOKUP_BUCKETS)
+        }
+        registry.add_callback(lambda: documents.set(self.documents))
+
+    def __len__(self) -> int:
+        return self.documents
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Top `limit` courses for `query` as (score, record), best first. Only courses matching
+        every query term (exactly or by prefix) are returned, so a query the index cannot fully
+        answer comes back empty rather than as partial matches on its commonest word.
+        """
+        return self.search_counted(query, limit)[1]
+
+    def search_counted(self, query: str, limit: int = 10) -> Tuple[int, List[Tuple[float, Dict[str, Any]]]]:
+        """As search(), also returning how many courses matched before `limit` was applied."""
+        started = time.perf_counter()
+        self.maybe_reload()
+        scores: Dict[int, float] = {}
+        for position, term in enumerate(dict.fromkeys(tokenize(query))):
+            index = self._find(term)
+            expansions = [(index, 1.0)] if index is not None else \
+                [(i, PREFIX_WEIGHT) for i in self._prefixed(term)] if len(term) >= PREFIX_MIN_LENGTH else []
+            term_scores: Dict[int, float] = {}
+            for term_index, weight in expansions:
+                for number, score in self._postings(term_index):
+                    if position == 0 or number in scores:
+                        term_scores[number] = term_scores.get(number, 0.0) + weight * score
+            scores = {number: scores.get(number, 0.0) + score for number, score in term_scores.items()}
+            if not scores:
+                break
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        hits = [(round(score, 4), self.record(number)) for number, score in top]
+        if self._metrics:
+            self._metrics["queries"].inc(result="hit" if hits else "empty")
+            self._metrics["latency"].observe(time.perf_counter() - started)
+        return len(scores), hits
+
+    def record(self, number: int) -> Dict[str, Any]:
+        offset, length = _DOC.unpack_from(self._map, self._docs_offset + number * _DOC.size)
+        return json.loads(self._map[offset:offset + length])
+
+    def maybe_reload(self) -> None:
+        """Remap the file if it has been rebuilt since it was opened."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if (stat.st_mtime_ns, stat.st_size, stat.st_ino) != self._signature:
+            self._open()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def _open(self) -> None:
+        self.close()
+        self._file = open(self.path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.documents, self.terms, self.generation, terms_offset, _, _, \
+            self._docs_offset, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{self.path} is not a course index (version {_VERSION})")
+        self._terms_offset = terms_offset
+        self._signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _term(self, index: int) -> Tuple[bytes, int, int]:
+        offset, length, postings, frequency = _TERM.unpack_from(self._map, _HEADER.size + index * _TERM.size)
+        return self._map[offset:offset + length], postings, frequency
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self.terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, term: str) -> Optional[int]:
+        key = term.encode("utf-8")
+        index = self._lower_bound(key)
+        return index if index < self.terms and self._term(index)[0] == key else None
+
+    def _prefixed(self, prefix: str) -> List[int]:
+        key = prefix.encode("utf-8")
+        index = self._lower_bound(key)
+        matches = []
+        while index < self.terms and len(matches) < PREFIX_MAX_EXPANSIONS and self._term(index)[0].startswith(key):
+            matches.append(index)
+            index += 1
+        return matches
+
+    def _postings(self, index: int):
+        _, offset, frequency = self._term(index)
+        return _POSTING.iter_unpack(self._map[offset:offset + frequency * _POSTING.size])
+
+
+def open_course_index(path: Optional[str] = None) -> Optional[CourseIndex]:
+    """Open the index at COURSE_INDEX_PATH (or `path`), or None if it has not been built."""
+    path = path or os.getenv("COURSE_INDEX_PATH", DEFAULT_INDEX_PATH)
+    if not os.path.exists(path):
+        logger.info(f"No course index at {path}; searches go to the live site")
+        return None
+    try:
+        index = CourseIndex(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Could not open course index {path}: {e}")
+        return None
+    logger.info(f"Course index {path}: {index.documents} courses, {index.terms} terms")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalogue", default=os.getenv("COURSE_CATALOGUE_DB", DEFAULT_CATALOGUE_PATH))
+    parser.add_argument("--index", default=os.getenv("COURSE_INDEX_PATH", DEFAULT_INDEX_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Ingest saved search pages (*.html) from directories")
+    ingest.add_argument("directories", nargs="+")
+    crawl = commands.add_parser("crawl", help="Ingest live search results for keywords")
+    crawl.add_argument("keywords", nargs="+")
+    prune = commands.add_parser("prune", help="Remove courses not seen for a number of days")
+    prune.add_argument("--days", type=float, default=30.0)
+    commands.add_parser("build", help="Rebuild the index file from the catalogue")
+    search = commands.add_parser("search", help="Query the index")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "search":
+        index = CourseIndex(args.index)
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        for score, record in hits:
+            print(f"{score:8.3f}  {record.get('code', ''):<12} {record.get('title', '')}")
+        print(f"{len(hits)} results in {elapsed:.2f} ms")
+        return
+
+    catalogue = CourseCatalogue(args.catalogue)
+    if args.command == "ingest":
+        for directory in args.directories:
+            print(f"{directory}: {catalogue.ingest_directory(directory)}")
+    elif args.command == "crawl":
+        import asyncio
+        from .course_search import create_course_search_fetcher
+
+        async def run():
+            fetcher = create_course_search_fetcher()
+            try:
+                return await catalogue.crawl(args.keywords, fetcher)
+            finally:
+                await fetcher.close()
+        print(asyncio.run(run()))
+    elif args.command == "prune":
+        print(f"Removed {catalogue.prune(time.time() - args.days * 86400)} courses")
+    print(build_index(catalogue, args.index, force=args.command == "build"))
+
+
+if __name__ == "__main__":
+    main()
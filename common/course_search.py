@@ -0,0 +1,379 @@
+"""
+HTTP-first TAFE NSW course search.
+The course-search page is fetched over a pooled async HTTP client and streamed through an
+incremental HTML parser that pulls out the course cards. A browser (see browser_pool.py)
+is only used when the static response has no cards, e.g. when results are rendered
+client-side.
+"""
+
+import os
+import re
+import time
+import logging
+from html.parser import HTMLParser
+from urllib.parse import quote_plus, urljoin
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Search page; point TAFE_COURSE_SEARCH_URL at a fixture server to test offline
+COURSE_SEARCH_URL = os.getenv("TAFE_COURSE_SEARCH_URL", "https://www.tafensw.edu.au/course-search")
+
+# Classes of a course card: div.flex.items-start.px-3.py-4.lg:px-0
+COURSE_CARD_CLASSES = frozenset({"flex", "items-start", "px-3", "py-4", "lg:px-0"})
+
+# Server-rendered text of a search with no matches; such a page needs no browser fallback
+NO_RESULTS_PATTERN = re.compile(r"No courses match your search|Showing\s+0\s+results", re.I)
+
+
+# Labels in a card's definition list, by record field
+CARD_LABELS = {
+    "study mode": "study_mode",
+    "delivery mode": "study_mode",
+    "location": "location",
+    "locations": "location",
+    "duration": "duration"
+}
+
+# National (HLT54121), skill set (HLTSS00068) and state-accredited (22603VIC) codes
+_QUALIFICATION_CODE = re.compile(r"\b(?:[A-Z]{3}SS\d{5}|[A-Z]{3}\d{5}|\d{5}VIC)\b")
+
+# Fields of a compact course line, in order; longer values are cut to COMPACT_FIELD_CHARS
+COMPACT_FIELDS = ("title", "code", "study_mode", "location", "duration", "url")
+COMPACT_FIELD_CHARS = 80
+
+_HEADINGS = frozenset({"h1", "h2", "h3", "h4", "h5"})
+# Elements without an end tag (plus self-closed SVG paths) when walking a card
+_VOID_TAGS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source",
+                        "track", "wbr", "path"})
+
+
+def course_search_url(keyword: str, base_url: Optional[str] = None) -> str:
+    return f"{base_url or COURSE_SEARCH_URL}?keyword={quote_plus(keyword)}"
+
+
+# One token of markup: a comment, a whole script/style element (skipped) or a tag
+_TOKEN = re.compile(
+    r"<!--.*?-->"
+    r"|<(script|style)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>.*?</\1\s*>"
+    r"|<(/?)([a-zA-Z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>",
+    re.S | re.I
+)
+_CLASS_ATTR = re.compile(r"""(?:^|\s)class\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.I)
+# Where a token that matters can start: a div tag, or a comment/script/style to skip over
+_INTERESTING = re.compile(r"<(?:/?div\b|!--|script\b|style\b)", re.I)
+
+
+class CourseCardParser:
+    """
+    Incremental extractor for the source HTML of each course card. Feed it the page in
+    chunks as they arrive; completed cards accumulate in `cards`, and `no_results` is set
+    if the page's markup (not its scripts, which may carry the message for client-side
+    rendering) says the search matched nothing. A compiled pattern jumps between div tags
+    (skipping comments, scripts and styles) and only div nesting is tracked, so the rest
+    of the page is never tokenised.
+    """
+
+    def __init__(self, card_classes: frozenset = COURSE_CARD_CLASSES):
+        self.card_classes = card_classes
+        self.cards: List[str] = []
+        self.no_results = False
+        self._buffer = ""
+        # Offsets into the buffer: where scanning resumes, where markup not yet checked for
+        # the no-results text begins, and where the open card began
+        self._pos = 0
+        self._text = 0
+        self._card_start: Optional[int] = None
+        self._depth = 0
+
+    def feed(self, chunk: str) -> None:
+        self._buffer += chunk
+        self._scan(final=False)
+
+    def close(self) -> None:
+        self._scan(final=True)
+        self._buffer = ""
+
+    def _scan(self, final: bool) -> None:
+        buffer = self._buffer
+        pos, text = self._pos, self._text
+        while True:
+            found = _INTERESTING.search(buffer, pos)
+            if found is None:
+                # A token may be split across chunks; rescan the tail with the next one
+                pos = len(buffer) if final else max(pos, len(buffer) - 8)
+                self._check_text(buffer, text, pos)
+                # ...and the no-results text too, keeping enough of it to match across the split
+                text = max(text, pos - 40)
+                break
+            start = found.start()
+            self._check_text(buffer, text, start)
+            match = _TOKEN.match(buffer, start)
+            if match is None:
+                if not final:
+                    # Wait for the rest of the tag, comment or script
+                    pos = text = start
+                    break
+                pos = start + 1
+                text = start
+                continue
+            pos = text = match.end()
+            tag = match.group(3)
+            if tag is None or tag.lower() != "div":
+                continue
+            closing = match.group(2) == "/"
+            if self._card_start is None:
+                if closing:
+                    continue
+                classes = _CLASS_ATTR.search(match.group(4))
+                # class="" leaves every alternative of the pattern empty
+                if classes and self.card_classes.issubset(next(filter(None, classes.groups()), "").split()):
+                    self._card_start = start
+                    self._depth = 1
+            elif closing:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.cards.append(buffer[self._card_start:pos])
+                    self._card_start = None
+            elif not match.group(4).rstrip().endswith("/"):
+                self._depth += 1
+
+        # Keep only what may still be needed: the open card, or an incomplete token or text
+        keep = min(text, self._card_start if self._card_start is not None else pos)
+        self._buffer = buffer[keep:]
+        self._pos, self._text = pos - keep, text - keep
+        if self._card_start is not None:
+            self._card_start -= keep
+
+    def _check_text(self, buffer: str, start: int, end: int) -> None:
+        """Look for the no-results text in markup outside comments, scripts and styles."""
+        if not self.no_results and start < end:
+            self.no_results = NO_RESULTS_PATTERN.search(buffer, start, end) is not None
+
+
+def extract_course_cards(html: str) -> List[str]:
+    """Source HTML of every course card in a search results page."""
+    parser = CourseCardParser()
+    parser.feed(html)
+    parser.close()
+    return parser.cards
+
+
+class _CardFields(HTMLParser):
+    """Pulls the visible fields out of one course card."""
+
+    def __init__(self):
+        super().__init__()
+        self.fields: Dict[str, str] = {}
+        self.text: List[str] = []
+        self._open: List[str] = []
+        self._capture: Optional[tuple] = None  # (field, depth, parts)
+        self._hidden_depth: Optional[int] = None
+        self._label = ""
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag in _VOID_TAGS:
+            return
+        self._open.append(tag)
+        depth = len(self._open)
+        if self._hidden_depth is None and "sr-only" in (attributes.get("class") or "").split():
+            self._hidden_depth = depth
+        if tag == "a" and "url" not in self.fields and attributes.get("href") and \
+                (any(name in _HEADINGS for name in self._open) or "/course/" in attributes["href"]):
+            self.fields["url"] = attributes["href"]
+        if self._capture is not None:
+            return
+        field = None
+        if attributes.get("data-testid") == "course-code":
+            field = "code"
+        elif tag in _HEADINGS and "title" not in self.fields:
+            field = "title"
+        elif tag == "dt":
+            field = "label"
+        elif tag == "dd":
+            field = "value"
+        elif tag == "p" and "summary" not in self.fields:
+            field = "summary"
+        if field:
+            self._capture = (field, depth, [])
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS or tag not in self._open:
+            return
+        while self._open and self._open.pop() != tag:
+            pass
+        depth = len(self._open)
+        if self._hidden_depth is not None and depth < self._hidden_depth:
+            self._hidden_depth = None
+        if self._capture is not None and depth < self._capture[1]:
+            field, _, parts = self._capture
+            self._capture = None
+            self._store(field, " ".join("".join(parts).split()))
+
+    def handle_data(self, data):
+        if self._hidden_depth is not None:
+            return
+        self.text.append(data)
+        if self._capture is not None:
+            self._capture[2].append(data)
+
+    def _store(self, field: str, text: str) -> None:
+        if field == "label":
+            self._label = text.lower().rstrip(":").strip()
+        elif field == "value":
+            mapped = CARD_LABELS.get(self._label)
+            if mapped and text:
+                self.fields.setdefault(mapped, text)
+        elif text:
+            self.fields.setdefault(field, text)
+
+
+def parse_course_card(card_html: str, base_url: Optional[str] = None) -> Dict[str, str]:
+    """
+    Structured fields of a course card: title, code, study_mode, location, duration, url
+    and summary (empty strings when the card lacks one). The URL is made absolute.
+    """
+    parser = _CardFields()
+    parser.feed(card_html)
+    parser.close()
+    fields = parser.fields
+    if "code" not in fields:
+        match = _QUALIFICATION_CODE.search(" ".join(parser.text))
+        if match:
+            fields["code"] = match.group(0)
+    record = {name: fields.get(name, "") for name in
+              ("title", "code", "study_mode", "location", "duration", "url", "summary")}
+    if record["url"]:
+        record["url"] = urljoin(base_url or COURSE_SEARCH_URL, record["url"])
+    return record
+
+
+def format_course_record(record: Dict[str, str]) -> str:
+    """
+    One compact line for a course, e.g.
+    "Diploma of Nursing [HLT54121] | mode: Blended | location: Ultimo | duration: 18 months | https://...".
+    """
+    def cut(value: str) -> str:
+        value = " ".join((value or "").split())
+        return value if len(value) <= COMPACT_FIELD_CHARS else value[:COMPACT_FIELD_CHARS - 3].rstrip(" ,") + "..."
+
+    line = cut(record.get("title", ""))
+    if record.get("code"):
+        line += f" [{record['code']}]"
+    for field, label in (("study_mode", "mode"), ("location", "location"), ("duration", "duration")):
+        if record.get(field):
+            line += f" | {label}: {cut(record[field])}"
+    if record.get("url"):
+        line += f" | {record['url']}"
+    return line
+
+
+class CourseSearchFetcher:
+    """Fetches search results over HTTP, escalating to a browser only when the page has no cards."""
+
+    def __init__(self, browser_search: Optional[Callable[[str], Awaitable[List[str]]]] = None,
+                 base_url: Optional[str] = None, timeout: float = 10.0, max_connections: int = 10):
+        """
+        Args:
+            browser_search: Async fallback returning the cards for a keyword (e.g. a pooled browser scrape)
+            base_url: Search page URL (defaults to COURSE_SEARCH_URL)
+            timeout: Seconds allowed for the HTTP fetch
+            max_connections: Connections kept by the HTTP client's pool
+        """
+        self.browser_search = browser_search
+        self.base_url = base_url or COURSE_SEARCH_URL
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._metrics: Optional[Dict[str, Any]] = None
+
+    def register_metrics(self, registry) -> None:
+        """Publish searches by path (http, browser) and outcome, and their latency."""
+        self._metrics = {
+            "searches": registry.counter("course_search_requests_total",
+                                         "Course searches by path (http, browser) and outcome (found, empty, error)",
+                                         ["path", "outcome"]),
+            "duration": registry.histogram("course_search_duration_seconds", "Course search latency by path",
+                                           ["path"])
+        }
+
+    async def search(self, keyword: str) -> List[str]:
+        """
+        Course card HTML for `keyword`: static page first, browser if it has none (unless
+        the page itself says nothing matched).
+        """
+        page = await self._timed("http", self.fetch_page, keyword)
+        if page is not None and (page.cards or page.no_results):
+            return page.cards
+        if self.browser_search is None:
+            return []
+        logger.info(f"No course cards in the static page for {keyword!r}; falling back to the browser")
+        return await self._timed("browser", self.browser_search, keyword) or []
+
+    async def search_records(self, keyword: str) -> List[Dict[str, str]]:
+        """Structured course records (see parse_course_card) for `keyword`, in site order."""
+        return [parse_course_card(card, self.base_url) for card in await self.search(keyword)]
+
+    async def fetch_static(self, keyword: str) -> List[str]:
+        """Course cards in the static search page."""
+        return (await self.fetch_page(keyword)).cards
+
+    async def fetch_page(self, keyword: str) -> CourseCardParser:
+        """Fetch the search page and parse it as the response streams in."""
+        parser = CourseCardParser()
+        async with self._http().stream("GET", course_search_url(keyword, self.base_url)) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_text():
+                parser.feed(chunk)
+        parser.close()
+        return parser
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _http(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the event loop that uses it; connections are reused across searches
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                headers={"User-Agent": "Mozilla/5.0 (compatible; TAFE-course-agent)"}
+            )
+        return self._client
+
+    async def _timed(self, path: str, search: Callable[[str], Awaitable[Any]], keyword: str) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await search(keyword)
+            cards = result.cards if isinstance(result, CourseCardParser) else result
+            outcome = "found" if cards else "empty"
+            return result
+        except Exception as e:
+            logger.warning(f"Course search via {path} failed for {keyword!r}: {type(e).__name__}: {e}")
+            return None
+        finally:
+            if self._metrics:
+                self._metrics["searches"].inc(path=path, outcome=outcome)
+                self._metrics["duration"].observe(time.perf_counter() - started, path=path)
+
+
+def create_course_search_fetcher(browser_search: Optional[Callable[[str], Awaitable[List[str]]]] = None
+                                 ) -> CourseSearchFetcher:
+    """
+    Build the fetcher configured by TAFE_COURSE_SEARCH_URL, COURSE_SEARCH_HTTP_TIMEOUT_SECONDS
+    and COURSE_SEARCH_HTTP_MAX_CONNECTIONS. `browser_search` is the fallback for pages without
+    static results.
+    """
+    return CourseSearchFetcher(
+        browser_search=browser_search,
+        timeout=float(os.getenv("COURSE_SEARCH_HTTP_TIMEOUT_SECONDS", "10")),
+        max_connections=int(os.getenv("COURSE_SEARCH_HTTP_MAX_CONNECTIONS", "10"))
+    )
@@ -0,0 +1,35 @@
+"""Admission control feedback from abandoned requests."""
+
+import asyncio
+
+from common.a2a_server import AgentRequest, _admitted_task
+from common.admission import AdmissionController
+
+
+class _SlowTaskManager:
+    async def process_task(self, message, context=None, session_id=None):
+        await asyncio.sleep(10)
+
+
+def test_cancelled_request_frees_its_slot_without_growing_the_limit():
+    admission = AdmissionController(initial_limit=4)
+
+    async def abandon():
+        task = asyncio.ensure_future(_admitted_task(admission, "user", _SlowTaskManager(),
+                                                    AgentRequest(message="hi"), None))
+        await asyncio.sleep(0.01)
+        assert admission.in_flight == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(abandon())
+    assert admission.in_flight == 0
+    assert admission.limit == 4.0
+
+
+def test_completed_request_grows_the_limit():
+    admission = AdmissionController(initial_limit=4)
+    asyncio.run(admission.acquire("user"))
+    admission.release(0.1)
+    assert admission.in_flight == 0
+    assert admission.limit == 4.25
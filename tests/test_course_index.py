@@ -0,0 +1,29 @@
+"""Offline course index built from the saved search pages."""
+
+import pytest
+
+from benchmarks.course_fixture_server import FIXTURE_DIR
+from common.course_index import CourseCatalogue, CourseIndex, build_index
+
+
+@pytest.fixture
+def index(tmp_path):
+    catalogue = CourseCatalogue(str(tmp_path / "catalogue.db"))
+    catalogue.ingest_directory(FIXTURE_DIR)
+    build_index(catalogue, str(tmp_path / "course_index.bin"))
+    index = CourseIndex(str(tmp_path / "course_index.bin"))
+    yield index
+    index.close()
+
+
+def test_every_query_term_must_match(index):
+    titles = [record["title"] for _, record in index.search("cyber security", 8)]
+    assert titles and all("Cyber Security" in title for title in titles)
+    assert index.search("plumbing online", 8) == []
+    assert index.search("aged care", 8) == []
+
+
+def test_match_count_is_taken_before_the_limit(index):
+    total, hits = index.search_counted("cyber security", 2)
+    assert len(hits) == 2
+    assert total == len(index.search("cyber security", 100)) > 2
@@ -0,0 +1,66 @@
+"""Course card extraction from search result pages."""
+
+import os
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.course_fixture_server import FIXTURE_DIR
+from common.course_search import CourseCardParser, CourseSearchFetcher, extract_course_cards
+
+CARD = '<div class="flex items-start px-3 py-4 lg:px-0"><div class=""><h3>Diploma of Nursing</h3></div></div>'
+
+
+def test_empty_class_attributes_are_skipped():
+    page = f'<div class="">x</div><div class=\'\'><div class=>{CARD}</div></div>'
+    assert extract_course_cards(page) == [CARD]
+
+
+def test_chunked_feed_matches_single_feed():
+    page = f'<main><div class="">{CARD}<!-- <div class="flex items-start px-3 py-4 lg:px-0"> -->{CARD}</div></main>'
+    parser = CourseCardParser()
+    for i in range(0, len(page), 7):
+        parser.feed(page[i:i + 7])
+    parser.close()
+    assert parser.cards == extract_course_cards(page) == [CARD, CARD]
+
+
+def _fetcher_serving(fixture: str, browser_calls: list) -> CourseSearchFetcher:
+    with open(os.path.join(FIXTURE_DIR, fixture), encoding="utf-8") as page:
+        html = page.read()
+
+    async def browser_search(keyword):
+        browser_calls.append(keyword)
+        return [CARD]
+
+    fetcher = CourseSearchFetcher(browser_search=browser_search)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=html)))
+    return fetcher
+
+
+def test_no_results_page_does_not_fall_back_to_browser():
+    browser_calls = []
+    fetcher = _fetcher_serving("_no_results.html", browser_calls)
+    assert asyncio.run(fetcher.search("zzz")) == []
+    assert browser_calls == []
+
+
+@pytest.mark.parametrize("fixture", ["_client_rendered.html", "_client_rendered_messages.html"])
+def test_client_rendered_page_falls_back_to_browser(fixture):
+    # The second page carries the no-results text in its scripts, for rendering client-side
+    browser_calls = []
+    fetcher = _fetcher_serving(fixture, browser_calls)
+    assert asyncio.run(fetcher.search("nursing")) == [CARD]
+    assert browser_calls == ["nursing"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 17, 4096])
+def test_no_results_text_is_found_across_chunks(chunk_size):
+    with open(os.path.join(FIXTURE_DIR, "_no_results.html"), encoding="utf-8") as page:
+        html = page.read()
+    parser = CourseCardParser()
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i:i + chunk_size])
+    parser.close()
+    assert parser.no_results and parser.cards == []
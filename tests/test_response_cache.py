@@ -0,0 +1,75 @@
+"""Replies cached in one consultation must not leak into another stakeholder's session."""
+
+from types import SimpleNamespace
+
+from agent.response_cache import ResponseCache, Personalisation
+from agent.task_manager import TaskManager, A2A_APP_NAME, HISTORY_WINDOW
+from agent.transcript_store import TranscriptStore
+
+SAM = {"name": "Sam Taylor", "role": "Head Teacher", "department": "Nursing"}
+ALEX = {"name": "Alex Lee", "role": "Head Teacher", "department": "Nursing"}
+
+GREETING = [{"sender": "ai", "message": "Hi! I'm Riley. What's your role?"}]
+FOLLOW_UP = {"sender": "ai", "message": "Got it. What are your main priorities this year?"}
+
+
+def _key(cache, context, history, message="thanks"):
+    return cache.key("role_context_gathering", "general", "tier:model", history, message, Personalisation(context))
+
+
+def _replay(cache, stored_from, served_to, reply):
+    """Store `reply` from one session and look the same turn up from another."""
+    sam_history, sam_context = stored_from
+    alex_history, alex_context = served_to
+    sam_key = _key(cache, sam_context, sam_history)
+    cache.store(sam_key, sam_key.personalisation.strip(reply))
+    alex_key = _key(cache, alex_context, alex_history)
+    template, _, _ = cache.lookup(alex_key)
+    return alex_key.personalisation.apply(template) if template is not None else None
+
+
+def test_reply_is_not_served_to_a_session_with_different_history():
+    cache = ResponseCache()
+    # Same latest exchange, different facts earlier in the session
+    sam_history = GREETING + [{"sender": "user", "message": "I manage 4 people while teaching Nursing at Ultimo"},
+                              FOLLOW_UP]
+    alex_history = GREETING + [{"sender": "user", "message": "I run the Nursing team in Dubbo"}, FOLLOW_UP]
+    reply = _replay(cache, (sam_history, SAM), (alex_history, ALEX),
+                    "Thanks Sam Taylor! Managing 4 people while teaching Nursing at Ultimo is a lot.")
+    assert reply is None
+
+
+def test_reply_naming_the_stakeholder_by_first_name_is_not_cached():
+    cache = ResponseCache()
+    reply = _replay(cache, (GREETING, SAM), (GREETING, ALEX), "Thanks Sam! Tell me about your team.")
+    assert reply is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_reply_with_full_name_is_re_personalised_for_the_next_stakeholder():
+    cache = ResponseCache()
+    reply = _replay(cache, (GREETING, SAM), (GREETING, ALEX),
+                    "Thanks Sam Taylor! How is the Nursing team going?")
+    assert reply == "Thanks Alex Lee! How is the Nursing team going?"
+    assert "Sam" not in reply
+
+
+def test_lookup_keys_on_messages_older_than_the_history_window(tmp_path):
+    transcripts = TranscriptStore(str(tmp_path / "transcripts.db"))
+    # Sessions differ only in their first answer; the last HISTORY_WINDOW messages are identical
+    tail = [{"sender": "ai" if i % 2 else "user", "message": "Yes" if i % 2 == 0 else "And the next one?"}
+            for i in range(HISTORY_WINDOW + 1)]
+    transcripts.append(A2A_APP_NAME, "sam", "s1", GREETING + [{"sender": "user", "message": "About 4 years"}] + tail)
+    transcripts.append(A2A_APP_NAME, "alex", "s2", GREETING + [{"sender": "user", "message": "About 20 years"}] + tail)
+    manager = SimpleNamespace(agent=SimpleNamespace(instruction="Riley", model="model"), response_cache=ResponseCache(),
+                              transcripts=transcripts, metrics=None)
+
+    def lookup(context, user_id, session_id):
+        return TaskManager._lookup_cached_reply(manager, "thanks", context, user_id, session_id,
+                                                "role_context_gathering", "general", None)
+
+    sam_key, reply, result = lookup(SAM, "sam", "s1")
+    assert (reply, result) == (None, "miss")
+    manager.response_cache.store(sam_key, "With about 4 years behind you, what is your biggest challenge?")
+    assert lookup(SAM, "sam", "s1")[2] == "exact"
+    assert lookup(ALEX, "alex", "s2")[1:] == (None, "miss")
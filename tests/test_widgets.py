@@ -0,0 +1,57 @@
+"""Standard consultation widgets must keep the names the parent frontend sees."""
+
+import os
+import re
+
+import pytest
+
+from agent.widgets import PRESETS, WidgetRenderer
+
+# Pages the tools returned before widgets were rendered from templates
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "widgets")
+
+_TITLE = re.compile(r"<title>(.*?)</title>")
+_ATTRIBUTE = re.compile(r"""\b(id|name|for)="([^"$]+)\"""")
+# Field ids of pages that build their inputs in script
+_SCRIPT_ID = re.compile(r"""["']?(?:id|key)["']?:\s*["'](\w+)["']""")
+_RESPONSE_TEXT = re.compile(r'let responseMessage = "([^"\\\n]*)')
+
+
+def _fields(page):
+    return {
+        "title": _TITLE.findall(page),
+        "attributes": _ATTRIBUTE.findall(page),
+        "script_ids": _SCRIPT_ID.findall(page),
+        "response_text": _RESPONSE_TEXT.findall(page)
+    }
+
+
+@pytest.mark.parametrize("widget_id", sorted(PRESETS))
+def test_preset_matches_baseline_page(widget_id):
+    with open(os.path.join(BASELINE_DIR, f"{widget_id}.html"), encoding="utf-8") as baseline:
+        expected = _fields(baseline.read())
+    renderer = WidgetRenderer()
+    type_name, _ = PRESETS[widget_id]
+    assert renderer.register(type_name, {}) == widget_id
+    assert _fields(renderer.get(widget_id).html) == expected
+
+
+def test_model_supplied_widget_uses_its_own_names():
+    renderer = WidgetRenderer()
+    widget_id = renderer.register("single_choice", {"question": "Which campus?", "options": ["Ultimo", "Dubbo"]})
+    page = renderer.get(widget_id).html
+    assert "<title>Which campus?</title>" in page
+    assert 'name="which_campus"' in page and 'id="dubbo"' in page
+
+
+def test_stored_specs_expire_unless_registered_again(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    renderer = WidgetRenderer(db_path=db_path, ttl_seconds=60, sweep_interval=0)
+    stale = renderer.register("checklist", {"question": "Stale?", "options": ["a", "b"]})
+    live = renderer.register("checklist", {"question": "Live?", "options": ["a", "b"]})
+    renderer._conn.execute("UPDATE widget_specs SET created = created - 120")
+    # Registering again refreshes the spec and sweeps the expired one
+    assert renderer.register("checklist", {"question": "Live?", "options": ["a", "b"]}) == live
+    restarted = WidgetRenderer(db_path=db_path)
+    assert restarted.get(stale) is None
+    assert restarted.get(live) is not None